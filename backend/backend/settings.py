@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,7 +39,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-
+    "kgapi",
 ]
 
 MIDDLEWARE = [
@@ -122,3 +123,73 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Knowledge graph (Neo4j)
+
+# Neo4j 连接与连接池。未在这里设置的项依次取环境变量 NEO4J_URI / NEO4J_AUTH /
+# NEO4J_DB_NAME / NEO4J_MAX_POOL_SIZE / NEO4J_ACQUISITION_TIMEOUT /
+# NEO4J_MAX_CONNECTION_LIFETIME 和 kgapi.neo4j_client.DEFAULTS
+NEO4J = {}
+
+# 服务进程（wsgi.py / asgi.py，含 runserver）启动时自动创建约束与索引；manage.py 的其他命令不会连接 Neo4j，
+# 部署时也可以关闭此项，改为显式执行 manage.py init_schema
+KG_INIT_SCHEMA_ON_STARTUP = os.environ.get("KG_INIT_SCHEMA_ON_STARTUP", "False") == "True"
+
+# 抽取使用的 spaCy 模型（缺失时回退到 zh_core_web_sm）；模型在第一次抽取时才加载
+KG_SPACY_MODEL = os.environ.get("KG_SPACY_MODEL", "zh_core_web_md")
+
+# 服务进程启动时预先加载模型，避免第一个抽取请求承担加载开销
+KG_WARM_UP_EXTRACTOR = os.environ.get("KG_WARM_UP_EXTRACTOR", "False") == "True"
+
+# 前缀补全使用进程内 n-gram 索引（每个用户首次补全时从 Neo4j 加载）；关闭后直接查询 name 范围索引
+KG_SEARCH_NGRAM_INDEX = os.environ.get("KG_SEARCH_NGRAM_INDEX", "True") == "True"
+
+# 抽取结果写入前做实体消解：合并同一实体的不同写法（“深度智云”与“深度智云公司”），其他写法记入 aliases
+KG_ENTITY_RESOLUTION = os.environ.get("KG_ENTITY_RESOLUTION", "True") == "True"
+
+# 后台抽取入库任务队列，未设置的项取 kgapi.jobs.DEFAULTS
+KG_JOBS = {
+    "MAX_QUEUE": int(os.environ.get("KG_JOBS_MAX_QUEUE", 100)),
+    "WORKERS": int(os.environ.get("KG_JOBS_WORKERS", 2)),
+    "PROCESS_WORKERS": int(os.environ.get("KG_JOBS_PROCESS_WORKERS", 2)),
+}
+
+# 查询接口的结果缓存：kgapi 使用文件缓存，多个工作进程与命令行写入共享同一份版本号
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "kgapi": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("KG_CACHE_DIR", str(BASE_DIR / "kg_cache")),
+    },
+}
+
+# 查询结果缓存时间（秒）
+KG_CACHE_TIMEOUT = int(os.environ.get("KG_CACHE_TIMEOUT", 300))
+
+# 抽取结果缓存（SQLite 文件）；PATH 置空则不缓存
+KG_EXTRACTION_CACHE = {
+    "PATH": os.environ.get("KG_EXTRACTION_CACHE_PATH", str(BASE_DIR / "extraction_cache.sqlite3")),
+    "MAX_BYTES": int(os.environ.get("KG_EXTRACTION_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+}
+
+# kgapi 日志：INFO 记录每次调用的耗时与记录数，DEBUG 额外输出完整返回值
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "kg": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "kg"},
+    },
+    "loggers": {
+        "kgapi": {
+            "handlers": ["console"],
+            "level": os.environ.get("KG_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
@@ -17,12 +17,12 @@ Including another URLconf
 # backend/urls.py
 
 from django.contrib import admin
-from django.urls import path
-
+from django.urls import include, path
 
 
+# nginx 将 /api/ 前缀去掉后转发，这里按去掉前缀后的路径注册
 urlpatterns = [
     path('admin/', admin.site.urls),
-
+    path('', include('kgapi.urls')),
 ]
 
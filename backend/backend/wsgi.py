@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 application = get_wsgi_application()
+
+# 只在服务进程里初始化 schema、预热模型，manage.py 的其他命令不受影响
+from kgapi.apps import server_startup  # noqa: E402
+
+server_startup()
@@ -0,0 +1,29 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+# ready() 里不访问 Neo4j、不加载模型：每次 manage.py 调用（makemigrations、test、init_schema …）
+# 和抽取子进程的 django.setup() 都会执行 ready()。服务进程的启动工作见 server_startup
+class KgapiConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "kgapi"
+
+
+# 服务进程启动时执行（由 wsgi.py / asgi.py 在创建 application 之后调用，runserver 也经过 wsgi.py）
+def server_startup():
+    # 按配置在启动时建立 Neo4j 约束和索引（幂等）
+    if getattr(settings, "KG_INIT_SCHEMA_ON_STARTUP", False):
+        from .instrumentation import logger
+        from .neo4j_client import write_session
+        from .schema import init_schema
+
+        try:
+            with write_session() as session:
+                init_schema(session)
+        except Exception as e:
+            logger.warning("启动时初始化 Neo4j schema 失败: %s", e)
+
+    if getattr(settings, "KG_WARM_UP_EXTRACTOR", False):
+        from .extractor import warm_up
+
+        warm_up()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# 异步读路径：与 kg_writer 中的查询函数一一对应，基于 neo4j 异步驱动（AsyncGraphDatabase）。
+# Cypher 与结果组装和同步版本共用；互不依赖的读取（例如一个用户的多个图谱）用 asyncio.gather 并发执行。
+import asyncio
+
+from . import catalog, search
+from .instrumentation import timed
+from .kg_writer import GRAPH_CYPHER, LIST_USER_GRAPHS_CYPHER, graph_from_items, graph_items
+from .neo4j_client import async_read_session
+
+# 并发读取多个图谱时同时打开的 session 上限，避免一次请求占满连接池
+DEFAULT_CONCURRENCY = 10
+
+
+async def _records(session, cypher, **params):
+    result = await session.run(cypher, params)
+    return [record async for record in result]
+
+
+# 查询某个图谱的所有内容
+@timed("async_query_graph")
+async def query_graph(session, graph_id):
+    return graph_from_items(graph_items(await _records(session, GRAPH_CYPHER, graph_id=graph_id)))
+
+
+# 查询某个用户的所有图谱 ID
+@timed("async_list_user_graphs")
+async def list_user_graphs(session, user_id):
+    return [record["graph_id"] for record in await _records(session, LIST_USER_GRAPHS_CYPHER, user_id=user_id)]
+
+
+# 查询某个用户的图谱目录（实体数、关系数等统计）
+@timed("async_list_graph_summaries")
+async def list_graph_summaries(session, user_id):
+    return [dict(record) for record in await _records(session, catalog.USER_GRAPHS_CYPHER, user_id=user_id)]
+
+
+# 关键词搜索某用户的实体，返回与 search.search_entities 相同的分页结构
+@timed("async_search_entities")
+async def search_entities(session, user_id, keyword, limit=search.DEFAULT_LIMIT, offset=0):
+    query, params, limit, offset = search.search_query(keyword, user_id, limit, offset)
+    return search.search_page(await _records(session, query, **params), limit, offset)
+
+
+@timed("async_search_entities_by_keyword")
+async def search_entities_by_keyword(session, user_id, keyword, limit=search.DEFAULT_LIMIT, offset=0):
+    return (await search_entities(session, user_id, keyword, limit, offset))["results"]
+
+
+# 用独立的 session 读取一个图谱（同一个 session 不能并发执行查询）
+async def load_graph(graph_id):
+    async with async_read_session() as session:
+        return {"graph_id": graph_id, **await query_graph(session, graph_id)}
+
+
+# 并发读取多个图谱，按传入顺序返回
+async def load_graphs(graph_ids, concurrency=DEFAULT_CONCURRENCY):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def load(graph_id):
+        async with semaphore:
+            return await load_graph(graph_id)
+
+    return list(await asyncio.gather(*(load(graph_id) for graph_id in graph_ids)))
+
+
+# 读取某个用户的全部图谱：先列出 ID，再并发读取各个图谱
+async def load_user_graphs(user_id, concurrency=DEFAULT_CONCURRENCY):
+    async with async_read_session() as session:
+        graph_ids = await list_user_graphs(session, user_id)
+    return await load_graphs(graph_ids, concurrency)
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+# 离线批量导入：把抽取结果（kgapi.pipeline 输出的 JSONL，或 kg_writer --json 使用的单个 JSON）
+# 转换为 neo4j-admin database import 使用的表头 + 数据 CSV，冷启动时一次导入，代替逐批 MERGE。
+# 实体按 stable_entity_id 去重，关系按 (source, target, 类型) 去重（与 MERGE 一致，保留第一条），
+# 去重用临时 SQLite 文件而不是内存集合，CSV 边读边写，内存占用与语料规模无关。
+# 关系按 sanitize_relation_type 清洗后的类型分文件。--resolve 时先用同一个 EntityResolver 依次消解各篇文档，
+# 不同文档中同一实体的不同写法写成同一个节点。导出后用 verify 检查 CSV 行数，导入后加 --neo4j 检查数据库中的数量。
+# 用法（在 backend 目录下）：
+#   python -m kgapi.bulk_import export extracted.jsonl -o import/ --user-id user_001 [--graph-id graph_x] [--resolve]
+#   neo4j-admin database import full ...（命令见 import/manifest.json 或 export 的输出）
+#   python -m kgapi.bulk_import verify import/ [--neo4j]
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+
+from tqdm import tqdm
+
+from .kg_writer import keyed_graph
+from .neo4j_client import read_session
+from .resolution import EntityResolver
+
+MANIFEST_NAME = "manifest.json"
+ENTITY_LABEL = "Entity"
+
+ENTITY_HEADER = [f"id:ID({ENTITY_LABEL})", "name", "type", "aliases:string[]", "graph_id", "user_id"]
+# neo4j-admin 默认的数组分隔符
+ARRAY_DELIMITER = ";"
+RELATION_HEADER = [f":START_ID({ENTITY_LABEL})", f":END_ID({ENTITY_LABEL})", "verb", "similarity:double",
+                   "graph_id", "user_id"]
+
+# 去重表提交间隔（行）
+COMMIT_EVERY = 50000
+
+# 每条 INSERT 语句携带的行数（受 SQLite 单条语句参数个数的限制）
+DEDUPE_CHUNK = 500
+
+ENTITY_COUNT_CYPHER = f"MATCH (e:{ENTITY_LABEL}) RETURN count(e) AS count"
+RELATION_COUNT_CYPHER = "MATCH ()-[r:{rel_type}]->() RETURN count(r) AS count"
+
+
+# 逐条产出 (文档 id, {"entities", "relations"})：JSONL 每行一篇，否则整个文件是一篇
+def iter_extractions(path):
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    yield str(record.get("id", line_no)), record
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        record = json.load(f)
+    yield str(record.get("id", os.path.splitext(os.path.basename(path))[0])), record
+
+
+_NEWLINES = str.maketrans({"\r": " ", "\n": " "})
+_ARRAY_ITEM = str.maketrans({"\r": " ", "\n": " ", ARRAY_DELIMITER: " "})
+
+
+# 文本单元格不能跨行（neo4j-admin 默认不解析多行字段）；id、graph_id 等由程序生成，不需要处理
+def _text(value):
+    return "" if value is None else str(value).translate(_NEWLINES)
+
+
+def _array(values):
+    return ARRAY_DELIMITER.join(str(value).translate(_ARRAY_ITEM) for value in values)
+
+
+def _open_dedupe(path):
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    # 键是 12 字节摘要，B 树比直接存字符串小得多
+    conn.execute("CREATE TABLE seen (key BLOB PRIMARY KEY) WITHOUT ROWID")
+    return conn
+
+
+def _digest(*parts):
+    return hashlib.blake2b("\x00".join(parts).encode("utf-8"), digest_size=12).digest()
+
+
+# 插入去重表，返回其中第一次出现的摘要（INSERT OR IGNORE ... RETURNING 只返回实际插入的行）
+def _first_seen(conn, digests):
+    fresh = set()
+    for i in range(0, len(digests), DEDUPE_CHUNK):
+        chunk = digests[i:i + DEDUPE_CHUNK]
+        sql = f"INSERT OR IGNORE INTO seen VALUES {', '.join(['(?)'] * len(chunk))} RETURNING key"
+        fresh.update(row[0] for row in conn.execute(sql, chunk))
+    return fresh
+
+
+class _CsvFile:
+    def __init__(self, directory, name, header):
+        self.data_name = f"{name}.csv"
+        self.header_name = f"{name}_header.csv"
+        with open(os.path.join(directory, self.header_name), "w", encoding="utf-8", newline="") as f:
+            csv.writer(f).writerow(header)
+        self._file = open(os.path.join(directory, self.data_name), "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        self.rows = 0
+
+    def write(self, row):
+        self._writer.writerow(row)
+        self.rows += 1
+
+    def close(self):
+        self._file.close()
+
+    def spec(self):
+        return {"header": self.header_name, "data": self.data_name, "rows": self.rows}
+
+
+def import_command(manifest, database="neo4j"):
+    nodes = manifest["nodes"]
+    parts = ["neo4j-admin database import full",
+             f"--nodes={ENTITY_LABEL}={nodes['header']},{nodes['data']}"]
+    for rel_type, spec in sorted(manifest["relationships"].items()):
+        parts.append(f"--relationships={rel_type}={spec['header']},{spec['data']}")
+    parts.append(database)
+    return " \\\n  ".join(parts)
+
+
+# 导出 CSV，返回清单（各文件的行数与统计），同时写入 directory/manifest.json。
+# graph_id 为空时每篇文档单独成图（graph_id 取文档 id）；resolver 不为空时写出前先做实体消解
+def export_csv(records, directory, user_id, graph_id=None, resolver=None):
+    os.makedirs(directory, exist_ok=True)
+    dedupe_path = os.path.join(directory, ".dedupe.sqlite3")
+    conn = _open_dedupe(dedupe_path)
+    nodes = _CsvFile(directory, "entities", ENTITY_HEADER)
+    relationships = {}
+    # 输入条数与去重、过滤无效关系后实际写出的条数
+    stats = {"documents": 0, "entities_in": 0, "relations_in": 0}
+    pending = 0
+    try:
+        for doc_id, data in records:
+            gid = graph_id or doc_id
+            stats["documents"] += 1
+            stats["entities_in"] += len(data["entities"])
+            stats["relations_in"] += len(data["relations"])
+            if resolver is not None:
+                data = resolver.resolve(data)
+            entities, relations = keyed_graph(data, gid)
+
+            digests = [_digest(key) for key in entities]
+            fresh = _first_seen(conn, digests)
+            for digest, (key, entity) in zip(digests, entities.items()):
+                if digest in fresh:
+                    nodes.write([key, _text(entity["name"]), _text(entity["type"]), _array(entity["aliases"]),
+                                 gid, user_id])
+            digests = [_digest(*key) for key in relations]
+            fresh = _first_seen(conn, digests)
+            for digest, ((source, target, rel_type), props) in zip(digests, relations.items()):
+                if digest not in fresh:
+                    continue
+                out = relationships.get(rel_type)
+                if out is None:
+                    out = relationships[rel_type] = _CsvFile(directory, f"relationships_{rel_type}", RELATION_HEADER)
+                out.write([source, target, _text(props.get("verb")), props.get("similarity", 0.0), gid, user_id])
+
+            pending += len(entities) + len(relations)
+            if pending >= COMMIT_EVERY:
+                conn.commit()
+                pending = 0
+    finally:
+        nodes.close()
+        for out in relationships.values():
+            out.close()
+        conn.close()
+        os.remove(dedupe_path)
+
+    stats["entities_out"] = nodes.rows
+    stats["relations_out"] = sum(out.rows for out in relationships.values())
+    if resolver is not None:
+        stats["resolution"] = dict(resolver.stats)
+    manifest = {
+        "user_id": user_id,
+        "graph_id": graph_id,
+        "nodes": nodes.spec(),
+        "relationships": {rel_type: out.spec() for rel_type, out in sorted(relationships.items())},
+        "stats": stats,
+    }
+    manifest["command"] = import_command(manifest)
+    with open(os.path.join(directory, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def _count_rows(path, width):
+    rows = 0
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for line_no, row in enumerate(csv.reader(f), 1):
+            if len(row) != width:
+                raise ValueError(f"{path} 第 {line_no} 行有 {len(row)} 列，表头为 {width} 列")
+            rows += 1
+    return rows
+
+
+# 检查每个 CSV 的行数、列数与清单一致，返回 [{check, expected, actual, ok}]
+def verify_export(directory):
+    with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    results = []
+    for name, spec in [("nodes", manifest["nodes"])] + [
+            (f"relationships:{t}", s) for t, s in manifest["relationships"].items()]:
+        with open(os.path.join(directory, spec["header"]), "r", encoding="utf-8", newline="") as f:
+            width = len(next(csv.reader(f)))
+        try:
+            actual = _count_rows(os.path.join(directory, spec["data"]), width)
+        except (OSError, ValueError) as e:
+            actual = str(e)
+        results.append({"check": name, "expected": spec["rows"], "actual": actual, "ok": actual == spec["rows"]})
+    return results
+
+
+# 导入后检查数据库中的实体数与各类型关系数（导入目标应是空库，否则数量会多于清单）
+def verify_database(session, manifest):
+    results = []
+    actual = session.run(ENTITY_COUNT_CYPHER).single()["count"]
+    results.append({"check": "neo4j:nodes", "expected": manifest["nodes"]["rows"], "actual": actual,
+                    "ok": actual == manifest["nodes"]["rows"]})
+    for rel_type, spec in manifest["relationships"].items():
+        actual = session.run(RELATION_COUNT_CYPHER.format(rel_type=rel_type)).single()["count"]
+        results.append({"check": f"neo4j:{rel_type}", "expected": spec["rows"], "actual": actual,
+                        "ok": actual == spec["rows"]})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="抽取结果导出为 neo4j-admin import 的 CSV，并校验行数")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="导出 CSV")
+    export.add_argument("input", help="kgapi.pipeline 输出的 JSONL，或单个 {entities, relations} JSON")
+    export.add_argument("-o", "--output", default="import", help="输出目录")
+    export.add_argument("--user-id", default="user_001")
+    export.add_argument("--graph-id", help="全部文档写入同一个图谱；不指定时每篇文档单独成图")
+    export.add_argument("--resolve", action="store_true", help="跨文档做实体消解（使用抽取模型的名称向量）")
+    verify = sub.add_parser("verify", help="校验导出的 CSV（--neo4j 时同时校验导入后的数据库）")
+    verify.add_argument("directory")
+    verify.add_argument("--neo4j", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        records = tqdm(iter_extractions(args.input), unit="doc", desc="导出")
+        manifest = export_csv(records, args.output, args.user_id, args.graph_id,
+                              EntityResolver() if args.resolve else None)
+        relations = sum(spec["rows"] for spec in manifest["relationships"].values())
+        print(f"✅ 已导出 {manifest['nodes']['rows']} 个实体、{relations} 条关系（{len(manifest['relationships'])} 种类型）")
+        print("导入命令（在 CSV 所在目录执行，目标数据库需为空；导入后运行 manage.py backfill_degrees 补齐度数、manage.py backfill_catalog 建立图谱目录）：")
+        print(manifest["command"])
+        return
+
+    results = verify_export(args.directory)
+    if args.neo4j:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+        with open(os.path.join(args.directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        with read_session() as session:
+            results += verify_database(session, manifest)
+    for result in results:
+        print(f"{'✅' if result['ok'] else '❌'} {result['check']}: 期望 {result['expected']}，实际 {result['actual']}")
+    if not all(result["ok"] for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# 查询结果缓存：基于 Django 缓存框架，缓存键由 (user_id, graph_id, 查询) 和版本号组成。
+# 写入函数在写完后更新对应的版本号，旧条目因此不再被命中，随超时自然过期；
+# ETag 也由同一个键派生，所以判断 If-None-Match 不需要访问 Neo4j。
+import hashlib
+import json
+import os
+import uuid
+
+from .instrumentation import logger, metrics
+
+# settings.CACHES 中使用的缓存别名，默认文件缓存，Web 进程与命令行写入共享同一份版本号
+CACHE_ALIAS = "kgapi"
+
+# 查询结果的默认缓存时间（秒）；版本号本身不过期
+DEFAULT_TIMEOUT = 300
+
+# 版本号的作用域：单个图谱、单个用户、任意写入（不限范围的查询）、全部失效
+EPOCH = "epoch"
+ANY = "any"
+
+
+def _backend():
+    from django.conf import settings
+    from django.core.cache import caches
+
+    if not settings.configured and not os.environ.get("DJANGO_SETTINGS_MODULE"):
+        return None
+    alias = CACHE_ALIAS if CACHE_ALIAS in settings.CACHES else "default"
+    return caches[alias]
+
+
+def _timeout():
+    from django.conf import settings
+    return getattr(settings, "KG_CACHE_TIMEOUT", DEFAULT_TIMEOUT)
+
+
+def _version_key(scope, value=None):
+    return f"kg:ver:{scope}" if value is None else f"kg:ver:{scope}:{value}"
+
+
+# 读取版本号，不存在时写入一个新的随机值（版本号被清掉后也不会与旧值重复）
+def _version(cache, key):
+    return cache.get_or_set(key, uuid.uuid4().hex, None)
+
+
+# 查询依赖的版本号：图谱级查询看图谱版本，用户级查询看用户版本，其余看任意写入版本
+def versions(user_id=None, graph_id=None):
+    cache = _backend()
+    if cache is None:
+        return None
+    keys = [_version_key(EPOCH)]
+    if graph_id is not None:
+        keys.append(_version_key("graph", graph_id))
+    elif user_id is not None:
+        keys.append(_version_key("user", user_id))
+    else:
+        keys.append(_version_key(ANY))
+    return [_version(cache, key) for key in keys]
+
+
+# 写入后调用：更新涉及的图谱、用户版本号；范围未知时（如清空全部图谱、缺少 user_id 的旧数据）让所有缓存失效
+def bump(graph_id=None, user_id=None):
+    try:
+        cache = _backend()
+        if cache is None:
+            return
+        keys = [_version_key(ANY)]
+        if graph_id is not None:
+            keys.append(_version_key("graph", graph_id))
+        if user_id is not None:
+            keys.append(_version_key("user", user_id))
+        if graph_id is None or user_id is None:
+            keys.append(_version_key(EPOCH))
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+        metrics.inc("kg_cache_invalidations_total")
+    except Exception as e:
+        # 缓存不可用不能影响写入本身
+        logger.warning("更新查询缓存版本号失败: %s", e)
+
+
+# 计算缓存键与 ETag，二者都只依赖参数和版本号
+def cache_key(kind, user_id=None, graph_id=None, query=None):
+    token = versions(user_id, graph_id)
+    if token is None:
+        return None, None
+    payload = json.dumps([kind, user_id, graph_id, query, token], ensure_ascii=False, sort_keys=True)
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    return f"kg:q:{kind}:{digest}", f'"{digest}"'
+
+
+def get(key):
+    value = _backend().get(key)
+    metrics.inc("kg_query_cache_total", result="miss" if value is None else "hit")
+    return value
+
+
+def put(key, value):
+    _backend().set(key, value, _timeout())
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# 图谱目录：每个图谱一个 (:Graph) 元数据节点，记录所有者、创建与更新时间、实体数、关系数、源文本哈希和版本号。
+# 写入（write_graph / update_graph）时在写事务里刷新，分批删除结束后同步（删空的图谱移除目录节点）；
+# 列出图谱走 Graph.user_id 索引，只读取目录节点，不再对全部 Entity 做 DISTINCT 扫描。
+# 已有数据用 manage.py backfill_catalog 补齐。
+import hashlib
+
+from .extraction_cache import normalize_text
+from .instrumentation import timed
+
+# 实体数按 graph_id 索引统计，关系数取各实体的出度之和（关系只连接同一图谱内的实体），不展开关系。
+# 没有实体的图谱（空的抽取结果、增量更新删光了实体）不建目录节点，已有的删除，与 SYNC_SCOPE_CYPHER 一致
+REFRESH_GRAPH_CYPHER = """
+OPTIONAL MATCH (e:Entity {graph_id: $graph_id})
+WITH count(e) AS entities, sum(COUNT { (e)-->() }) AS relations
+CALL {
+    WITH entities, relations
+    WITH entities, relations WHERE entities > 0
+    MERGE (g:Graph {graph_id: $graph_id})
+    ON CREATE SET g.created_at = datetime(), g.version = 0
+    SET g.user_id = $user_id, g.updated_at = datetime(), g.version = g.version + 1,
+        g.entity_count = entities, g.relation_count = relations,
+        g.source_hash = coalesce($source_hash, g.source_hash)
+}
+CALL {
+    WITH entities
+    WITH entities WHERE entities = 0
+    MATCH (g:Graph {graph_id: $graph_id})
+    DELETE g
+}
+"""
+
+# 删除范围内的目录节点（与 kg_writer.DELETE_SCOPES 对应），参数为 $value
+CATALOG_SCOPES = {
+    "all": "MATCH (g:Graph)",
+    "graph": "MATCH (g:Graph {graph_id: $value})",
+    "user": "MATCH (g:Graph {user_id: $value})",
+}
+
+# 删除后重新统计范围内的图谱；取消删除时图谱只删了一部分，目录保留剩余的数量
+SYNC_SCOPE_CYPHER = """
+{match}
+CALL {{
+    WITH g
+    OPTIONAL MATCH (e:Entity {{graph_id: g.graph_id}})
+    RETURN count(e) AS entities, sum(COUNT {{ (e)-->() }}) AS relations
+}}
+WITH g, entities, relations
+SET g.entity_count = entities, g.relation_count = relations, g.updated_at = datetime(), g.version = g.version + 1
+WITH g WHERE g.entity_count = 0
+DELETE g
+"""
+
+SUMMARY_FIELDS = """
+g.graph_id AS graph_id, g.user_id AS user_id, toString(g.created_at) AS created_at,
+toString(g.updated_at) AS updated_at, g.entity_count AS entity_count, g.relation_count AS relation_count,
+g.source_hash AS source_hash, g.version AS version
+"""
+
+USER_GRAPHS_CYPHER = "MATCH (g:Graph {user_id: $user_id}) RETURN" + SUMMARY_FIELDS + "ORDER BY graph_id"
+
+GRAPHS_PAGE_CYPHER = """
+MATCH (g:Graph)
+WHERE ($user_id IS NULL OR g.user_id = $user_id)
+  AND ($after IS NULL OR g.graph_id > $after)
+RETURN""" + SUMMARY_FIELDS + """
+ORDER BY graph_id
+"""
+
+# 补齐目录：按 graph_id 分组统计已有实体（只在补齐时扫描一次），并移除已经没有实体的目录节点
+BACKFILL_CYPHER = """
+MATCH (e:Entity)
+WHERE e.graph_id IS NOT NULL AND ($graph_id IS NULL OR e.graph_id = $graph_id)
+WITH e.graph_id AS gid, min(e.user_id) AS uid, count(e) AS entities, sum(COUNT { (e)-->() }) AS relations
+MERGE (g:Graph {graph_id: gid})
+ON CREATE SET g.created_at = datetime(), g.version = 0
+SET g.user_id = uid, g.updated_at = datetime(), g.version = g.version + 1,
+    g.entity_count = entities, g.relation_count = relations
+RETURN count(g) AS catalogued
+"""
+
+PRUNE_CYPHER = """
+MATCH (g:Graph)
+WHERE ($graph_id IS NULL OR g.graph_id = $graph_id) AND NOT EXISTS { MATCH (:Entity {graph_id: g.graph_id}) }
+DELETE g
+RETURN count(g) AS pruned
+"""
+
+
+# 源文本的哈希（与抽取缓存相同的规范化），同一文本重复入库时可以据此识别
+def source_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+# 事务函数：写入后刷新一个图谱的目录节点，版本号加一
+def refresh_graph(tx, graph_id, user_id, source_hash=None):
+    tx.run(REFRESH_GRAPH_CYPHER, graph_id=graph_id, user_id=user_id, source_hash=source_hash).consume()
+
+
+# 事务函数：删除后同步 scope（all / graph / user）内的目录节点
+def sync_scope(tx, scope, value=None):
+    tx.run(SYNC_SCOPE_CYPHER.format(match=CATALOG_SCOPES[scope]), value=value).consume()
+
+
+# 某个用户的图谱及其统计
+@timed("list_graph_summaries")
+def list_graph_summaries(session, user_id):
+    return [dict(record) for record in session.run(USER_GRAPHS_CYPHER, user_id=user_id)]
+
+
+# 按 graph_id 游标分页列出图谱目录；user_id 为空时列出所有用户的图谱，page_size 为空时不分页
+@timed("graph_summaries_page")
+def graph_summaries_page(session, user_id=None, after=None, page_size=None):
+    cypher = GRAPHS_PAGE_CYPHER + ("LIMIT $page_size" if page_size else "")
+    graphs = [dict(record) for record in session.run(cypher, user_id=user_id, after=after, page_size=page_size)]
+    has_more = bool(page_size) and len(graphs) == page_size
+    return {"graphs": graphs, "next_cursor": graphs[-1]["graph_id"] if has_more else None}
+
+
+# 补齐已有数据的目录；graph_id 为空时处理全部图谱
+@timed("backfill_catalog")
+def backfill_catalog(session, graph_id=None):
+    catalogued = session.run(BACKFILL_CYPHER, graph_id=graph_id).single()["catalogued"]
+    pruned = session.run(PRUNE_CYPHER, graph_id=graph_id).single()["pruned"]
+    return {"catalogued": catalogued, "pruned": pruned}
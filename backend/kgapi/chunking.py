@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# 长文档分块抽取：按句子（遇到换行也断开）切成不超过 max_chars 的块，相邻块重叠若干句，逐块抽取后合并。
+# 每块的实体编号（e1、e2 …）只在块内有效，合并时按 (名称, 类型) 归并为同一个实体并重新编号，关系端点随之重映射。
+# 输入可以是字符串，也可以是打开的文本文件（按块读取），解析时内存占用只取决于块大小，与文档长度无关。
+import re
+
+# 每块的最大字符数，远小于 spaCy 默认的 nlp.max_length（1,000,000）
+DEFAULT_CHUNK_CHARS = 5000
+# 相邻块重叠的句子数，让块首的句子也有上文
+DEFAULT_OVERLAP_SENTENCES = 1
+# 从文件读取时每次读入的字符数
+READ_BLOCK_CHARS = 65536
+
+_TERMINATORS = "。！？!?；;"
+_CLOSERS = "”’\"」』）)"
+# 一句：到句末标点（连同其后的引号、括号与换行）为止；没有句末标点的行以换行结束
+_SENTENCE = re.compile(
+    rf"[^{_TERMINATORS}\n]*[{_TERMINATORS}]+[{_CLOSERS}]*\n*|[^{_TERMINATORS}\n]+\n*|\n+"
+)
+
+
+# 逐句产出，拼接起来与原文完全相同。source 为字符串或带 read() 的文本文件。
+# 没有句末标点也没有换行的长段（表格导出、OCR 文本）在超过 max_chars 时按长度硬切，
+# 留待下一块的部分不超过 max_chars，缓冲区大小与文档内容无关
+def iter_sentences(source, block_chars=READ_BLOCK_CHARS, max_chars=DEFAULT_CHUNK_CHARS):
+    if isinstance(source, str):
+        blocks = [source]
+    else:
+        blocks = iter(lambda: source.read(block_chars), "")
+    buffer = ""
+    for block in blocks:
+        buffer += block
+        pieces = _SENTENCE.findall(buffer)
+        # 最后一句可能在下一块中才结束
+        for piece in pieces[:-1]:
+            yield piece
+        buffer = pieces[-1] if pieces else ""
+        while len(buffer) > max_chars:
+            yield buffer[:max_chars]
+            buffer = buffer[max_chars:]
+    if buffer:
+        yield buffer
+
+
+# 切块：整句放入，超长的句子按 max_chars 硬切；每块开头带上前一块最后 overlap 句（仍保证不超过 max_chars）
+def iter_chunks(source, max_chars=DEFAULT_CHUNK_CHARS, overlap=DEFAULT_OVERLAP_SENTENCES):
+    window = []
+    size = 0
+    fresh = 0
+    for sentence in iter_sentences(source, max_chars=max_chars):
+        for start in range(0, len(sentence), max_chars):
+            piece = sentence[start:start + max_chars]
+            if window and size + len(piece) > max_chars:
+                yield "".join(window)
+                window = window[-overlap:] if overlap else []
+                while window and sum(map(len, window)) + len(piece) > max_chars:
+                    window.pop(0)
+                size = sum(map(len, window))
+                fresh = 0
+            window.append(piece)
+            size += len(piece)
+            fresh += 1
+    if fresh:
+        yield "".join(window)
+
+
+# 把各块的抽取结果合并为一个：同名同类型的实体只保留一个，重复的关系（重叠部分会抽到两次）只保留第一条
+class ChunkMerger:
+    def __init__(self):
+        self.entities = {}
+        self.relations = {}
+        self.chunks = 0
+
+    def add(self, result):
+        self.chunks += 1
+        remap = {}
+        for entity in result["entities"]:
+            key = (entity["name"], entity["type"])
+            merged = self.entities.get(key)
+            if merged is None:
+                merged = self.entities[key] = {"id": f"e{len(self.entities) + 1}", "name": entity["name"],
+                                               "type": entity["type"]}
+            remap[entity["id"]] = merged["id"]
+
+        for relation in result["relations"]:
+            source = remap.get(relation["source"])
+            target = remap.get(relation["target"])
+            if source is None or target is None:
+                continue
+            key = (source, target, relation["type"])
+            if key not in self.relations:
+                self.relations[key] = {**relation, "source": source, "target": target}
+
+    def result(self):
+        return {"entities": list(self.entities.values()), "relations": list(self.relations.values())}
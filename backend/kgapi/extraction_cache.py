@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+# 抽取结果缓存：按「规范化文本 + 模型名与版本 + 映射表」的哈希寻址，存放在本地 SQLite 文件中。
+# 命中时直接返回结果，不需要加载 spaCy 模型；总大小超过上限时按最近访问时间淘汰。
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from .instrumentation import metrics
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+# 规范化：去掉首尾空白、合并连续空白，只有空白差异的文本共享同一条缓存
+def normalize_text(text):
+    return re.sub(r"\s+", " ", text.strip())
+
+
+# fingerprint 描述抽取配置（模型、版本、映射表等），任何一项变化都会得到新的键
+def cache_key(text, fingerprint):
+    digest = hashlib.sha256()
+    digest.update(json.dumps(fingerprint, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    # 每个进程单独打开连接（SQLite 连接不能跨 fork 复用）
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS extraction_cache ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS extraction_cache_last_access ON extraction_cache (last_access)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key):
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value FROM extraction_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                metrics.inc("kg_extraction_cache_total", result="miss")
+                return None
+            conn.execute("UPDATE extraction_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            self.hits += 1
+        metrics.inc("kg_extraction_cache_total", result="hit")
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, key, result):
+        value = zlib.compress(json.dumps(result, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time())
+            )
+            self._evict(conn)
+            conn.commit()
+
+    # 超过容量时删除最久未访问的条目，直到回到上限以内
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM extraction_cache ORDER BY last_access"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM extraction_cache WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM extraction_cache")
+            conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extraction_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# 按 Django settings.KG_EXTRACTION_CACHE 或环境变量创建缓存；未配置路径时返回 None（不缓存）。
+# settings 按 DJANGO_SETTINGS_MODULE 惰性加载，尚未访问过 settings 的进程（如抽取子进程）也能读到配置
+def configured_cache():
+    path = os.environ.get("KG_EXTRACTION_CACHE_PATH")
+    max_bytes = int(os.environ.get("KG_EXTRACTION_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    try:
+        from django.conf import settings
+        from django.core.exceptions import ImproperlyConfigured
+        try:
+            config = getattr(settings, "KG_EXTRACTION_CACHE", None)
+        except ImproperlyConfigured:
+            config = None
+    except ImportError:
+        config = None
+    if config:
+        path = config.get("PATH", path)
+        max_bytes = config.get("MAX_BYTES", max_bytes)
+    return ExtractionCache(path, max_bytes) if path else None
@@ -1,14 +1,25 @@
 # -*- coding: utf-8 -*-
-import spacy
-from spacy.matcher import Matcher
+# 实体与关系抽取。spaCy 模型不在导入时加载：第一次调用抽取（或 warm_up）时由
+# Extractor 按配置加载，每个进程共享一个实例（get_extractor）。
+import os
+import hashlib
 import json
+import threading
+from functools import lru_cache
+from importlib import metadata
 import numpy as np
 
-try:
-    nlp = spacy.load("zh_core_web_md")
-except OSError:
-    print("使用小模型，部分功能可能受限。建议安装: python -m spacy download zh_core_web_md")
-    nlp = spacy.load("zh_core_web_sm")
+from .chunking import DEFAULT_CHUNK_CHARS, DEFAULT_OVERLAP_SENTENCES, ChunkMerger, iter_chunks
+from .extraction_cache import cache_key, configured_cache
+from .instrumentation import logger
+
+# 默认模型与回退模型，可由 Django settings.KG_SPACY_MODEL 或环境变量 KG_SPACY_MODEL 覆盖
+DEFAULT_MODEL = "zh_core_web_md"
+FALLBACK_MODEL = "zh_core_web_sm"
+
+# 抽取依赖的组件：分词向量、词性（tagger + attribute_ruler）、依存句法、分句、NER 及规则实体
+REQUIRED_COMPONENTS = ("tok2vec", "tagger", "attribute_ruler", "parser", "senter", "sentencizer",
+                       "ner", "entity_ruler", "kg_entity_merger")
 
 ENTITY_MAPPING = {
     "PERSON": "Person",
@@ -39,129 +50,402 @@ VERB_RELATION_MAP = {
 
 STOP_VERBS = {"是", "有", "在", "为", "没有", "包括", "包含", "成为", "等等", "表示", "认为", "强调"}
 
-matcher = Matcher(nlp.vocab)
+# 同现相似度阈值，以及单句最多生成的同现关系数（None 为不限制）
+COOCCURRENCE_THRESHOLD = 0.15
+MAX_PAIRS_PER_SENTENCE = None
+
+# 跨文档共享的实体名向量缓存大小
+ENTITY_VECTOR_CACHE_SIZE = 50000
+
+# 合并规则实体的管线组件名，放在 NER 之后
+MERGER_COMPONENT = "kg_entity_merger"
 
-def add_entity_patterns():
+def add_entity_patterns(matcher):
     company_patterns = [
         [{"TEXT": {"REGEX": r"[^\s]+(公司|集团|企业|中心|研究院|银行|大学|学院|医院|实验室)$"}}]
     ]
-    matcher.add("ORG", company_patterns, on_match=lambda _, doc, i, matches: add_ent(doc, matches, "ORG"))
+    matcher.add("ORG", company_patterns)
 
     product_patterns = [
         [{"TEXT": "智能"}, {"TEXT": {"REGEX": r"[^\s]+(系统|平台|设备|工具|软件|应用)$"}}],
         [{"TEXT": "新型"}, {"TEXT": {"REGEX": r"[^\s]+(技术|产品|药物|方法)$"}}]
     ]
-    matcher.add("PRODUCT", product_patterns, on_match=lambda _, doc, i, matches: add_ent(doc, matches, "PRODUCT"))
+    matcher.add("PRODUCT", product_patterns)
 
     title_patterns = [
         [{"TEXT": {"IN": ["首席", "总裁", "副总裁", "总经理", "副总经理", "主席", "副主席", "主任", "副主任"]}},
          {"TEXT": {"IN": ["执行官", "科学家", "工程师", "教授", "医生", "律师", "分析师"]}}]
     ]
-    matcher.add("TITLE", title_patterns, on_match=lambda _, doc, i, matches: add_ent(doc, matches, "TITLE"))
+    matcher.add("TITLE", title_patterns)
 
-def add_ent(doc, matches, label):
-    new_ents = list(doc.ents)
-    token_indices = set(token.i for ent in new_ents for token in ent)
+# 把规则匹配到的实体一次性并入 doc.ents：模型识别的实体优先保留，
+# 匹配结果之间按 filter_spans 的规则（长的优先，等长取靠前的）去重，最后只赋值一次 doc.ents
+def merge_matched_entities(doc, spans):
+    ents = list(doc.ents)
+    taken = set()
+    for ent in ents:
+        taken.update(range(ent.start, ent.end))
 
-    for match_id, start, end in matches:
-        overlap = any(i in token_indices for i in range(start, end))
-        if overlap:
+    for span in sorted(spans, key=lambda s: (s.end - s.start, -s.start), reverse=True):
+        if any(i in taken for i in range(span.start, span.end)):
             continue
-        span = doc.char_span(doc[start].idx, doc[end - 1].idx + len(doc[end - 1]), label=label, alignment_mode="expand")
-        if span is not None:
-            new_ents.append(span)
-            token_indices.update(range(span.start, span.end))
-
-    doc.ents = new_ents
-
-add_entity_patterns()
-
-def extract_entities_relations(text: str) -> dict:
-    doc = nlp(text)
-    matches = matcher(doc)
-    for match_id, start, end in matches:
-        add_ent(doc, [(match_id, start, end)], nlp.vocab.strings[match_id])
-
-    entities = []
-    entity_map = {}
-
-    for i, ent in enumerate(doc.ents):
-        ent_type = ENTITY_MAPPING.get(ent.label_, ent.label_)
-        entity_id = f"e{i + 1}"
-        entities.append({
-            "id": entity_id,
-            "name": ent.text,
-            "type": ent_type,
-            "start": ent.start,
-            "end": ent.end
-        })
-        for token_idx in range(ent.start, ent.end):
-            entity_map[token_idx] = entity_id
-
-    relations = []
-    for token in doc:
-        if token.pos_ == "VERB" and token.text not in STOP_VERBS:
-            subj = next((child for child in token.children if child.dep_ in {"nsubj", "nsubjpass"}), None)
-            obj = next((child for child in token.children if child.dep_ in {"dobj", "obj"}), None)
-            iobj = next((child for child in token.children if child.dep_ == "iobj"), None)
-            prep_obj = next((gc for c in token.children if c.dep_ == "prep" for gc in c.children if gc.dep_ == "pobj"), None)
-
-            rel_type = VERB_RELATION_MAP.get(token.text, token.text)
-
-            if subj and obj:
-                subj_ent = find_entity(subj.i, entity_map)
-                obj_ent = find_entity(obj.i, entity_map)
-                if subj_ent and obj_ent:
-                    relations.append({
-                        "source": subj_ent,
-                        "target": obj_ent,
-                        "type": rel_type,
-                        "verb": token.text
-                    })
-
-            if subj and prep_obj and (not obj or prep_obj.i != obj.i):
-                subj_ent = find_entity(subj.i, entity_map)
-                prep_ent = find_entity(prep_obj.i, entity_map)
-                if subj_ent and prep_ent:
-                    relations.append({
-                        "source": subj_ent,
-                        "target": prep_ent,
-                        "type": rel_type,
-                        "verb": token.text
-                    })
+        ents.append(span)
+        taken.update(range(span.start, span.end))
 
-    for sent in doc.sents:
-        sent_entities = [ent for ent in entities if ent['start'] < len(doc) and doc[ent['start']].sent == sent]
-        if len(sent_entities) >= 2:
-            for i in range(len(sent_entities)):
-                for j in range(i + 1, len(sent_entities)):
-                    if sent_entities[i]['type'] == sent_entities[j]['type']:
-                        continue
-                    has_relation = any(
-                        (r['source'] == sent_entities[i]['id'] and r['target'] == sent_entities[j]['id']) or
-                        (r['source'] == sent_entities[j]['id'] and r['target'] == sent_entities[i]['id'])
-                        for r in relations
-                    )
-                    if not has_relation:
-                        similarity = calculate_similarity(sent_entities[i]['name'], sent_entities[j]['name'])
-                        if similarity > 0.15:
-                            relations.append({
-                                "source": sent_entities[i]["id"],
-                                "target": sent_entities[j]["id"],
-                                "type": "co-occurrence",
-                                "verb": "同现",
-                                "similarity": round(similarity, 2)
-                            })
-
-    return {"entities": entities, "relations": relations}
+    doc.ents = ents
+    return doc
+
+class EntityMerger:
+    def __init__(self, vocab):
+        from spacy.matcher import Matcher
+
+        self.matcher = Matcher(vocab)
+        add_entity_patterns(self.matcher)
+
+    def __call__(self, doc):
+        return merge_matched_entities(doc, self.matcher(doc, as_spans=True))
+
+def _create_entity_merger(nlp, name):
+    return EntityMerger(nlp.vocab)
+
+# 注册组件工厂（在加载模型时才导入 spaCy），并把合并组件加到管线末尾
+def add_entity_merger(nlp):
+    from spacy.language import Language
+
+    if not Language.has_factory(MERGER_COMPONENT):
+        Language.factory(MERGER_COMPONENT, func=_create_entity_merger)
+    if MERGER_COMPONENT not in nlp.pipe_names:
+        nlp.add_pipe(MERGER_COMPONENT, last=True)
+    return nlp
 
 def find_entity(token_index, entity_map):
     return entity_map.get(token_index)
 
+# 按句子分组实体：实体按 start 有序，与句子做一次归并，不再对每个句子重扫全部实体
+def entities_by_sentence(doc, entities):
+    groups = []
+    idx = 0
+    for sent in doc.sents:
+        group = []
+        while idx < len(entities) and entities[idx]["start"] < sent.end:
+            if entities[idx]["start"] >= sent.start:
+                group.append(entities[idx])
+            idx += 1
+        if len(group) >= 2:
+            groups.append(group)
+    return groups
+
+# 映射表与阈值的摘要，作为抽取缓存键的一部分
+def tables_digest():
+    payload = json.dumps([ENTITY_MAPPING, VERB_RELATION_MAP, sorted(STOP_VERBS), COOCCURRENCE_THRESHOLD],
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _package_version(name):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+# settings 按 DJANGO_SETTINGS_MODULE 惰性加载，抽取子进程不需要先调用 django.setup()
+def _configured_model():
+    try:
+        from django.conf import settings
+        from django.core.exceptions import ImproperlyConfigured
+        try:
+            model = getattr(settings, "KG_SPACY_MODEL", None)
+        except ImproperlyConfigured:
+            model = None
+    except ImportError:
+        model = None
+    return model or os.environ.get("KG_SPACY_MODEL", DEFAULT_MODEL)
+
+
+class Extractor:
+    # model 为空时取配置；exclude 中的组件不加载；required_components 之外的组件在推理时关闭；
+    # 也可以直接传入已构建好的 nlp（此时不再加载模型）；cache 为 ExtractionCache 时先查缓存
+    def __init__(self, model=None, fallback_model=FALLBACK_MODEL, exclude=(),
+                 required_components=REQUIRED_COMPONENTS, vector_cache_size=ENTITY_VECTOR_CACHE_SIZE, nlp=None,
+                 cache=None):
+        self.model = model or _configured_model()
+        self.cache = cache
+        self.fallback_model = fallback_model
+        self.exclude = list(exclude)
+        self.required_components = tuple(required_components)
+        self.model_name = None
+        self._nlp = None
+        if nlp is not None:
+            self._nlp = add_entity_merger(nlp)
+            self.model_name = f"{nlp.lang}_{nlp.meta.get('name')}"
+        self._lock = threading.Lock()
+        self.entity_vector = lru_cache(maxsize=vector_cache_size)(self._entity_vector)
+
+    # spaCy 本身的导入也放在这里，导入本模块不产生任何模型相关开销
+    def _load(self):
+        import spacy
+
+        try:
+            nlp = spacy.load(self.model, exclude=self.exclude)
+            self.model_name = self.model
+        except OSError:
+            if not self.fallback_model:
+                raise
+            logger.warning("模型 %s 未安装，使用小模型 %s，部分功能可能受限。建议安装: python -m spacy download %s",
+                           self.model, self.fallback_model, self.model)
+            nlp = spacy.load(self.fallback_model, exclude=self.exclude)
+            self.model_name = self.fallback_model
+        return add_entity_merger(nlp)
+
+    @property
+    def loaded(self):
+        return self._nlp is not None
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            with self._lock:
+                if self._nlp is None:
+                    self._nlp = self._load()
+        return self._nlp
+
+    @property
+    def matcher(self):
+        return self.nlp.get_pipe(MERGER_COMPONENT).matcher
+
+    # 工作进程启动时调用：加载模型并跑一遍短文本，让首个请求不承担加载与初始化开销
+    def warm_up(self):
+        self.extract("预热：北京的深度智云公司宣布与未来科技达成合作。")
+        return self
+
+    # 推理时关闭的组件
+    def unused_components(self):
+        return [name for name in self.nlp.pipe_names if name not in self.required_components]
+
+    # 将要使用的模型名与版本；模型未加载时从已安装的包信息推断，不触发加载
+    def model_identity(self):
+        if self._nlp is not None:
+            return self.model_name, self._nlp.meta.get("version")
+        version = _package_version(self.model)
+        if version is not None or not self.fallback_model:
+            return self.model, version
+        return self.fallback_model, _package_version(self.fallback_model)
+
+    def fingerprint(self, max_pairs_per_sentence=MAX_PAIRS_PER_SENTENCE):
+        model, version = self.model_identity()
+        return {"model": model, "version": version, "tables": tables_digest(), "max_pairs": max_pairs_per_sentence}
+
+    # 查缓存，未配置缓存或未命中时返回 None
+    def lookup(self, text, max_pairs_per_sentence=MAX_PAIRS_PER_SENTENCE):
+        if self.cache is None:
+            return None
+        return self.cache.get(cache_key(text, self.fingerprint(max_pairs_per_sentence)))
+
+    def store(self, text, result, max_pairs_per_sentence=MAX_PAIRS_PER_SENTENCE):
+        if self.cache is not None:
+            self.cache.put(cache_key(text, self.fingerprint(max_pairs_per_sentence)), result)
+
+    def extract(self, text, max_pairs_per_sentence=MAX_PAIRS_PER_SENTENCE):
+        result = self.lookup(text, max_pairs_per_sentence)
+        if result is None:
+            result = self.extract_doc(self.nlp(text), max_pairs_per_sentence)
+            self.store(text, result, max_pairs_per_sentence)
+        return result
+
+    # 长文档分块抽取：逐块解析（每块单独查抽取缓存），合并为一个结果；source 为字符串或文本文件
+    def extract_chunked(self, source, max_chars=DEFAULT_CHUNK_CHARS, overlap=DEFAULT_OVERLAP_SENTENCES,
+                        max_pairs_per_sentence=MAX_PAIRS_PER_SENTENCE):
+        merger = ChunkMerger()
+        for chunk in iter_chunks(source, max_chars, overlap):
+            merger.add(self.extract(chunk, max_pairs_per_sentence))
+        return merger.result()
+
+    # 批量处理文本，参数与 nlp.pipe 一致
+    def pipe(self, texts, batch_size=64, n_process=1, as_tuples=False):
+        return self.nlp.pipe(texts, as_tuples=as_tuples, batch_size=batch_size, n_process=n_process,
+                             disable=self.unused_components())
+
+    # 对已经过 nlp 处理的 Doc（规则实体已由 kg_entity_merger 合并）做关系抽取，供单条调用和 nlp.pipe 批处理共用
+    def extract_doc(self, doc, max_pairs_per_sentence=MAX_PAIRS_PER_SENTENCE):
+        entities = []
+        entity_map = {}
+
+        for i, ent in enumerate(doc.ents):
+            ent_type = ENTITY_MAPPING.get(ent.label_, ent.label_)
+            entity_id = f"e{i + 1}"
+            entities.append({
+                "id": entity_id,
+                "name": ent.text,
+                "type": ent_type,
+                "start": ent.start,
+                "end": ent.end
+            })
+            for token_idx in range(ent.start, ent.end):
+                entity_map[token_idx] = entity_id
+
+        relations = []
+        for token in doc:
+            if token.pos_ == "VERB" and token.text not in STOP_VERBS:
+                subj = next((child for child in token.children if child.dep_ in {"nsubj", "nsubjpass"}), None)
+                obj = next((child for child in token.children if child.dep_ in {"dobj", "obj"}), None)
+                iobj = next((child for child in token.children if child.dep_ == "iobj"), None)
+                prep_obj = next((gc for c in token.children if c.dep_ == "prep" for gc in c.children if gc.dep_ == "pobj"), None)
+
+                rel_type = VERB_RELATION_MAP.get(token.text, token.text)
+
+                if subj and obj:
+                    subj_ent = find_entity(subj.i, entity_map)
+                    obj_ent = find_entity(obj.i, entity_map)
+                    if subj_ent and obj_ent:
+                        relations.append({
+                            "source": subj_ent,
+                            "target": obj_ent,
+                            "type": rel_type,
+                            "verb": token.text
+                        })
+
+                if subj and prep_obj and (not obj or prep_obj.i != obj.i):
+                    subj_ent = find_entity(subj.i, entity_map)
+                    prep_ent = find_entity(prep_obj.i, entity_map)
+                    if subj_ent and prep_ent:
+                        relations.append({
+                            "source": subj_ent,
+                            "target": prep_ent,
+                            "type": rel_type,
+                            "verb": token.text
+                        })
+
+        relations.extend(self.cooccurrence_relations(doc, entities, relations, max_pairs_per_sentence))
+
+        return {"entities": entities, "relations": relations}
+
+    # 同句、不同类型、尚无关系且相似度超过阈值的实体对生成同现关系。
+    # 候选筛选在相似度矩阵上向量化完成，已有关系用 (source, target) 集合判断；
+    # max_pairs_per_sentence 限制单句输出，超出时保留相似度最高的若干对
+    def cooccurrence_relations(self, doc, entities, relations, max_pairs_per_sentence=None):
+        linked = set()
+        for r in relations:
+            linked.add((r["source"], r["target"]))
+            linked.add((r["target"], r["source"]))
+
+        new_relations = []
+        for sent_entities in entities_by_sentence(doc, entities):
+            sims = self.similarity_matrix([ent["name"] for ent in sent_entities])
+            types = np.array([ent["type"] for ent in sent_entities], dtype=object)
+            mask = np.triu(types[:, None] != types[None, :], k=1) & (sims > COOCCURRENCE_THRESHOLD)
+            rows, cols = np.nonzero(mask)
+
+            pairs = []
+            for i, j in zip(rows.tolist(), cols.tolist()):
+                source, target = sent_entities[i]["id"], sent_entities[j]["id"]
+                if (source, target) not in linked:
+                    pairs.append((i, j))
+
+            if max_pairs_per_sentence is not None and len(pairs) > max_pairs_per_sentence:
+                top = sorted(range(len(pairs)), key=lambda k: -sims[pairs[k]])[:max_pairs_per_sentence]
+                pairs = [pairs[k] for k in sorted(top)]
+
+            for i, j in pairs:
+                new_relations.append({
+                    "source": sent_entities[i]["id"],
+                    "target": sent_entities[j]["id"],
+                    "type": "co-occurrence",
+                    "verb": "同现",
+                    "similarity": round(float(sims[i, j]), 2)
+                })
+        return new_relations
+
+    # 实体名的 (词序列, 向量)，与 Doc.vector 的取法一致：
+    # 有词向量表（md 模型）时只需分词并对词向量取平均；没有时（sm 模型）只跑 tok2vec 取 tensor 平均
+    def _entity_vector(self, text):
+        nlp = self.nlp
+        doc = nlp.make_doc(text)
+        orths = tuple(token.orth for token in doc)
+        if not len(doc):
+            vector = np.zeros((nlp.vocab.vectors_length,), dtype="float32")
+        elif nlp.vocab.vectors.size > 0:
+            vector = np.mean([nlp.vocab.get_vector(orth) for orth in orths], axis=0)
+        elif "tok2vec" in nlp.pipe_names:
+            vector = nlp.get_pipe("tok2vec")(doc).tensor.mean(axis=0)
+        else:
+            vector = np.zeros((nlp.vocab.vectors_length,), dtype="float32")
+        vector = np.asarray(vector, dtype="float32")
+        vector.flags.writeable = False
+        return orths, vector
+
+    # 一组实体名两两之间的余弦相似度矩阵，结果与逐对调用 Doc.similarity 一致：
+    # 词序列完全相同记为 1.0，任一向量为零记为 0.0
+    def similarity_matrix(self, texts):
+        entries = [self.entity_vector(text) for text in texts]
+        vectors = np.vstack([vector for _, vector in entries])
+        norms = np.linalg.norm(vectors, axis=1)
+        safe = np.where(norms > 0, norms, 1.0)
+        unit = vectors / safe[:, None]
+        sims = unit @ unit.T
+        zero = norms == 0
+        sims[zero, :] = 0.0
+        sims[:, zero] = 0.0
+        groups = {}
+        for i, (orths, _) in enumerate(entries):
+            groups.setdefault(orths, []).append(i)
+        for indices in groups.values():
+            sims[np.ix_(indices, indices)] = 1.0
+        return sims
+
+    def calculate_similarity(self, text1, text2):
+        return float(self.similarity_matrix([text1, text2])[0, 1])
+
+
+_extractor = None
+_extractor_pid = None
+_extractor_lock = threading.Lock()
+
+# 当前进程共享的 Extractor（fork 出的子进程各自持有一份）
+def get_extractor():
+    global _extractor, _extractor_pid
+    pid = os.getpid()
+    if _extractor is None or _extractor_pid != pid:
+        with _extractor_lock:
+            if _extractor is None or _extractor_pid != pid:
+                _extractor = Extractor(cache=configured_cache())
+                _extractor_pid = pid
+    return _extractor
+
+# 替换当前进程共享的 Extractor（例如换模型或测试时注入），返回原实例
+def set_extractor(extractor):
+    global _extractor, _extractor_pid
+    with _extractor_lock:
+        previous = _extractor
+        _extractor = extractor
+        _extractor_pid = os.getpid() if extractor is not None else None
+    return previous
+
+def warm_up():
+    return get_extractor().warm_up()
+
+# 兼容旧的模块级访问方式：extractor.nlp / extractor.matcher 在首次访问时才加载模型
+def __getattr__(name):
+    if name in ("nlp", "matcher"):
+        return getattr(get_extractor(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def extract_entities_relations(text: str, max_pairs_per_sentence=MAX_PAIRS_PER_SENTENCE) -> dict:
+    return get_extractor().extract(text, max_pairs_per_sentence)
+
+def extract_long_document(source, max_chars=DEFAULT_CHUNK_CHARS, overlap=DEFAULT_OVERLAP_SENTENCES,
+                          max_pairs_per_sentence=MAX_PAIRS_PER_SENTENCE) -> dict:
+    return get_extractor().extract_chunked(source, max_chars, overlap, max_pairs_per_sentence)
+
+def extract_from_doc(doc, max_pairs_per_sentence=MAX_PAIRS_PER_SENTENCE) -> dict:
+    return get_extractor().extract_doc(doc, max_pairs_per_sentence)
+
+def cooccurrence_relations(doc, entities, relations, max_pairs_per_sentence=None):
+    return get_extractor().cooccurrence_relations(doc, entities, relations, max_pairs_per_sentence)
+
+def similarity_matrix(texts):
+    return get_extractor().similarity_matrix(texts)
+
 def calculate_similarity(text1, text2):
-    doc1 = nlp(text1)
-    doc2 = nlp(text2)
-    return doc1.similarity(doc2)
+    return get_extractor().calculate_similarity(text1, text2)
 
 def test_extraction(text, case_name):
     print(f"\n{'=' * 40}")
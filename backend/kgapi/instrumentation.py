@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+# 查询与写入函数的日志和指标：每次调用的耗时、记录数、返回字节数。
+# timed 既可以作为装饰器使用，也可以作为上下文管理器包住任意代码块。
+# 响应的实际字节数由视图在序列化时统计（kg_response_bytes_total），timed 默认不再为计字节额外编码一次。
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("kgapi")
+
+# 是否把返回值序列化一次来统计字节数（每次调用额外一次 JSON 编码，嵌套的 timed 函数会重复编码，只在排查时打开）
+MEASURE_BYTES = os.environ.get("KG_METRICS_MEASURE_BYTES", "False") == "True"
+
+# 耗时直方图的桶边界（秒）
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            running += count
+            cumulative.append((bound, running))
+        return {"count": self.count, "sum": self.sum, "buckets": cumulative}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.gauges[key] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self.counters.items()],
+                "gauges": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self.gauges.items()],
+                "histograms": [{"name": n, "labels": dict(l), **h.snapshot()} for (n, l), h in self.histograms.items()],
+            }
+
+    # Prometheus 文本格式
+    def render_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+        for item in snapshot["counters"]:
+            lines.append(f"{item['name']}{_labels(item['labels'])} {item['value']}")
+        for item in snapshot["gauges"]:
+            lines.append(f"{item['name']}{_labels(item['labels'])} {item['value']}")
+        for item in snapshot["histograms"]:
+            for bound, count in item["buckets"]:
+                lines.append(f"{item['name']}_bucket{_labels(item['labels'], le=bound)} {count}")
+            lines.append(f"{item['name']}_sum{_labels(item['labels'])} {item['sum']}")
+            lines.append(f"{item['name']}_count{_labels(item['labels'])} {item['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels, **extra):
+    merged = {**labels, **extra}
+    if not merged:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in merged.items()) + "}"
+
+
+metrics = MetricsRegistry()
+
+
+# 结果的记录数：图结构按节点 + 边计，列表按长度计
+def _count_records(result):
+    if isinstance(result, dict):
+        if "nodes" in result or "links" in result:
+            return len(result.get("nodes", ())) + len(result.get("links", ()))
+        if "graphs" in result:
+            return sum(_count_records(g) for g in result["graphs"])
+        return 1
+    if isinstance(result, (list, tuple)):
+        if result and isinstance(result[0], dict) and ("nodes" in result[0] or "links" in result[0]):
+            return sum(_count_records(g) for g in result)
+        return len(result)
+    return 0 if result is None else 1
+
+
+def _count_bytes(result):
+    return len(json.dumps(result, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+class timed:
+    def __init__(self, name):
+        self.name = name
+        self.records = 0
+        self.bytes = 0
+        self._started = None
+
+    # 上下文管理器用法：在块内调用 observe(result) 或直接累加 records / bytes
+    def observe(self, result):
+        self.records += _count_records(result)
+        if MEASURE_BYTES:
+            self.bytes += _count_bytes(result)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s 返回: %s", self.name, json.dumps(result, ensure_ascii=False, default=str))
+        return result
+
+    def __enter__(self):
+        self.records = 0
+        self.bytes = 0
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._started
+        # 生成器被提前关闭（如客户端断开流式响应）记为 cancelled，不算错误
+        if exc_type is None:
+            status = "ok"
+        elif issubclass(exc_type, GeneratorExit):
+            status = "cancelled"
+        else:
+            status = "error"
+        metrics.inc("kg_calls_total", function=self.name, status=status)
+        metrics.observe("kg_call_seconds", seconds, function=self.name)
+        metrics.inc("kg_records_total", self.records, function=self.name)
+        metrics.inc("kg_bytes_total", self.bytes, function=self.name)
+        logger.info("%s %s %.1fms records=%d bytes=%d", self.name, status, seconds * 1000, self.records, self.bytes)
+        return False
+
+    # 装饰器用法：生成器函数按产出的条目计数，普通函数与协程函数按返回值计数
+    def __call__(self, fn):
+        name = self.name
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def coroutine_wrapper(*args, **kwargs):
+                with timed(name) as timer:
+                    return timer.observe(await fn(*args, **kwargs))
+            return coroutine_wrapper
+
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                with timed(name) as timer:
+                    for item in fn(*args, **kwargs):
+                        timer.records += 1
+                        if MEASURE_BYTES:
+                            timer.bytes += _count_bytes(item)
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("%s 产出: %s", name, json.dumps(item, ensure_ascii=False, default=str))
+                        yield item
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(name) as timer:
+                return timer.observe(fn(*args, **kwargs))
+        return wrapper
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+# 进程内的抽取入库任务队列：请求只负责提交，抽取和写入在后台完成，不占用 Django 工作线程。
+# 有界队列满时拒绝提交（由接口返回 429）；抽取在常驻的子进程池中执行，子进程启动时预先加载模型；
+# 写入 Neo4j 使用批量 UNWIND。任务按 graph_id 查询状态与结果，不依赖任何外部消息中间件。
+# 删除任务（mode = delete）分批删除一个图谱或一个用户的全部图谱，记录进度，执行中可以取消；
+# 用户级删除任务的键为 "user:<user_id>"。
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from .catalog import source_hash
+from .instrumentation import logger, metrics
+from .kg_writer import DEFAULT_BATCH_SIZE, DEFAULT_DELETE_BATCH_SIZE, delete_batched, update_graph, write_graph
+from .neo4j_client import write_session
+
+DEFAULTS = {
+    "MAX_QUEUE": 100,          # 排队任务上限，超过后拒绝提交
+    "WORKERS": 2,              # 同时处理的任务数（调度线程数）
+    "PROCESS_WORKERS": 2,      # 抽取子进程数，0 表示在调度线程里直接抽取
+    "START_METHOD": "spawn",   # 子进程启动方式；Web 进程里有线程，fork 不安全
+    "BATCH_SIZE": DEFAULT_BATCH_SIZE,
+    "DELETE_BATCH_SIZE": DEFAULT_DELETE_BATCH_SIZE,
+    "MAX_FINISHED": 1000,      # 保留的已结束任务数，超出后丢弃最早的
+}
+
+QUEUED = "queued"
+EXTRACTING = "extracting"
+WRITING = "writing"
+DELETING = "deleting"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+MODES = ("create", "update")
+DELETE_SCOPES = ("graph", "user")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobConflict(Exception):
+    pass
+
+
+# 子进程初始化：spawn 出的子进程不会执行 manage.py / gunicorn 中的 django.setup()，这里补上，
+# 抽取缓存、模型名和实体消解开关与父进程读到同一份 settings；然后加载并预热模型，之后的任务复用同一个模型
+def _init_worker():
+    if os.environ.get("DJANGO_SETTINGS_MODULE"):
+        import django
+        django.setup()
+    from .extractor import warm_up
+    warm_up()
+
+
+# 抽取后做实体消解（settings.KG_ENTITY_RESOLUTION），消解用到的名称向量同样在子进程里计算
+def _extract_in_worker(text):
+    from .extractor import extract_entities_relations
+    from .resolution import resolution_enabled, resolve_entities
+    data = extract_entities_relations(text)
+    return resolve_entities(data) if resolution_enabled() else data
+
+
+# 按图谱写入抽取结果：create 批量写入新图谱，update 只写入与已有图谱的差异；源文本哈希记入图谱目录
+def _write_in_session(data, graph_id, user_id, mode, batch_size, text_hash=None):
+    with write_session() as session:
+        if mode == "update":
+            return {"delta": update_graph(session, data, graph_id, user_id, batch_size, text_hash)}
+        return write_graph(session, data, graph_id, user_id, batch_size, text_hash)
+
+
+def _delete_in_session(scope, value, batch_size, progress, cancelled):
+    with write_session() as session:
+        return delete_batched(session, scope, value, batch_size, progress, cancelled)
+
+
+# 删除任务的键：图谱删除与该图谱的入库任务共用 graph_id，互相排斥
+def delete_key(scope, value):
+    return value if scope == "graph" else f"{scope}:{value}"
+
+
+class JobQueue:
+    # extract(text)、write(data, graph_id, user_id, mode, batch_size, text_hash) 与
+    # delete(scope, value, batch_size, progress, cancelled) 可替换，默认使用子进程抽取和 Neo4j 批量写入、分批删除
+    def __init__(self, max_queue=DEFAULTS["MAX_QUEUE"], workers=DEFAULTS["WORKERS"],
+                 process_workers=DEFAULTS["PROCESS_WORKERS"], start_method=DEFAULTS["START_METHOD"],
+                 batch_size=DEFAULTS["BATCH_SIZE"], max_finished=DEFAULTS["MAX_FINISHED"],
+                 delete_batch_size=DEFAULTS["DELETE_BATCH_SIZE"],
+                 extract=_extract_in_worker, write=_write_in_session, delete=_delete_in_session):
+        self.max_queue = max_queue
+        self.workers = workers
+        self.process_workers = process_workers
+        self.start_method = start_method
+        self.batch_size = batch_size
+        self.max_finished = max_finished
+        self.delete_batch_size = delete_batch_size
+        self.extract = extract
+        self.write = write
+        self.delete = delete
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pool = None
+        self._running = 0
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._threads:
+            return self
+        self._stop.clear()
+        if self.process_workers:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker
+            )
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"kg-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("任务队列已启动：%d 个调度线程，%d 个抽取进程，队列上限 %d",
+                    self.workers, self.process_workers, self.max_queue)
+        return self
+
+    # 停止调度线程；仍在排队的任务不再处理
+    def shutdown(self, wait=True):
+        self._stop.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=not wait)
+            self._pool = None
+
+    # 提交任务；同一 graph_id 仍在排队或执行时拒绝，队列已满时抛出 JobQueueFull
+    def submit(self, graph_id, user_id, text, mode="create"):
+        if mode not in MODES:
+            raise ValueError(f"未知的写入模式: {mode}")
+        return self._enqueue(graph_id, self._new_job(graph_id, user_id, mode), text)
+
+    # 提交删除任务：scope 为 graph 时 value 是 graph_id，为 user 时是 user_id；返回的状态中 key 用于查询与取消
+    def submit_delete(self, scope, value):
+        if scope not in DELETE_SCOPES:
+            raise ValueError(f"未知的删除范围: {scope}")
+        job = self._new_job(value if scope == "graph" else None, value if scope == "user" else None, "delete")
+        job.update(scope=scope, progress=None, cancel_requested=False)
+        return self._enqueue(delete_key(scope, value), job, None)
+
+    @staticmethod
+    def _new_job(graph_id, user_id, mode):
+        return {
+            "graph_id": graph_id,
+            "user_id": user_id,
+            "mode": mode,
+            "status": QUEUED,
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "result": None,
+        }
+
+    def _enqueue(self, key, job, text):
+        job["key"] = key
+        with self._lock:
+            current = self._jobs.get(key)
+            if current is not None and current["status"] not in FINISHED:
+                raise JobConflict(f"{key} 已有未完成的任务")
+            try:
+                self._queue.put_nowait((job, text))
+            except queue.Full:
+                metrics.inc("kg_jobs_total", status="rejected")
+                raise JobQueueFull(f"任务队列已满（{self.max_queue}）")
+            self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            self._trim()
+        metrics.inc("kg_jobs_total", status="submitted")
+        self._update_gauges()
+        return self.status(key)
+
+    # 取消任务：排队中的任务直接取消；执行中的删除任务在当前批次提交后停止。
+    # 没有该任务时返回 None，任务已结束或是执行中的入库任务时抛出 JobConflict
+    def cancel(self, key):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                return None
+            if job["status"] == QUEUED:
+                job.update(status=CANCELLED, finished_at=time.time())
+            elif job["status"] == DELETING:
+                job["cancel_requested"] = True
+            else:
+                raise JobConflict(f"{key} 的任务当前状态为 {job['status']}，无法取消")
+        if job["status"] == CANCELLED:
+            metrics.inc("kg_jobs_total", status=CANCELLED)
+        return self.status(key)
+
+    # 只保留最近 max_finished 个已结束的任务
+    def _trim(self):
+        finished = [gid for gid, job in self._jobs.items() if job["status"] in FINISHED]
+        for gid in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[gid]
+
+    def status(self, graph_id):
+        with self._lock:
+            job = self._jobs.get(graph_id)
+            if job is None:
+                return None
+            return {key: value for key, value in job.items() if key != "result"}
+
+    def result(self, graph_id):
+        with self._lock:
+            job = self._jobs.get(graph_id)
+            return None if job is None else dict(job)
+
+    # 等待任务结束（测试和命令行使用），超时返回 False
+    def wait(self, graph_id, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.status(graph_id)
+            if job is None or job["status"] in FINISHED:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {
+            "depth": self.depth(),
+            "max_queue": self.max_queue,
+            "running": self._running,
+            "workers": self.workers,
+            "process_workers": self.process_workers,
+            "jobs": counts,
+        }
+
+    def _update_gauges(self):
+        metrics.set_gauge("kg_job_queue_depth", self.depth())
+        metrics.set_gauge("kg_jobs_running", self._running)
+
+    def _set(self, job, **changes):
+        with self._lock:
+            job.update(changes)
+
+    def _extract(self, text):
+        if self._pool is not None:
+            return self._pool.submit(self.extract, text).result()
+        return self.extract(text)
+
+    # 抽取并写入，返回任务结果
+    def _ingest(self, job, text):
+        data = self._extract(text)
+        self._set(job, status=WRITING)
+        stats = self.write(data, job["graph_id"], job["user_id"], job["mode"], self.batch_size, source_hash(text))
+        return DONE, {"entities": len(data["entities"]), "relations": len(data["relations"]), "write": stats}
+
+    # 分批删除，每批之后更新进度；取消后以 cancelled 状态结束
+    def _delete(self, job):
+        stats = self.delete(job["scope"], job["graph_id"] or job["user_id"], self.delete_batch_size,
+                            lambda progress: self._set(job, progress=progress),
+                            lambda: job["cancel_requested"])
+        return (CANCELLED if stats["cancelled"] else DONE), stats
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job, text = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            with self._lock:
+                # 排队期间已被取消
+                if job["status"] == CANCELLED:
+                    self._queue.task_done()
+                    continue
+                self._running += 1
+                job.update(status=DELETING if job["mode"] == "delete" else EXTRACTING, started_at=time.time())
+            started = job["started_at"]
+            self._update_gauges()
+            metrics.observe("kg_job_wait_seconds", started - job["submitted_at"])
+            try:
+                status, result = self._delete(job) if job["mode"] == "delete" else self._ingest(job, text)
+                self._set(job, status=status, result=result, finished_at=time.time())
+                metrics.inc("kg_jobs_total", status=status)
+            except Exception as e:
+                logger.exception("%s 的任务失败", job["key"])
+                self._set(job, status=FAILED, error=str(e), finished_at=time.time())
+                metrics.inc("kg_jobs_total", status=FAILED)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                metrics.observe("kg_job_seconds", time.time() - started)
+                self._update_gauges()
+                self._queue.task_done()
+
+
+_job_queue = None
+_job_queue_pid = None
+_job_queue_lock = threading.Lock()
+
+
+def _configured_options():
+    options = dict(DEFAULTS)
+    try:
+        from django.conf import settings
+        options.update(getattr(settings, "KG_JOBS", {}))
+    except ImportError:
+        pass
+    return options
+
+
+# 当前进程共享的任务队列，第一次使用时按 settings.KG_JOBS 创建并启动
+def get_job_queue():
+    global _job_queue, _job_queue_pid
+    pid = os.getpid()
+    if _job_queue is None or _job_queue_pid != pid:
+        with _job_queue_lock:
+            if _job_queue is None or _job_queue_pid != pid:
+                options = _configured_options()
+                _job_queue = JobQueue(
+                    max_queue=options["MAX_QUEUE"],
+                    workers=options["WORKERS"],
+                    process_workers=options["PROCESS_WORKERS"],
+                    start_method=options["START_METHOD"],
+                    batch_size=options["BATCH_SIZE"],
+                    max_finished=options["MAX_FINISHED"],
+                    delete_batch_size=options["DELETE_BATCH_SIZE"]
+                ).start()
+                _job_queue_pid = pid
+                atexit.register(_job_queue.shutdown, False)
+    return _job_queue
+
+
+# 替换当前进程共享的任务队列（测试时注入），返回原队列
+def set_job_queue(job_queue):
+    global _job_queue, _job_queue_pid
+    with _job_queue_lock:
+        previous = _job_queue
+        _job_queue = job_queue
+        _job_queue_pid = os.getpid() if job_queue is not None else None
+    return previous
@@ -1,10 +1,16 @@
-from neo4j import GraphDatabase
+import argparse
+import hashlib
 import json
+import logging
+import os
 import re
 import time
-import networkx as nx
-# 配置 Neo4j 数据库连接
-driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "testpassword"))
+
+from . import cache, catalog, search, snapshot
+from .extraction_cache import normalize_text
+from .instrumentation import logger, timed
+from .neighbourhood import refresh_degrees
+from .neo4j_client import write_session
 
 
 # 处理非法关系名
@@ -16,6 +22,13 @@ def sanitize_relation_type(rel_type):
         raise ValueError(f"非法的关系类型: {rel_type}")
 
 
+# 写入后更新查询缓存版本号，并把新增、删除的实体同步到本进程的 n-gram 索引
+def _after_write(graph_id, user_id, added=(), removed_ids=()):
+    previous = search.user_version(user_id) if search.tracks(user_id) else None
+    cache.bump(graph_id, user_id)
+    search.apply_write(user_id, graph_id, added, removed_ids, previous)
+
+
 # 创建实体节点，绑定 graph_id 和 user_id
 def create_entities(session, entities, graph_id, user_id):
     for entity in entities:
@@ -30,11 +43,13 @@ def create_entities(session, entities, graph_id, user_id):
             graph_id=graph_id,
             user_id=user_id
         )
+    _after_write(graph_id, user_id, entities)
 
 
 # 创建关系，绑定 graph_id 和 user_id
 def create_relations(session, relations, entities, graph_id, user_id):
     entity_map = {entity["id"]: entity for entity in entities}
+    touched = set()
     for relation in relations:
         source_id = relation["source"]
         target_id = relation["target"]
@@ -42,13 +57,13 @@ def create_relations(session, relations, entities, graph_id, user_id):
         target_entity = entity_map.get(target_id)
 
         if not source_entity or not target_entity:
-            print(f"跳过无效关系，source或target找不到对应实体: {relation}")
+            logger.warning("跳过无效关系，source或target找不到对应实体: %s", relation)
             continue
 
         try:
             rel_type = sanitize_relation_type(relation["type"])
         except ValueError as e:
-            print(e)
+            logger.warning("%s", e)
             continue
 
         cypher = f"""
@@ -66,205 +81,657 @@ def create_relations(session, relations, entities, graph_id, user_id):
             graph_id=graph_id,
             user_id=user_id
         )
+        touched.update((source_id, target_id))
+    session.execute_write(refresh_degrees, touched)
+    _after_write(graph_id, user_id)
+
+
+# 批量写入时每个事务携带的默认行数
+DEFAULT_BATCH_SIZE = 1000
+
+ENTITY_BATCH_CYPHER = """
+UNWIND $rows AS row
+MERGE (e:Entity {id: row.id})
+SET e.name = row.name, e.type = row.type, e.aliases = row.aliases, e.graph_id = $graph_id, e.user_id = $user_id,
+    e.degree = coalesce(e.degree, 0)
+"""
+
+# 关系类型只能拼接进 Cypher 文本，因此每种类型单独一条语句
+RELATION_BATCH_CYPHER = """
+UNWIND $rows AS row
+MATCH (a:Entity {{id: row.source_id}}), (b:Entity {{id: row.target_id}})
+MERGE (a)-[r:{rel_type}]->(b)
+ON CREATE SET r.graph_id = $graph_id, r.verb = row.verb, r.similarity = row.similarity, r.user_id = $user_id
+"""
+
+
+# 把任意可迭代对象切成固定大小的批次
+def _chunked(rows, batch_size):
+    if batch_size < 1:
+        raise ValueError(f"batch_size 必须为正整数: {batch_size}")
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# 在显式写事务中执行一批 UNWIND
+def _write_batch(tx, cypher, rows, graph_id, user_id):
+    tx.run(cypher, rows=rows, graph_id=graph_id, user_id=user_id).consume()
+
+
+# 汇总一次批量写入的行数、批次数和吞吐
+def _write_stats(kind, rows, batches, started):
+    seconds = time.perf_counter() - started
+    rows_per_sec = rows / seconds if seconds > 0 else 0.0
+    logger.info("批量写入%s %d 条，共 %d 批，耗时 %.2fs，%.0f 条/秒", kind, rows, batches, seconds, rows_per_sec)
+    return {"rows": rows, "batches": batches, "seconds": seconds, "rows_per_sec": rows_per_sec}
+
+
+# 分批写入实体，返回 (统计, 本进程 n-gram 索引需要同步的行)；不更新缓存，由调用方在写完后统一处理
+@timed("create_entities_batched")
+def _write_entities_batched(session, entities, graph_id, user_id, batch_size):
+    started = time.perf_counter()
+    rows = ({"id": e["id"], "name": e["name"], "type": e["type"], "aliases": e.get("aliases", [])} for e in entities)
+    total = batches = 0
+    # 只有本进程的 n-gram 索引跟踪该用户时才保留写入的行
+    written = [] if search.tracks(user_id) else None
+    for batch in _chunked(rows, batch_size):
+        session.execute_write(_write_batch, ENTITY_BATCH_CYPHER, batch, graph_id, user_id)
+        total += len(batch)
+        batches += 1
+        if written is not None:
+            written.extend(batch)
+    return _write_stats("实体", total, batches, started), written or ()
+
+
+# 批量创建实体节点：每批一个写事务，通过 UNWIND $rows 一次写入
+def create_entities_batched(session, entities, graph_id, user_id, batch_size=DEFAULT_BATCH_SIZE):
+    stats, written = _write_entities_batched(session, entities, graph_id, user_id, batch_size)
+    _after_write(graph_id, user_id, written)
+    return stats
+
+
+# 按清洗后的关系类型分组，过滤掉找不到端点或类型非法的关系
+def group_relations_by_type(relations, entities):
+    entity_ids = {entity["id"] for entity in entities}
+    groups = {}
+    for relation in relations:
+        if relation["source"] not in entity_ids or relation["target"] not in entity_ids:
+            logger.warning("跳过无效关系，source或target找不到对应实体: %s", relation)
+            continue
+        try:
+            rel_type = sanitize_relation_type(relation["type"])
+        except ValueError as e:
+            logger.warning("%s", e)
+            continue
+        groups.setdefault(rel_type, []).append({
+            "source_id": relation["source"],
+            "target_id": relation["target"],
+            "verb": relation.get("verb", ""),
+            "similarity": relation.get("similarity", 0.0)
+        })
+    return groups
+
+
+# 分批写入关系并更新端点的度数；不更新缓存，由调用方在写完后统一处理
+@timed("create_relations_batched")
+def _write_relations_batched(session, relations, entities, graph_id, user_id, batch_size):
+    started = time.perf_counter()
+    total = batches = 0
+    touched = set()
+    for rel_type, rows in group_relations_by_type(relations, entities).items():
+        cypher = RELATION_BATCH_CYPHER.format(rel_type=rel_type)
+        for batch in _chunked(rows, batch_size):
+            session.execute_write(_write_batch, cypher, batch, graph_id, user_id)
+            total += len(batch)
+            batches += 1
+        touched.update(row["source_id"] for row in rows)
+        touched.update(row["target_id"] for row in rows)
+    if touched:
+        session.execute_write(refresh_degrees, touched, batch_size)
+    return _write_stats("关系", total, batches, started)
+
+
+# 批量创建关系：同一关系类型的行合并成 UNWIND 批次写入，最后更新端点的度数
+def create_relations_batched(session, relations, entities, graph_id, user_id, batch_size=DEFAULT_BATCH_SIZE):
+    stats = _write_relations_batched(session, relations, entities, graph_id, user_id, batch_size)
+    _after_write(graph_id, user_id)
+    return stats
+
+
+# 由图谱 ID 与实体内容（规范化名称 + 类型）派生的稳定实体 ID。
+# 抽取器给出的 e1、e2 … 只是文档内的位置编号，不同文档之间会重复，不能作为 Neo4j 中的全局 id
+def stable_entity_id(graph_id, name, entity_type):
+    payload = "\x00".join([graph_id, entity_type or "", normalize_text(name)])
+    return "ent_" + hashlib.sha1(payload.encode("utf-8")).hexdigest()[:24]
+
+
+# 把一次抽取结果换成稳定 ID：同名同类型的实体合并（实体消解给出的 aliases 取并集），关系端点随之重映射。
+# 返回 (实体 {id: 行}, 关系 {(source_id, target_id, 关系类型): 属性})
+def keyed_graph(data, graph_id):
+    entities = {}
+    remap = {}
+    for entity in data["entities"]:
+        key = stable_entity_id(graph_id, entity["name"], entity["type"])
+        remap[entity["id"]] = key
+        row = entities.setdefault(key, {"id": key, "name": entity["name"], "type": entity["type"], "aliases": []})
+        row["aliases"] += [alias for alias in entity.get("aliases", ()) if alias not in row["aliases"]]
+
+    relations = {}
+    for relation in data["relations"]:
+        source_id = remap.get(relation["source"])
+        target_id = remap.get(relation["target"])
+        if source_id is None or target_id is None:
+            logger.warning("跳过无效关系，source或target找不到对应实体: %s", relation)
+            continue
+        try:
+            rel_type = sanitize_relation_type(relation["type"])
+        except ValueError as e:
+            logger.warning("%s", e)
+            continue
+        # 与 MERGE 语义一致：同一对端点的同类型关系只保留第一条
+        relations.setdefault((source_id, target_id, rel_type), {
+            "verb": relation.get("verb", ""),
+            "similarity": relation.get("similarity", 0.0)
+        })
+    return entities, relations
+
+
+# 以稳定 ID 写入一个新图谱（批量 UNWIND），最后刷新图谱目录；source_hash 为源文本的哈希（catalog.source_hash）。
+# 实体、关系和目录都写完后只更新一次缓存版本号
+def write_graph(session, data, graph_id, user_id, batch_size=DEFAULT_BATCH_SIZE, source_hash=None):
+    entities, relations = keyed_graph(data, graph_id)
+    entity_stats, written = _write_entities_batched(session, entities.values(), graph_id, user_id, batch_size)
+    rows = [{"source": s, "target": t, "type": rel_type, **props} for (s, t, rel_type), props in relations.items()]
+    relation_stats = _write_relations_batched(session, rows, list(entities.values()), graph_id, user_id, batch_size)
+    session.execute_write(catalog.refresh_graph, graph_id, user_id, source_hash)
+    _after_write(graph_id, user_id, written)
+    return {"entities": entity_stats, "relations": relation_stats}
+
+
+STORED_ENTITIES_CYPHER = """
+MATCH (e:Entity {graph_id: $graph_id})
+RETURN e.id AS id, e.name AS name, e.type AS type, e.aliases AS aliases
+"""
+
+STORED_RELATIONS_CYPHER = """
+MATCH (a:Entity {graph_id: $graph_id})-[r]->(b:Entity {graph_id: $graph_id})
+RETURN a.id AS source_id, b.id AS target_id, type(r) AS rel_type, r.verb AS verb, r.similarity AS similarity
+"""
+
+DELETE_ENTITIES_CYPHER = """
+UNWIND $rows AS row
+MATCH (e:Entity {id: row.id})
+DETACH DELETE e
+"""
+
+DELETE_RELATIONS_CYPHER = """
+UNWIND $rows AS row
+MATCH (a:Entity {{id: row.source_id}})-[r:{rel_type}]->(b:Entity {{id: row.target_id}})
+DELETE r
+"""
+
+UPDATE_RELATIONS_CYPHER = """
+UNWIND $rows AS row
+MATCH (a:Entity {{id: row.source_id}})-[r:{rel_type}]->(b:Entity {{id: row.target_id}})
+SET r.verb = row.verb, r.similarity = row.similarity
+"""
+
+
+def _same_relation(stored, new):
+    return (stored.get("verb") or "") == (new.get("verb") or "") and \
+        round(stored.get("similarity") or 0.0, 6) == round(new.get("similarity") or 0.0, 6)
+
+
+# 比较库中图谱与新抽取结果，得到需要增、改、删的实体与关系
+def diff_graph(stored_entities, stored_relations, entities, relations):
+    delta = {
+        "entities": {"added": [], "changed": [], "removed": []},
+        "relations": {"added": [], "changed": [], "removed": []},
+    }
+    for key, row in entities.items():
+        stored = stored_entities.get(key)
+        if stored is None:
+            delta["entities"]["added"].append(row)
+        elif stored.get("name") != row["name"] or stored.get("type") != row["type"] or \
+                sorted(stored.get("aliases") or []) != sorted(row.get("aliases") or []):
+            delta["entities"]["changed"].append(row)
+    delta["entities"]["removed"] = [{"id": key} for key in stored_entities if key not in entities]
+
+    for key, props in relations.items():
+        row = {"source_id": key[0], "target_id": key[1], "rel_type": key[2], **props}
+        stored = stored_relations.get(key)
+        if stored is None:
+            delta["relations"]["added"].append(row)
+        elif not _same_relation(stored, props):
+            delta["relations"]["changed"].append(row)
+    delta["relations"]["removed"] = [
+        {"source_id": key[0], "target_id": key[1], "rel_type": key[2]}
+        for key in stored_relations if key not in relations
+    ]
+    return delta
+
+
+def delta_size(delta):
+    sizes = {kind: {op: len(rows) for op, rows in ops.items()} for kind, ops in delta.items()}
+    sizes["total"] = sum(n for ops in sizes.values() for n in ops.values())
+    return sizes
+
+
+# 在同一事务内按关系类型分批执行
+def _run_relation_rows(tx, template, rows, graph_id, user_id, batch_size):
+    by_type = {}
+    for row in rows:
+        by_type.setdefault(row["rel_type"], []).append(
+            {key: value for key, value in row.items() if key != "rel_type"})
+    for rel_type, typed_rows in by_type.items():
+        for batch in _chunked(typed_rows, batch_size):
+            _write_batch(tx, template.format(rel_type=rel_type), batch, graph_id, user_id)
+
+
+# 事务函数：读取当前图谱、计算差异并只写入变化部分（重试时整体重新计算），有变化时在同一事务内刷新图谱目录
+def _apply_graph_delta(tx, entities, relations, graph_id, user_id, batch_size, source_hash=None):
+    stored_entities = {record["id"]: record for record in tx.run(STORED_ENTITIES_CYPHER, graph_id=graph_id)}
+    stored_relations = {
+        (record["source_id"], record["target_id"], record["rel_type"]): record
+        for record in tx.run(STORED_RELATIONS_CYPHER, graph_id=graph_id)
+    }
+    delta = diff_graph(stored_entities, stored_relations, entities, relations)
+
+    # 端点被删除的关系会随 DETACH DELETE 一起消失，不需要单独删除
+    removed_ids = {row["id"] for row in delta["entities"]["removed"]}
+    detached = [row for row in delta["relations"]["removed"]
+                if row["source_id"] not in removed_ids and row["target_id"] not in removed_ids]
+    _run_relation_rows(tx, DELETE_RELATIONS_CYPHER, detached, graph_id, user_id, batch_size)
+    for batch in _chunked(delta["entities"]["removed"], batch_size):
+        _write_batch(tx, DELETE_ENTITIES_CYPHER, batch, graph_id, user_id)
+    for batch in _chunked(delta["entities"]["added"] + delta["entities"]["changed"], batch_size):
+        _write_batch(tx, ENTITY_BATCH_CYPHER, batch, graph_id, user_id)
+    _run_relation_rows(tx, RELATION_BATCH_CYPHER, delta["relations"]["added"], graph_id, user_id, batch_size)
+    _run_relation_rows(tx, UPDATE_RELATIONS_CYPHER, delta["relations"]["changed"], graph_id, user_id, batch_size)
+
+    # 关系增删后端点的度数变化（被删除的实体除外）
+    touched = {row[end] for row in delta["relations"]["added"] + delta["relations"]["removed"]
+               for end in ("source_id", "target_id")} - removed_ids
+    refresh_degrees(tx, touched, batch_size)
+    if delta_size(delta)["total"]:
+        catalog.refresh_graph(tx, graph_id, user_id, source_hash)
+    return delta
+
+
+# 增量更新已有图谱：与库中内容比较后只写入新增、变化和删除的节点与边，全部在一个写事务中完成。
+# 返回各类变化的条数，写入量与变化量成正比，而不是与图谱大小成正比
+@timed("update_graph")
+def update_graph(session, data, graph_id, user_id, batch_size=DEFAULT_BATCH_SIZE, source_hash=None):
+    entities, relations = keyed_graph(data, graph_id)
+    delta = session.execute_write(_apply_graph_delta, entities, relations, graph_id, user_id, batch_size, source_hash)
+    sizes = delta_size(delta)
+    if sizes["total"]:
+        _after_write(graph_id, user_id, delta["entities"]["added"] + delta["entities"]["changed"],
+                     [row["id"] for row in delta["entities"]["removed"]])
+    logger.info("增量更新图谱 %s：实体 %s，关系 %s，共 %d 处变化",
+                graph_id, sizes["entities"], sizes["relations"], sizes["total"])
+    return sizes
+
+
+# 节点在前端的唯一标识
+def _node_key(node):
+    return node.get("id") or node.get("name")
+
+
+# 组装前端使用的边结构，中文描述优先作为 label
+def _build_link(source, target, props, rel_type=None):
+    return {
+        "source": source,
+        "target": target,
+        "type": rel_type,
+        "label": props.get("verb") or props.get("type") or rel_type,
+        **props
+    }
 
 
-# 查询某个图谱的所有内容
-def query_graph(session, graph_id):
-    print(f"\n📌 查询图谱 graph_id = {graph_id} 的结构：")
-    result = session.run(
-        """
-        MATCH (a:Entity {graph_id: $graph_id})-[r]->(b:Entity {graph_id: $graph_id})
-        RETURN a, r, b
-        """,
-        graph_id=graph_id
-    )
-    records = list(result)
-
-    nodes = {}
-    links = []
+# 一条查询同时覆盖孤立节点和边（同步与异步读路径共用）
+GRAPH_CYPHER = """
+MATCH (a:Entity {graph_id: $graph_id})
+OPTIONAL MATCH (a)-[r]->(b:Entity {graph_id: $graph_id})
+RETURN properties(a) AS a, type(r) AS rel_type, properties(r) AS r, properties(b) AS b
+"""
 
-    if not records:
-        print("未找到关系，仅列出实体：")
-        node_result = session.run("MATCH (n:Entity {graph_id: $graph_id}) RETURN n", graph_id=graph_id)
-        for record in node_result:
-            node = dict(record["n"])
-            node_id = node.get("id") or node.get("name")  # 前端唯一标识
-            nodes[node_id] = node
-        return {"nodes": list(nodes.values()), "links": []}
+# 通过图谱目录（Graph.user_id 索引）列出图谱，不扫描实体
+LIST_USER_GRAPHS_CYPHER = "MATCH (g:Graph {user_id: $user_id}) RETURN g.graph_id AS graph_id ORDER BY graph_id"
 
+# 把 GRAPH_CYPHER 的记录转换为 ("node", 节点) 与 ("link", 边)；节点只用一个 id 集合去重
+def graph_items(records):
+    seen = set()
     for record in records:
-        a = dict(record["a"])
-        b = dict(record["b"])
-        r = dict(record["r"])
-        # 打印检查
-        print(f"({a}) -[{r}]-> ({b})")
-        
-        # 用id或name作为唯一标识（根据你Neo4j的数据建模）
-        a_id = a.get("id") or a.get("name")
-        b_id = b.get("id") or b.get("name")
-
-        nodes[a_id] = a
-        nodes[b_id] = b
-
-        links.append({
-            "source": a_id,
-            "target": b_id,
-            "type": r.get("type"),
-            "label": r.get("verb") or r.get("type"),  # 中文描述优先
-            **r
-        })
+        a = record["a"]
+        a_id = _node_key(a)
+        if a_id not in seen:
+            seen.add(a_id)
+            yield "node", a
+
+        b = record["b"]
+        if b is None:
+            continue
+        b_id = _node_key(b)
+        if b_id not in seen:
+            seen.add(b_id)
+            yield "node", b
+        yield "link", _build_link(a_id, b_id, record["r"], record["rel_type"])
 
+
+def graph_from_items(items):
+    nodes = []
+    links = []
+    for kind, item in items:
+        (nodes if kind == "node" else links).append(item)
     return {
-        "nodes": list(nodes.values()),
+        "nodes": nodes,
         "links": links
     }
 
 
-# 查询某个用户的所有图谱 ID
-def list_user_graphs(session, user_id):
-    result = session.run(
-        "MATCH (n:Entity) WHERE n.user_id = $user_id RETURN DISTINCT n.graph_id AS graph_id",
-        user_id=user_id
-    )
-    graph_ids = [record["graph_id"] for record in result]
-    print(f"\n👤 用户 {user_id} 的图谱ID：")
-    for gid in graph_ids:
-        print(f" - {gid}")
-    return graph_ids
-# 查询某个用户的所有图谱（完整结构）
-def query_graphs_by_user(session, user_id):
-    print(f"\n📌 查询用户 {user_id} 的所有图谱结构（实体 + 关系）：")
-    result = session.run(
-        """
-        MATCH (n:Entity)
-        WHERE n.user_id = $user_id
-        RETURN DISTINCT n.graph_id AS graph_id
-        """,
-        user_id=user_id
-    )
-    graph_ids = [record["graph_id"] for record in result]
-    if not graph_ids:
-        print("⚠️ 该用户没有图谱。")
-        return []
-
-    all_graphs = []
-
-    for graph_id in graph_ids:
-        print(f"\n🧩 图谱 graph_id = {graph_id}：")
-        graph_data = query_graph(session, graph_id)
+# 流式查询某个图谱：按驱动返回顺序逐条产出 ("node", 节点) 与 ("link", 边)，边不在内存中累积
+@timed("iter_graph")
+def iter_graph(session, graph_id):
+    yield from graph_items(session.run(GRAPH_CYPHER, graph_id=graph_id))
 
-        # 打印节点信息
-        print("🔹 节点数量:", len(graph_data["nodes"]))
-        for node in graph_data["nodes"]:
-            print("  -", node)
-
-        # 打印关系信息
-        print("🔸 关系数量:", len(graph_data["links"]))
-        for link in graph_data["links"]:
-            print("  →", link["source"], "-[", link["label"], "]->", link["target"])
-
-        all_graphs.append({
-            "graph_id": graph_id,
-            "nodes": graph_data["nodes"],
-            "links": graph_data["links"]
-        })
-
-    return all_graphs
 
+# 查询某个图谱的所有内容
+@timed("query_graph")
+def query_graph(session, graph_id):
+    return graph_from_items(iter_graph(session, graph_id))
 
 
-# 查询所有图谱
-def query_all_graphs(session):
-    print("📌 查询所有图谱的结构（实体 + 关系）：")
+# 查询某个用户的所有图谱 ID
+@timed("list_user_graphs")
+def list_user_graphs(session, user_id):
+    result = session.run(LIST_USER_GRAPHS_CYPHER, user_id=user_id)
+    return [record["graph_id"] for record in result]
+# 分页列出图谱时每页的默认图谱数
+DEFAULT_GRAPH_PAGE_SIZE = 50
+
+# 以 gid 为输入，在服务端按图谱分组收集节点和边，一行返回一个图谱
+GRAPH_FETCH_BODY = """
+MATCH (n:Entity {graph_id: gid})
+WITH gid, collect(n) AS members
+CALL {
+    WITH gid, members
+    UNWIND members AS a
+    MATCH (a)-[r]->(b:Entity {graph_id: gid})
+    RETURN collect({
+        source: coalesce(a.id, a.name),
+        target: coalesce(b.id, b.name),
+        rel_type: type(r),
+        props: properties(r)
+    }) AS links
+}
+RETURN gid AS graph_id, [m IN members | properties(m)] AS nodes, links
+"""
+
+
+# 把一行分组结果转换为 {graph_id, nodes, links}
+def _graph_from_record(record):
+    return {
+        "graph_id": record["graph_id"],
+        "nodes": record["nodes"],
+        "links": [
+            _build_link(link["source"], link["target"], link["props"], link["rel_type"])
+            for link in record["links"]
+        ]
+    }
 
-    result = session.run("MATCH (n:Entity) RETURN DISTINCT n.graph_id AS graph_id")
-    graph_ids = [record["graph_id"] for record in result]
 
+# 一次往返批量查询多个图谱（包含没有边的孤立节点），按传入顺序返回
+@timed("query_graphs")
+def query_graphs(session, graph_ids):
+    graph_ids = list(graph_ids)
     if not graph_ids:
-        print("⚠️ 当前数据库中没有图谱。")
         return []
+    result = session.run("UNWIND $graph_ids AS gid" + GRAPH_FETCH_BODY, graph_ids=graph_ids)
+    graphs = {record["graph_id"]: _graph_from_record(record) for record in result}
+    return [graphs[gid] for gid in graph_ids if gid in graphs]
 
-    all_graphs = []
 
-    for graph_id in graph_ids:
-        print(f"\n🧩 图谱 graph_id = {graph_id}：")
-        graph_data = query_graph(session, graph_id)
+# 按 graph_id 游标分页查询图谱：after 为上一页最后一个 graph_id，user_id 为空时查询所有用户。
+# 先在图谱目录上选出本页的 graph_id（走索引），再一次往返展开这些图谱；
+# 游标取选中的最后一个 graph_id，即使某个图谱已没有实体、不返回内容，分页也不会提前结束
+@timed("query_graphs_page")
+def query_graphs_page(session, user_id=None, after=None, page_size=DEFAULT_GRAPH_PAGE_SIZE):
+    page = catalog.graph_summaries_page(session, user_id=user_id, after=after, page_size=page_size)
+    return {
+        "graphs": query_graphs(session, [summary["graph_id"] for summary in page["graphs"]]),
+        "next_cursor": page["next_cursor"]
+    }
 
-        # 打印节点信息
-        print("🔹 节点数量:", len(graph_data["nodes"]))
-        for node in graph_data["nodes"]:
-            print("  -", node)
 
-        # 打印关系信息
-        print("🔸 关系数量:", len(graph_data["links"]))
-        for link in graph_data["links"]:
-            print("  →", link["source"], "-[", link["label"], "]->", link["target"])
+# 查询某个用户的所有图谱（完整结构）
+@timed("query_graphs_by_user")
+def query_graphs_by_user(session, user_id):
+    return query_graphs_page(session, user_id=user_id, page_size=None)["graphs"]
 
-        all_graphs.append({
-            "graph_id": graph_id,
-            "nodes": graph_data["nodes"],
-            "links": graph_data["links"]
-        })
 
-    return all_graphs
+# 查询所有图谱
+@timed("query_all_graphs")
+def query_all_graphs(session):
+    return query_graphs_page(session, page_size=None)["graphs"]
+
+
+# 分批删除时每个事务删除的关系数或节点数
+DEFAULT_DELETE_BATCH_SIZE = 10000
+
+# 删除范围：匹配要删除的实体 n，参数为 $value
+DELETE_SCOPES = {
+    "all": "MATCH (n:Entity) WHERE n.graph_id IS NOT NULL",
+    "graph": "MATCH (n:Entity {graph_id: $value})",
+    "user": "MATCH (n:Entity {user_id: $value})",
+}
+
+# 删除前统计范围内的实体数，并记下涉及的 (graph_id, user_id)，删除后只让这些图谱和所有者的缓存失效；
+# 清空全部图谱时不需要逐个记录
+COUNT_SCOPE_CYPHER = "{match} RETURN count(n) AS count, {owners} AS owners"
+SCOPE_OWNERS = "collect(DISTINCT [n.graph_id, n.user_id])"
+
+# 先分批删除关系，再删除节点：度数很高的节点也不会让单个事务变得很大
+DELETE_RELATIONS_BATCH_CYPHER = """
+{match}
+MATCH (n)-[r]-()
+WITH DISTINCT r LIMIT $batch_size
+DELETE r
+RETURN count(r) AS deleted
+"""
+
+DELETE_NODES_BATCH_CYPHER = """
+{match}
+WITH n LIMIT $batch_size
+DETACH DELETE n
+RETURN count(n) AS deleted
+"""
+
+
+def _delete_batch(tx, cypher, value, batch_size):
+    return tx.run(cypher, value=value, batch_size=batch_size).single()["deleted"]
+
+
+# 删除提交后让该范围的查询缓存、n-gram 索引和内存快照失效；
+# owners 为删除前记下的 (graph_id, user_id)，按图谱和所有者更新版本号，只有清空全部图谱时让所有缓存失效
+def _after_delete(scope, value, owners=()):
+    if scope != "all":
+        for graph_id, user_id in owners:
+            cache.bump(graph_id=graph_id, user_id=user_id)
+    if scope == "graph":
+        search.ngram_index.drop_graph(value)
+        snapshot.snapshots.drop(graph_id=value)
+    elif scope == "user":
+        search.ngram_index.drop_user(value)
+        snapshot.snapshots.drop(user_id=value)
+    else:
+        cache.bump()
+        search.ngram_index.drop_user()
+        snapshot.snapshots.drop()
+
+
+# 分批删除 scope（all / graph / user）内的实体与关系：每批一个写事务，提交后立即让缓存失效，
+# 不会在一个事务里删除整个图谱而耗尽 Neo4j 堆内存，也不会长时间阻塞并发读。
+# 每批之后调用 progress(stats)；cancelled() 返回 True 时在下一批之前停止，已提交的批次不会回滚。
+# 返回 {scope, value, total_entities, entities, relations, batches, cancelled}
+@timed("delete_batched")
+def delete_batched(session, scope, value=None, batch_size=DEFAULT_DELETE_BATCH_SIZE, progress=None, cancelled=None):
+    if scope not in DELETE_SCOPES:
+        raise ValueError(f"未知的删除范围: {scope}")
+    if batch_size < 1:
+        raise ValueError(f"batch_size 必须为正整数: {batch_size}")
+    match = DELETE_SCOPES[scope]
+    owners_expr = "[]" if scope == "all" else SCOPE_OWNERS
+    counted = session.run(COUNT_SCOPE_CYPHER.format(match=match, owners=owners_expr), value=value).single()
+    owners = [tuple(pair) for pair in counted["owners"]]
+    stats = {
+        "scope": scope,
+        "value": value,
+        "total_entities": counted["count"],
+        "entities": 0,
+        "relations": 0,
+        "batches": 0,
+        "cancelled": False,
+    }
+    for kind, template in (("relations", DELETE_RELATIONS_BATCH_CYPHER), ("entities", DELETE_NODES_BATCH_CYPHER)):
+        cypher = template.format(match=match)
+        while not stats["cancelled"]:
+            if cancelled is not None and cancelled():
+                stats["cancelled"] = True
+                break
+            deleted = session.execute_write(_delete_batch, cypher, value, batch_size)
+            if deleted:
+                stats[kind] += deleted
+                stats["batches"] += 1
+                _after_delete(scope, value, owners)
+                if progress is not None:
+                    progress(dict(stats))
+            if deleted < batch_size:
+                break
+    # 删除结束（或取消）后重新统计图谱目录，删空的图谱从目录中移除
+    session.execute_write(catalog.sync_scope, scope, value)
+    _after_delete(scope, value, owners)
+    return stats
 
 
 # 删除所有图谱
-def clear_all_graphs(session):
-    print("🚨 清除所有图谱...")
-    session.run("MATCH (n:Entity) WHERE n.graph_id IS NOT NULL DETACH DELETE n")
-    print("✅ 已清除所有图谱。")
+def clear_all_graphs(session, batch_size=DEFAULT_DELETE_BATCH_SIZE, progress=None, cancelled=None):
+    logger.warning("清除所有图谱")
+    stats = delete_batched(session, "all", None, batch_size, progress, cancelled)
+    logger.info("已清除所有图谱：%d 个实体，%d 条关系，%d 批%s",
+                stats["entities"], stats["relations"], stats["batches"], "（已取消）" if stats["cancelled"] else "")
+    return stats
 
 
 # 删除某个图谱
-def clear_graph_by_id(session, graph_id):
-    print(f"🚨 删除图谱 graph_id = {graph_id}")
-    session.run("MATCH (n:Entity {graph_id: $graph_id}) DETACH DELETE n", graph_id=graph_id)
-    print("✅ 删除完成。")
+def clear_graph_by_id(session, graph_id, batch_size=DEFAULT_DELETE_BATCH_SIZE, progress=None, cancelled=None):
+    logger.warning("删除图谱 graph_id = %s", graph_id)
+    stats = delete_batched(session, "graph", graph_id, batch_size, progress, cancelled)
+    logger.info("图谱 %s 删除%s：%d 个实体，%d 条关系，%d 批", graph_id, "已取消" if stats["cancelled"] else "完成",
+                stats["entities"], stats["relations"], stats["batches"])
+    return stats
 
 
 # 删除某用户所有图谱
-def clear_graphs_by_user(session, user_id):
-    print(f"🚨 删除用户 {user_id} 的所有图谱")
-    session.run("MATCH (n:Entity) WHERE n.user_id = $user_id DETACH DELETE n", user_id=user_id)
-    print("✅ 用户图谱删除完成。")
+def clear_graphs_by_user(session, user_id, batch_size=DEFAULT_DELETE_BATCH_SIZE, progress=None, cancelled=None):
+    logger.warning("删除用户 %s 的所有图谱", user_id)
+    stats = delete_batched(session, "user", user_id, batch_size, progress, cancelled)
+    logger.info("用户 %s 的图谱删除%s：%d 个实体，%d 条关系，%d 批", user_id, "已取消" if stats["cancelled"] else "完成",
+                stats["entities"], stats["relations"], stats["batches"])
+    return stats
 
 
-# 关键词查询某用户的实体
-def search_entities_by_keyword(session, user_id, keyword):
-    print(f"\n🔍 查询用户 {user_id} 下包含关键词 '{keyword}' 的实体：")
+# 关键词查询某用户的实体（全文索引，按相关度排序）
+@timed("search_entities_by_keyword")
+def search_entities_by_keyword(session, user_id, keyword, limit=search.DEFAULT_LIMIT, offset=0):
+    return search.search_entities(session, user_id, keyword, limit, offset)["results"]
 
-    result = session.run("""
-        MATCH (e:Entity)
-        WHERE e.user_id = $user_id AND e.name CONTAINS $keyword
-        RETURN e
-    """, user_id=user_id, keyword=keyword)
 
-    entities = []
-    for record in result:
-        entity = dict(record["e"])
-        print("  -", entity)
-        entities.append(entity)
+# 按名称查询时最多匹配的实体数
+DEFAULT_NAME_QUERY_LIMIT = 50
 
-    if not entities:
-        print("⚠️ 未找到相关实体。")
-    return entities
 
+# 以搜索结果为种子展开一跳邻居
+NAME_NEIGHBOURS_CYPHER = """
+OPTIONAL MATCH (e)-[r]-(n:Entity {graph_id: e.graph_id})
+RETURN properties(e) AS e, type(r) AS rel_type, properties(r) AS r, properties(n) AS n,
+       startNode(r) = e AS outgoing
+"""
 
-# 主函数
-def main():
-    user_id = "user_001"  # 模拟当前登录用户
-    file_path = "D:/A-trainingStore/Knowledge_Graph/extracted_result.json"
-    
-    with open(file_path, "r", encoding="utf-8") as file:
-        data = json.load(file)
 
-    graph_id = time.strftime("graph_%Y%m%d%H%M%S")
+# 按名称查询：名称匹配 name 的实体及其一跳邻居，返回与前端 graph.json 相同的 {entities, relations}。
+# 种子实体与关键词搜索相同（全文索引，单字退回用户或图谱内的 CONTAINS），user_id 与 graph_id 至少给出一个
+@timed("query_by_name")
+def query_by_name(session, name, user_id=None, graph_id=None, limit=DEFAULT_NAME_QUERY_LIMIT):
+    seeds, params, limit, _ = search.search_query(name, user_id, limit, graph_id=graph_id)
+    result = session.run("CALL {" + seeds + "}" + NAME_NEIGHBOURS_CYPHER, {**params, "limit": limit})
+    entities = {}
+    relations = {}
+    for record in result:
+        e = record["e"]
+        entities.setdefault(_node_key(e), e)
+        n = record["n"]
+        if n is None:
+            continue
+        entities.setdefault(_node_key(n), n)
+        source, target = (e, n) if record["outgoing"] else (n, e)
+        link = _build_link(_node_key(source), _node_key(target), record["r"], record["rel_type"])
+        # 两端都匹配时同一条边会出现两次
+        relations.setdefault((link["source"], link["target"], link["type"]), link)
+    return {
+        "entities": list(entities.values()),
+        "relations": list(relations.values())
+    }
+
+
+# 主函数（在 backend 目录下以 python -m kgapi.kg_writer 运行）
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="上传抽取结果到 Neo4j")
+    parser.add_argument("--json", default="D:/A-trainingStore/Knowledge_Graph/extracted_result.json",
+                        help="已有的抽取结果 JSON")
+    parser.add_argument("--text", help="直接抽取文本文件（结果走抽取缓存，重复上传同一文本不会重新跑模型）")
+    parser.add_argument("--user-id", default="user_001")  # 模拟当前登录用户
+    parser.add_argument("--graph-id", help="增量更新已有图谱；不指定时新建图谱")
+    parser.add_argument("--chunk-chars", type=int, help="--text 为长文档时按该字数分块读取和抽取，内存占用与文档长度无关")
+    parser.add_argument("--no-resolve", action="store_true", help="--text 抽取后不做实体消解（默认按 settings.KG_ENTITY_RESOLUTION）")
+    args = parser.parse_args(argv)
+
+    # 与 Web 进程共用查询缓存，写入后对应的缓存版本号才会更新
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    user_id = args.user_id
+
+    source_hash = None
+    if args.text:
+        from .extractor import extract_entities_relations, extract_long_document
+        with open(args.text, "r", encoding="utf-8") as file:
+            if args.chunk_chars:
+                data = extract_long_document(file, args.chunk_chars)
+            else:
+                text = file.read()
+                source_hash = catalog.source_hash(text)
+                data = extract_entities_relations(text)
+        from .resolution import resolution_enabled, resolve_entities
+        if resolution_enabled() and not args.no_resolve:
+            data = resolve_entities(data)
+    else:
+        with open(args.json, "r", encoding="utf-8") as file:
+            data = json.load(file)
+
+    graph_id = args.graph_id or time.strftime("graph_%Y%m%d%H%M%S")
 
-    with driver.session() as session:
-        # 上传知识图谱
-        create_entities(session, data["entities"], graph_id, user_id)
-        create_relations(session, data["relations"], data["entities"], graph_id, user_id)
+    with write_session() as session:
+        # 上传知识图谱：已有图谱只写入差异部分
+        if args.graph_id:
+            update_graph(session, data, graph_id, user_id, source_hash=source_hash)
+        else:
+            write_graph(session, data, graph_id, user_id, source_hash=source_hash)
 
         # 展示与测试功能
         query_graph(session, graph_id)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from kgapi import cache
+from kgapi.catalog import backfill_catalog
+from kgapi.neo4j_client import write_session
+
+
+class Command(BaseCommand):
+    help = "为已有图谱（包括 neo4j-admin 导入的数据）建立图谱目录节点（:Graph），并移除没有实体的目录节点"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--graph-id", help="只处理某个图谱，默认处理全部图谱")
+
+    def handle(self, *args, **options):
+        graph_id = options["graph_id"]
+        with write_session() as session:
+            stats = backfill_catalog(session, graph_id)
+        cache.bump(graph_id=graph_id)
+        self.stdout.write(self.style.SUCCESS(f"已登记 {stats['catalogued']} 个图谱，移除 {stats['pruned']} 个空目录节点"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from kgapi import cache
+from kgapi.neighbourhood import backfill_degrees
+from kgapi.neo4j_client import write_session
+
+
+class Command(BaseCommand):
+    help = "为已有实体计算度数（e.degree），邻域展开据此识别枢纽节点"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--graph-id", help="只处理某个图谱，默认处理全部图谱")
+
+    def handle(self, *args, **options):
+        graph_id = options["graph_id"]
+        with write_session() as session:
+            summary = backfill_degrees(session, graph_id)
+        cache.bump(graph_id=graph_id)
+        updated = summary.counters.properties_set if summary is not None else 0
+        self.stdout.write(self.style.SUCCESS(f"已更新 {updated} 个实体的度数"))
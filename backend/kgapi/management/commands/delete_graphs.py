@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from kgapi.kg_writer import DEFAULT_DELETE_BATCH_SIZE, delete_batched
+from kgapi.neo4j_client import write_session
+
+
+class Command(BaseCommand):
+    help = "分批删除图谱（每批一个事务），逐批输出进度；中途 Ctrl+C 停止时，已提交的批次不会回滚"
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument("--graph-id", help="删除一个图谱")
+        target.add_argument("--user-id", help="删除该用户的全部图谱")
+        target.add_argument("--all", action="store_true", help="删除全部图谱")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_DELETE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options["graph_id"]:
+            scope, value = "graph", options["graph_id"]
+        elif options["user_id"]:
+            scope, value = "user", options["user_id"]
+        else:
+            scope, value = "all", None
+
+        def progress(stats):
+            self.stdout.write(f"第 {stats['batches']} 批：已删除 {stats['relations']} 条关系、"
+                              f"{stats['entities']}/{stats['total_entities']} 个实体")
+
+        with write_session() as session:
+            try:
+                stats = delete_batched(session, scope, value, options["batch_size"], progress)
+            except KeyboardInterrupt:
+                raise CommandError("已中断，已提交的批次不会回滚")
+        self.stdout.write(self.style.SUCCESS(
+            f"已删除 {stats['entities']} 个实体、{stats['relations']} 条关系，共 {stats['batches']} 批"))
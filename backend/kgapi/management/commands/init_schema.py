@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from kgapi.neo4j_client import write_session
+from kgapi.schema import check_schema, init_schema
+
+
+class Command(BaseCommand):
+    help = "创建 Entity 的约束与索引；--check 只检查索引状态和查询计划"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="只检查，不创建")
+        parser.add_argument("--wait", type=int, default=300, help="等待索引上线的秒数")
+
+    def handle(self, *args, **options):
+        with write_session() as session:
+            if not options["check"]:
+                for name in init_schema(session, wait_seconds=options["wait"]):
+                    self.stdout.write(f"schema 就绪: {name}")
+            results = check_schema(session)
+
+        for item in results:
+            style = self.style.SUCCESS if item["ok"] else self.style.ERROR
+            self.stdout.write(style(f"{'✅' if item['ok'] else '❌'} {item['check']}: {item['detail']}"))
+
+        failed = [item["check"] for item in results if not item["ok"]]
+        if failed:
+            raise CommandError(f"schema 检查未通过: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS("schema 检查通过"))
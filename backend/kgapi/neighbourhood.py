@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+# 有界的邻域展开：以某个实体为起点按跳数广度优先展开，节点数、边数有上限，可按关系类型过滤。
+# 达到上限时返回游标，前端点击节点时再继续展开，不需要一次加载整个图谱。
+# 每个实体的度数（e.degree）在写入关系时预先计算，用来识别枢纽节点：默认只保留枢纽节点本身而不继续展开。
+import base64
+import json
+
+from .instrumentation import timed
+
+DEFAULT_HOPS = 1
+MAX_HOPS = 3
+DEFAULT_MAX_NODES = 200
+DEFAULT_MAX_EDGES = 500
+# 度数超过该值的实体视为枢纽节点
+DEFAULT_HUB_DEGREE = 50
+
+# 枢纽节点的处理方式：summarise 保留节点但不展开，drop 不返回，keep 与普通节点相同
+HUB_MODES = ("summarise", "drop", "keep")
+
+# 重新计算一批实体的度数（写入或删除关系后调用）
+DEGREE_CYPHER = """
+UNWIND $rows AS row
+MATCH (e:Entity {id: row.id})
+SET e.degree = COUNT { (e)--() }
+"""
+
+# 重新计算整个图谱（或全部图谱）的度数，用于补齐旧数据
+GRAPH_DEGREE_CYPHER = """
+MATCH (e:Entity)
+WHERE $graph_id IS NULL OR e.graph_id = $graph_id
+CALL {
+    WITH e
+    SET e.degree = COUNT { (e)--() }
+} IN TRANSACTIONS OF 1000 ROWS
+"""
+
+SEED_CYPHER = """
+MATCH (e:Entity {id: $seed_id, graph_id: $graph_id})
+RETURN properties(e) AS e
+"""
+
+# 按 (source_id, neighbour_id, 关系类型, 方向) 排序，after 是上一页最后一行的这四个值
+HOP_CYPHER = """
+UNWIND $frontier AS fid
+MATCH (a:Entity {id: fid})-[r]-(b:Entity {graph_id: $graph_id})
+WITH a, r, b, type(r) AS rel_type, startNode(r) = a AS outgoing
+WHERE ($rel_types IS NULL OR rel_type IN $rel_types)
+  AND ($max_degree IS NULL OR coalesce(b.degree, 0) <= $max_degree)
+  AND ($after IS NULL
+       OR a.id > $after[0]
+       OR (a.id = $after[0] AND (b.id > $after[1]
+           OR (b.id = $after[1] AND (rel_type > $after[2]
+               OR (rel_type = $after[2] AND outgoing > $after[3]))))))
+RETURN a.id AS source_id, b.id AS neighbour_id, rel_type, outgoing, properties(r) AS r, properties(b) AS b
+ORDER BY source_id, neighbour_id, rel_type, outgoing
+LIMIT $limit
+"""
+
+
+def encode_cursor(state):
+    payload = json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return {"hop": int(state["hop"]), "frontier": list(state["frontier"]),
+                "previous": list(state.get("previous", [])), "after": state.get("after"),
+                "next": list(state.get("next", []))}
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"无效的游标: {cursor}") from e
+
+
+def _is_hub(node, hub_degree):
+    return hub_degree is not None and (node.get("degree") or 0) > hub_degree
+
+
+# 从 seed_id 出发展开 hops 跳，返回 {nodes, links, truncated, next_cursor}。
+# 传入上一页的 next_cursor 时从中断处继续（返回的节点可能与之前重复，由调用方按 id 去重）
+@timed("expand_neighbourhood")
+def expand_neighbourhood(session, graph_id, seed_id, hops=DEFAULT_HOPS, max_nodes=DEFAULT_MAX_NODES,
+                         max_edges=DEFAULT_MAX_EDGES, rel_types=None, hub_degree=DEFAULT_HUB_DEGREE,
+                         hubs="summarise", cursor=None):
+    if hubs not in HUB_MODES:
+        raise ValueError(f"未知的枢纽节点处理方式: {hubs}")
+    hops = max(1, min(int(hops), MAX_HOPS))
+    if hubs == "keep":
+        hub_degree = None
+
+    nodes = {}
+    links = []
+    if cursor:
+        state = decode_cursor(cursor)
+    else:
+        seed = session.run(SEED_CYPHER, seed_id=seed_id, graph_id=graph_id).single()
+        if seed is None:
+            return None
+        nodes[seed_id] = {**seed["e"], "hub": _is_hub(seed["e"], hub_degree)}
+        # 起点即使是枢纽节点也展开，只受边数上限约束
+        state = {"hop": 0, "frontier": [seed_id], "previous": [], "after": None, "next": []}
+
+    truncated = False
+    while state["hop"] < hops and state["frontier"]:
+        budget = max_edges - len(links)
+        if budget <= 0:
+            truncated = True
+            break
+        rows = list(session.run(
+            HOP_CYPHER,
+            frontier=state["frontier"],
+            graph_id=graph_id,
+            rel_types=list(rel_types) if rel_types else None,
+            max_degree=hub_degree if hubs == "drop" else None,
+            after=state["after"],
+            limit=budget + 1
+        ))
+        frontier = set(state["frontier"])
+        previous = set(state["previous"])
+        queued = set(state["next"]) | frontier
+        for row in rows[:budget]:
+            neighbour_id = row["neighbour_id"]
+            # 指回上一跳的边已经在上一跳返回过；同一跳内两端都在 frontier 的边只从 id 较小的一端返回
+            if neighbour_id in previous or (neighbour_id in frontier and neighbour_id < row["source_id"]):
+                state["after"] = [row["source_id"], neighbour_id, row["rel_type"], row["outgoing"]]
+                continue
+            if neighbour_id not in nodes:
+                if len(nodes) >= max_nodes:
+                    truncated = True
+                    break
+                neighbour = row["b"]
+                hub = _is_hub(neighbour, hub_degree)
+                nodes[neighbour_id] = {**neighbour, "hub": hub}
+                if not hub and neighbour_id not in queued:
+                    state["next"].append(neighbour_id)
+                    queued.add(neighbour_id)
+            source, target = (row["source_id"], neighbour_id) if row["outgoing"] else (neighbour_id, row["source_id"])
+            props = row["r"] or {}
+            links.append({
+                "source": source,
+                "target": target,
+                "type": row["rel_type"],
+                "label": props.get("verb") or row["rel_type"],
+                **props
+            })
+            state["after"] = [row["source_id"], neighbour_id, row["rel_type"], row["outgoing"]]
+        if truncated or len(rows) > budget:
+            truncated = True
+            break
+        state = {"hop": state["hop"] + 1, "frontier": sorted(state["next"]), "previous": state["frontier"],
+                 "after": None, "next": []}
+
+    more = truncated and (state["hop"] < hops and (state["frontier"] or state["next"]))
+    return {
+        "graph_id": graph_id,
+        "seed": seed_id,
+        "nodes": list(nodes.values()),
+        "links": links,
+        "truncated": bool(truncated),
+        "next_cursor": encode_cursor(state) if more else None
+    }
+
+
+# 写入或删除关系后更新端点的度数，ids 为受影响的实体 id
+def refresh_degrees(tx, ids, batch_size=1000):
+    ids = sorted(set(ids))
+    for i in range(0, len(ids), batch_size):
+        tx.run(DEGREE_CYPHER, rows=[{"id": key} for key in ids[i:i + batch_size]]).consume()
+
+
+# 补齐已有数据的度数；graph_id 为空时处理所有图谱（CALL IN TRANSACTIONS 需要在自动提交事务中执行）
+def backfill_degrees(session, graph_id=None):
+    return session.run(GRAPH_DEGREE_CYPHER, graph_id=graph_id).consume()
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+# 进程内共享的 Neo4j 驱动：首次使用时按配置创建，每个工作进程只创建一次。
+# 异步驱动的连接绑定在事件循环上，因此按事件循环各创建一个。
+# 配置优先级：默认值 < 环境变量 NEO4J_* < Django settings.NEO4J
+import asyncio
+import os
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+
+from neo4j import READ_ACCESS, WRITE_ACCESS, AsyncGraphDatabase, GraphDatabase
+
+from .instrumentation import logger, metrics
+
+DEFAULTS = {
+    "URI": "bolt://localhost:7687",
+    "USER": "neo4j",
+    "PASSWORD": "testpassword",
+    "DATABASE": None,
+    # 连接池大小、获取连接的超时（秒）、单个连接的最长存活时间（秒）
+    "MAX_POOL_SIZE": 100,
+    "ACQUISITION_TIMEOUT": 60.0,
+    "MAX_CONNECTION_LIFETIME": 3600,
+    "CONNECTION_TIMEOUT": 30.0,
+    # execute_read / execute_write 对瞬时错误自动重试的总时长（秒）
+    "MAX_RETRY_TIME": 30.0,
+}
+
+_ENV_KEYS = {
+    "URI": ("NEO4J_URI", str),
+    "USER": ("NEO4J_USER", str),
+    "PASSWORD": ("NEO4J_PASSWORD", str),
+    "DATABASE": ("NEO4J_DB_NAME", str),
+    "MAX_POOL_SIZE": ("NEO4J_MAX_POOL_SIZE", int),
+    "ACQUISITION_TIMEOUT": ("NEO4J_ACQUISITION_TIMEOUT", float),
+    "MAX_CONNECTION_LIFETIME": ("NEO4J_MAX_CONNECTION_LIFETIME", float),
+    "CONNECTION_TIMEOUT": ("NEO4J_CONNECTION_TIMEOUT", float),
+    "MAX_RETRY_TIME": ("NEO4J_MAX_RETRY_TIME", float),
+}
+
+_lock = threading.Lock()
+_driver = None
+_driver_pid = None
+_active_sessions = 0
+_async_drivers = weakref.WeakKeyDictionary()
+_async_override = None
+
+
+def _config_from_env():
+    config = {}
+    # 兼容 docker-compose 使用的 NEO4J_AUTH=用户名/密码
+    auth = os.environ.get("NEO4J_AUTH")
+    if auth and "/" in auth:
+        config["USER"], config["PASSWORD"] = auth.split("/", 1)
+    for key, (env_name, cast) in _ENV_KEYS.items():
+        value = os.environ.get(env_name)
+        if value:
+            config[key] = cast(value)
+    return config
+
+
+def load_config():
+    config = dict(DEFAULTS)
+    config.update(_config_from_env())
+    try:
+        from django.conf import settings
+        if settings.configured:
+            config.update(getattr(settings, "NEO4J", {}))
+    except ImportError:
+        pass
+    return config
+
+
+def _driver_options(config):
+    return {
+        "auth": (config["USER"], config["PASSWORD"]),
+        "max_connection_pool_size": config["MAX_POOL_SIZE"],
+        "connection_acquisition_timeout": config["ACQUISITION_TIMEOUT"],
+        "max_connection_lifetime": config["MAX_CONNECTION_LIFETIME"],
+        "connection_timeout": config["CONNECTION_TIMEOUT"],
+        "max_transaction_retry_time": config["MAX_RETRY_TIME"],
+    }
+
+
+def _create_driver(config):
+    logger.info("创建 Neo4j 驱动 %s (pool=%s)", config["URI"], config["MAX_POOL_SIZE"])
+    return GraphDatabase.driver(config["URI"], **_driver_options(config))
+
+
+def _create_async_driver(config):
+    logger.info("创建 Neo4j 异步驱动 %s (pool=%s)", config["URI"], config["MAX_POOL_SIZE"])
+    return AsyncGraphDatabase.driver(config["URI"], **_driver_options(config))
+
+
+# 获取当前进程的驱动；fork 出的子进程会重新创建，不复用父进程的连接
+def get_driver():
+    global _driver, _driver_pid
+    pid = os.getpid()
+    if _driver is not None and _driver_pid == pid:
+        return _driver
+    with _lock:
+        if _driver is None or _driver_pid != pid:
+            _driver = _create_driver(load_config())
+            _driver_pid = pid
+    return _driver
+
+
+# 替换当前进程的驱动（测试和基准测试注入 FakeDriver 时使用），返回原驱动
+def set_driver(driver):
+    global _driver, _driver_pid
+    with _lock:
+        previous = _driver
+        _driver = driver
+        _driver_pid = os.getpid() if driver is not None else None
+    return previous
+
+
+def close_driver():
+    previous = set_driver(None)
+    if previous is not None:
+        previous.close()
+
+
+# 获取当前事件循环的异步驱动（ASGI 下每个工作进程通常只有一个事件循环）
+def get_async_driver():
+    if _async_override is not None:
+        return _async_override
+    loop = asyncio.get_running_loop()
+    driver = _async_drivers.get(loop)
+    if driver is None:
+        driver = _async_drivers[loop] = _create_async_driver(load_config())
+    return driver
+
+
+# 替换异步驱动（测试和基准测试注入 FakeAsyncDriver），对所有事件循环生效，返回原驱动
+def set_async_driver(driver):
+    global _async_override
+    previous = _async_override
+    _async_override = driver
+    return previous
+
+
+async def close_async_driver():
+    driver = _async_drivers.pop(asyncio.get_running_loop(), None)
+    if driver is not None:
+        await driver.close()
+
+
+@contextmanager
+def _session(access_mode):
+    global _active_sessions
+    database = load_config()["DATABASE"]
+    session = get_driver().session(database=database, default_access_mode=access_mode)
+    with _lock:
+        _active_sessions += 1
+    metrics.inc("kg_sessions_total", mode=access_mode)
+    try:
+        yield session
+    finally:
+        session.close()
+        with _lock:
+            _active_sessions -= 1
+
+
+def read_session():
+    return _session(READ_ACCESS)
+
+
+def write_session():
+    return _session(WRITE_ACCESS)
+
+
+# 异步读 session；并发查询需要各自打开一个 session，session 本身不能并发使用
+@asynccontextmanager
+async def async_read_session():
+    global _active_sessions
+    database = load_config()["DATABASE"]
+    session = get_async_driver().session(database=database, default_access_mode=READ_ACCESS)
+    with _lock:
+        _active_sessions += 1
+    metrics.inc("kg_async_sessions_total", mode=READ_ACCESS)
+    try:
+        yield session
+    finally:
+        await session.close()
+        with _lock:
+            _active_sessions -= 1
+
+
+# 在托管读事务中执行 fn(tx, ...)，瞬时错误由驱动按 MAX_RETRY_TIME 自动重试
+def run_read(fn, *args, **kwargs):
+    with read_session() as session:
+        return session.execute_read(fn, *args, **kwargs)
+
+
+def run_write(fn, *args, **kwargs):
+    with write_session() as session:
+        return session.execute_write(fn, *args, **kwargs)
+
+
+# 连接池状态：配置上限、本进程打开的 session 数，以及驱动内部连接池的占用（尽力而为）
+def pool_stats():
+    config = load_config()
+    stats = {
+        "pid": os.getpid(),
+        "initialised": _driver is not None and _driver_pid == os.getpid(),
+        "max_pool_size": config["MAX_POOL_SIZE"],
+        "acquisition_timeout": config["ACQUISITION_TIMEOUT"],
+        "max_connection_lifetime": config["MAX_CONNECTION_LIFETIME"],
+        "active_sessions": _active_sessions,
+        "addresses": {},
+    }
+    pool = getattr(_driver, "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections:
+        for address, conns in list(connections.items()):
+            conns = list(conns)
+            in_use = sum(1 for conn in conns if getattr(conn, "in_use", False))
+            stats["addresses"][str(address)] = {"open": len(conns), "in_use": in_use, "idle": len(conns) - in_use}
+    return stats
+
+
+# 健康检查：验证连通性并返回耗时与连接池状态
+def health():
+    started = time.perf_counter()
+    try:
+        get_driver().verify_connectivity()
+        status, error = "ok", None
+    except Exception as e:
+        status, error = "error", str(e)
+    result = {
+        "status": status,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        "pool": pool_stats(),
+    }
+    if error:
+        result["error"] = error
+    return result
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# 语料级批量抽取：读取目录或 JSONL 中的文档，用 nlp.pipe 批处理（可多进程），
+# 把每篇文档的 {"entities", "relations"} 逐行写入 JSONL。
+# 用法（在 backend 目录下）：python -m kgapi.pipeline corpus/ -o extracted.jsonl --batch-size 64 --n-process 4
+import argparse
+import json
+import os
+from collections import deque
+from itertools import chain
+
+from tqdm import tqdm
+
+from .extractor import get_extractor
+
+DEFAULT_BATCH_SIZE = 64
+
+
+# 逐篇读取文档：目录下的 .txt 文件（id 为文件名），或每行一个 {"id", "text"} 的 JSONL
+def iter_documents(path):
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".txt"):
+                with open(os.path.join(path, name), "r", encoding="utf-8") as f:
+                    yield {"id": os.path.splitext(name)[0], "text": f.read()}
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            yield {"id": record.get("id", str(line_no)), "text": record["text"]}
+
+
+def count_documents(path):
+    if os.path.isdir(path):
+        return sum(1 for name in os.listdir(path) if name.endswith(".txt"))
+    with open(path, "r", encoding="utf-8") as f:
+        return sum(1 for line in f if line.strip())
+
+
+# 批量抽取，产出 {"id", "entities", "relations"}。
+# 命中抽取缓存的文档直接产出，只有未命中的文档进入 nlp.pipe；全部命中时不会加载模型。
+# chunk_chars 不为空时，超过该长度的文档在本进程内分块抽取，不进入 nlp.pipe
+def extract_corpus(documents, batch_size=DEFAULT_BATCH_SIZE, n_process=1, chunk_chars=None):
+    extractor = get_extractor()
+    hits = deque()
+
+    def misses():
+        for document in documents:
+            if chunk_chars and len(document["text"]) > chunk_chars:
+                hits.append({"id": document["id"], **extractor.extract_chunked(document["text"], chunk_chars)})
+                continue
+            result = extractor.lookup(document["text"])
+            if result is None:
+                yield document["text"], document
+            else:
+                hits.append({"id": document["id"], **result})
+
+    pending = misses()
+    first = next(pending, None)
+    while hits:
+        yield hits.popleft()
+    if first is None:
+        return
+
+    docs = extractor.pipe(chain([first], pending), batch_size=batch_size, n_process=n_process, as_tuples=True)
+    for doc, document in docs:
+        while hits:
+            yield hits.popleft()
+        result = extractor.extract_doc(doc)
+        extractor.store(document["text"], result)
+        yield {"id": document["id"], **result}
+    while hits:
+        yield hits.popleft()
+
+
+# 把抽取结果流式写入 JSONL，返回写入的文档数
+def write_jsonl(results, output_path, total=None):
+    written = 0
+    with open(output_path, "w", encoding="utf-8") as f:
+        for result in tqdm(results, total=total, unit="doc", desc="抽取"):
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            written += 1
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量抽取实体与关系，输出 JSONL")
+    parser.add_argument("input", help="文本目录（*.txt）或 JSONL 文件（每行含 text 字段）")
+    parser.add_argument("-o", "--output", default="extracted.jsonl", help="输出 JSONL 路径")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--n-process", type=int, default=1)
+    parser.add_argument("--chunk-chars", type=int, help="超过该字数的文档分块抽取（按句切分，块间重叠一句）")
+    args = parser.parse_args(argv)
+
+    results = extract_corpus(iter_documents(args.input), batch_size=args.batch_size, n_process=args.n_process,
+                             chunk_chars=args.chunk_chars)
+    written = write_jsonl(results, args.output, total=count_documents(args.input))
+    print(f"✅ 已写入 {written} 篇文档的抽取结果: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
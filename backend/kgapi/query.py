@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+# 查询接口：图谱详情、用户图谱列表、关键词搜索和按名称查询（前端的 /api/query?name=xxx）。
+# 结果按 (user_id, graph_id, 查询) 缓存，带 ETag；客户端携带 If-None-Match 且版本未变时直接返回 304。
+# async/ 开头的接口是异步视图，在 ASGI 下通过 neo4j 异步驱动读取，不占用线程。
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET
+
+from . import async_queries, cache, neighbourhood, search, snapshot
+from .catalog import list_graph_summaries
+from .instrumentation import metrics
+from .kg_writer import query_by_name, query_graph
+from .neo4j_client import async_read_session, read_session
+
+
+def _bad_request(message):
+    return JsonResponse({"error": message}, status=400, json_dumps_params={"ensure_ascii": False})
+
+
+# 客户端已持有该版本时返回 True（忽略弱校验前缀 W/）
+def _not_modified(request, etag):
+    header = request.headers.get("If-None-Match")
+    if not header or etag is None:
+        return False
+    tags = parse_etags(header)
+    return "*" in tags or etag in [tag.removeprefix("W/") for tag in tags]
+
+
+# 客户端版本未变时返回 304，否则返回缓存中的结果（未命中为 None）
+def _lookup(request, key, etag):
+    if _not_modified(request, etag):
+        metrics.inc("kg_query_cache_total", result="not_modified")
+        return HttpResponseNotModified(), None
+    return None, cache.get(key) if key else None
+
+
+def _respond(response, payload, etag, kind):
+    if response is None:
+        response = JsonResponse(payload, json_dumps_params={"ensure_ascii": False})
+        metrics.inc("kg_response_bytes_total", len(response.content), kind=kind)
+    if etag:
+        response["ETag"] = etag
+    # 浏览器每次都带 If-None-Match 回来验证
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+# 先比较 ETag，再查缓存，最后才访问 Neo4j；compute(session) 返回可 JSON 序列化的结果
+def _cached_json(request, kind, compute, user_id=None, graph_id=None, query=None):
+    key, etag = cache.cache_key(kind, user_id, graph_id, query)
+    response, payload = _lookup(request, key, etag)
+    if response is None and payload is None:
+        with read_session() as session:
+            payload = compute(session)
+        if key:
+            cache.put(key, payload)
+    return _respond(response, payload, etag, kind)
+
+
+def _prepare(request, kind, user_id, graph_id, query):
+    key, etag = cache.cache_key(kind, user_id, graph_id, query)
+    return (key, etag, *_lookup(request, key, etag))
+
+
+# 异步版本：缓存操作（可能是文件 IO）合并成一次放到线程池执行，compute 是无参协程函数（自行打开 session）
+async def _cached_json_async(request, kind, compute, user_id=None, graph_id=None, query=None):
+    key, etag, response, payload = await sync_to_async(_prepare, thread_sensitive=False)(
+        request, kind, user_id, graph_id, query)
+    if response is None and payload is None:
+        payload = await compute()
+        if key:
+            await sync_to_async(cache.put, thread_sensitive=False)(key, payload)
+    return _respond(response, payload, etag, kind)
+
+
+# 单个图谱的全部节点与边
+@require_GET
+def graph_detail(request, graph_id):
+    def compute(session):
+        return {"graph_id": graph_id, **query_graph(session, graph_id)}
+    return _cached_json(request, "graph", compute, graph_id=graph_id)
+
+
+# 邻域展开：/graphs/<graph_id>/neighbourhood?seed=实体id&hops=1&max_nodes=200&max_edges=500
+#   &rel_types=A,B&hubs=summarise|drop|keep&hub_degree=50&cursor=...
+@require_GET
+def graph_neighbourhood(request, graph_id):
+    seed_id = request.GET.get("seed")
+    if not seed_id:
+        return _bad_request("需要 seed 参数")
+    hubs = request.GET.get("hubs", "summarise")
+    if hubs not in neighbourhood.HUB_MODES:
+        return _bad_request(f"hubs 只能是 {', '.join(neighbourhood.HUB_MODES)}")
+    try:
+        options = {
+            "hops": int(request.GET.get("hops", neighbourhood.DEFAULT_HOPS)),
+            "max_nodes": max(1, min(int(request.GET.get("max_nodes", neighbourhood.DEFAULT_MAX_NODES)), 2000)),
+            "max_edges": max(1, min(int(request.GET.get("max_edges", neighbourhood.DEFAULT_MAX_EDGES)), 5000)),
+            "hub_degree": int(request.GET.get("hub_degree", neighbourhood.DEFAULT_HUB_DEGREE)),
+        }
+    except ValueError:
+        return _bad_request("hops、max_nodes、max_edges、hub_degree 必须是整数")
+    rel_types = sorted(t for t in request.GET.get("rel_types", "").split(",") if t) or None
+    cursor = request.GET.get("cursor") or None
+    if cursor:
+        try:
+            neighbourhood.decode_cursor(cursor)
+        except ValueError as e:
+            return _bad_request(str(e))
+
+    def compute(session):
+        return neighbourhood.expand_neighbourhood(
+            session, graph_id, seed_id, rel_types=rel_types, hubs=hubs, cursor=cursor, **options
+        ) or {"graph_id": graph_id, "seed": seed_id, "nodes": [], "links": [], "truncated": False,
+              "next_cursor": None}
+    query = {"seed": seed_id, "rel_types": rel_types, "hubs": hubs, "cursor": cursor, **options}
+    return _cached_json(request, "neighbourhood", compute, graph_id=graph_id, query=query)
+
+
+# 图分析：在内存快照上计算，kind 为 degree / pagerank / components / path。
+# /graphs/<graph_id>/analytics/<kind> 与 /users/<user_id>/analytics/<kind>，
+# 排名类参数 top=20，path 需要 source、target（实体 id），directed=1 时按边的方向
+def _analytics(request, kind, graph_id=None, user_id=None):
+    if kind not in ANALYTICS:
+        return JsonResponse({"error": f"未知的分析类型: {kind}"}, status=404, json_dumps_params={"ensure_ascii": False})
+    if kind == "path":
+        source, target = request.GET.get("source"), request.GET.get("target")
+        if not source or not target:
+            return _bad_request("需要 source 和 target 参数")
+        options = {"source": source, "target": target, "directed": request.GET.get("directed") == "1"}
+    else:
+        try:
+            options = {"top": int(request.GET.get("top", snapshot.DEFAULT_TOP))}
+        except ValueError:
+            return _bad_request("top 必须是整数")
+
+    def compute(session):
+        snap = snapshot.snapshots.get(session, graph_id=graph_id, user_id=user_id)
+        scope = {"graph_id": graph_id} if graph_id is not None else {"user_id": user_id}
+        return {**scope, "kind": kind, "node_count": len(snap), "edge_count": snap.edge_count,
+                **ANALYTICS[kind](snap, **options)}
+    return _cached_json(request, f"analytics_{kind}", compute, user_id=user_id, graph_id=graph_id, query=options)
+
+
+ANALYTICS = {
+    "degree": snapshot.degree_ranking,
+    "pagerank": snapshot.pagerank_ranking,
+    "components": snapshot.component_summary,
+    "path": snapshot.path_between,
+}
+
+
+@require_GET
+def graph_analytics(request, graph_id, kind):
+    return _analytics(request, kind, graph_id=graph_id)
+
+
+@require_GET
+def user_analytics(request, user_id, kind):
+    return _analytics(request, kind, user_id=user_id)
+
+
+# 某个用户的所有图谱及其统计（图谱目录：实体数、关系数、创建时间、版本等）
+@require_GET
+def user_graphs(request, user_id):
+    def compute(session):
+        return {"user_id": user_id, "graphs": list_graph_summaries(session, user_id)}
+    return _cached_json(request, "user_graphs", compute, user_id=user_id)
+
+
+# 解析搜索参数，返回 (user_id, 关键词, limit, offset) 或错误响应
+def _search_params(request, text_param):
+    user_id = request.GET.get("user_id")
+    text = request.GET.get(text_param, "").strip()
+    if not user_id or not text:
+        return None, _bad_request(f"需要 user_id 和 {text_param} 参数")
+    try:
+        limit = int(request.GET.get("limit", search.DEFAULT_LIMIT))
+        offset = int(request.GET.get("offset", 0))
+    except ValueError:
+        return None, _bad_request("limit 和 offset 必须是整数")
+    return (user_id, text, limit, offset), None
+
+
+# 关键词搜索某个用户的实体（全文索引，按相关度排序）：/search?user_id=xxx&q=xxx&limit=20&offset=0
+@require_GET
+def search_view(request):
+    params, error = _search_params(request, "q")
+    if error:
+        return error
+    user_id, keyword, limit, offset = params
+
+    def compute(session):
+        return {"query": keyword, **search.search_entities(session, user_id, keyword, limit, offset)}
+    return _cached_json(request, "search", compute, user_id=user_id, query=[keyword, limit, offset])
+
+
+# 前缀补全：/search/autocomplete?user_id=xxx&prefix=xxx&limit=10。
+# 结果来自进程内 n-gram 索引，版本号未变时不访问 Neo4j，因此不再经过查询缓存
+@require_GET
+def autocomplete_view(request):
+    user_id = request.GET.get("user_id")
+    prefix = request.GET.get("prefix", "").strip()
+    if not user_id or not prefix:
+        return _bad_request("需要 user_id 和 prefix 参数")
+    try:
+        limit = int(request.GET.get("limit", search.DEFAULT_AUTOCOMPLETE_LIMIT))
+    except ValueError:
+        return _bad_request("limit 必须是整数")
+    with read_session() as session:
+        results = search.autocomplete(session, user_id, prefix, limit)
+    return JsonResponse({"prefix": prefix, "results": results}, json_dumps_params={"ensure_ascii": False})
+
+
+# 按名称查询实体及其一跳关系：/query?name=xxx&user_id=xxx 或 /query?name=xxx&graph_id=xxx（可同时给出）
+@require_GET
+def query_name(request):
+    name = request.GET.get("name", "").strip()
+    if not name:
+        return _bad_request("需要 name 参数")
+    user_id = request.GET.get("user_id") or None
+    graph_id = request.GET.get("graph_id") or None
+    if user_id is None and graph_id is None:
+        return _bad_request("需要 user_id 或 graph_id 参数")
+
+    def compute(session):
+        return query_by_name(session, name, user_id=user_id, graph_id=graph_id)
+    return _cached_json(request, "query", compute, user_id=user_id, graph_id=graph_id, query=name)
+
+
+# 异步：单个图谱的全部节点与边
+@require_GET
+async def graph_detail_async(request, graph_id):
+    async def compute():
+        return await async_queries.load_graph(graph_id)
+    return await _cached_json_async(request, "graph", compute, graph_id=graph_id)
+
+
+# 异步：某个用户的图谱目录；?full=1 时并发读取每个图谱的完整内容
+@require_GET
+async def user_graphs_async(request, user_id):
+    if request.GET.get("full") == "1":
+        async def compute():
+            return {"user_id": user_id, "graphs": await async_queries.load_user_graphs(user_id)}
+        return await _cached_json_async(request, "user_graphs_full", compute, user_id=user_id)
+
+    async def compute():
+        async with async_read_session() as session:
+            return {"user_id": user_id, "graphs": await async_queries.list_graph_summaries(session, user_id)}
+    return await _cached_json_async(request, "user_graphs", compute, user_id=user_id)
+
+
+# 异步：关键词搜索某个用户的实体
+@require_GET
+async def search_async(request):
+    params, error = _search_params(request, "q")
+    if error:
+        return error
+    user_id, keyword, limit, offset = params
+
+    async def compute():
+        async with async_read_session() as session:
+            page = await async_queries.search_entities(session, user_id, keyword, limit, offset)
+        return {"query": keyword, **page}
+    return await _cached_json_async(request, "search", compute, user_id=user_id, query=[keyword, limit, offset])
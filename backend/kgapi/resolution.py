@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+# 实体消解：在抽取（extractor）与写入（kg_writer / bulk_import）之间，把同一实体的不同写法归并为一个。
+# 1. 规范化：NFKC（全角转半角）、小写、去掉空白与标点；机构名去掉“有限公司”“Inc.”等组织形式与括号内的限定语，
+#    地名去掉“省”“市”等行政后缀。规范化后相同的名称直接视为同一实体。
+# 2. 分块（blocking）：规范化名称的二元组倒排索引，只和共享二元组的同类型名称比较，而不是两两比较；
+#    出现次数超过 max_block_size 的高频二元组不参与分块（打分时仍计入 Dice 系数）。
+# 3. 打分：二元组 Dice 系数超过阈值的候选，再用抽取器缓存的实体名向量核对——余弦相似度过低的排除，
+#    其余按 Dice 与余弦的加权分取最高者。名称向量区分不同名称的能力有限（对合成数据几乎都很相似），
+#    只用来排除与排序，不能把 Dice 不够的候选抬过阈值。
+#    人名、日期、数字等短名称或类型只做规范化后的精确匹配，不做模糊匹配。
+# 消解是增量的：同一个 EntityResolver 依次处理多篇文档时，后面的文档会归并到前面出现过的实体上，
+# 规范名称取该实体第一次出现的写法，其他写法记入 aliases。
+import argparse
+import json
+import re
+import unicodedata
+
+import numpy as np
+
+# Dice 系数须超过该值
+DEFAULT_THRESHOLD = 0.8
+# 名称向量的余弦相似度低于该值的候选排除（任一向量为零时不排除）
+MIN_COSINE = 0.5
+# 候选排序时 Dice 系数的权重，其余为余弦相似度
+TEXT_WEIGHT = 0.6
+# 规范化后少于该字数的名称只做精确匹配（“李明”与“李鸣”只差一个字，却是两个人）
+MIN_FUZZY_CHARS = 4
+# 倒排表长度超过该值的二元组（如“科技”“研究”）不用于分块
+MAX_BLOCK_SIZE = 100
+
+# 做模糊匹配的实体类型；其余类型（人名、地名、日期、金额、数字等）只做规范化后的精确匹配
+FUZZY_TYPES = frozenset({"Organization", "Product", "Work", "Event", "Facility", "Law", "Group"})
+
+ORG_SUFFIXES = ("股份有限公司", "有限责任公司", "有限公司", "股份公司", "公司")
+LOCATION_SUFFIXES = ("自治区", "省", "市", "区", "县")
+
+_PUNCT = re.compile(r"[\W_]+")
+# 英文组织形式只在独立成词时去掉（“Cisco” 不能变成 “cis”）
+_LEGAL_FORM = re.compile(r"(?:[\s,]+(?:inc|ltd|llc|co|corp|corporation|company|limited)\.?)+$")
+# 括号内的限定语：“深度智云（北京）有限公司”
+_QUALIFIER = re.compile(r"[(（][^()（）]*[)）]")
+
+
+def _strip_suffix(text, suffixes):
+    for suffix in suffixes:
+        # 至少保留两个字，“公司”本身不会被去成空串
+        if text.endswith(suffix) and len(text) - len(suffix) >= 2:
+            return text[:-len(suffix)]
+    return text
+
+
+# 消解使用的规范化名称；规范化后为空（名称全是标点）时退回原名
+def normalize_name(name, entity_type=None):
+    text = unicodedata.normalize("NFKC", name or "").lower().strip()
+    if entity_type == "Organization":
+        text = _LEGAL_FORM.sub("", _QUALIFIER.sub("", text))
+    text = _PUNCT.sub("", text)
+    if entity_type == "Organization":
+        text = _strip_suffix(text, ORG_SUFFIXES)
+    elif entity_type == "Location":
+        text = _strip_suffix(text, LOCATION_SUFFIXES)
+    return text or (name or "")
+
+
+def _bigrams(text):
+    if len(text) < 2:
+        return {text}
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+# 默认使用抽取器的实体名向量（带 LRU 缓存），第一次调用时加载模型
+def extractor_vector(name):
+    from .extractor import get_extractor
+    return get_extractor().entity_vector(name)[1]
+
+
+# 任一向量为零（名称不在词表中）时返回 None
+def _cosine(a, b):
+    norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(np.dot(a, b)) / norm if norm > 0 else None
+
+
+class EntityResolver:
+    # vector(name) 返回名称向量；为 None 时只按 Dice 系数打分
+    def __init__(self, threshold=DEFAULT_THRESHOLD, vector=extractor_vector, max_block_size=MAX_BLOCK_SIZE):
+        self.threshold = threshold
+        self.vector = vector
+        self.max_block_size = max_block_size
+        # 每个实体：{"name", "type", "aliases"}
+        self.clusters = []
+        # (类型, 规范化名称) -> 条目下标；条目为 (实体下标, 原名, 二元组集合)
+        self.keys = {}
+        self.entries = []
+        # (类型, 二元组) -> 条目下标列表，只收录可做模糊匹配的名称
+        self.postings = {}
+        self.stats = {"mentions": 0, "exact": 0, "fuzzy": 0, "new": 0, "comparisons": 0}
+
+    def _index(self, key, grams, entity_type, name, cluster, fuzzy):
+        entry = len(self.entries)
+        self.entries.append((cluster, name, frozenset(grams) if fuzzy else None))
+        self.keys[(entity_type, key)] = entry
+        if fuzzy:
+            for gram in grams:
+                self.postings.setdefault((entity_type, gram), []).append(entry)
+
+    # 分块后逐个打分，返回 Dice 超过阈值、未被名称向量排除且加权分最高的实体下标
+    def _best_candidate(self, name, grams, entity_type):
+        shared = {}
+        skipped = 0
+        for gram in grams:
+            posting = self.postings.get((entity_type, gram))
+            if posting is None:
+                continue
+            if len(posting) > self.max_block_size:
+                skipped += 1
+                continue
+            for entry in posting:
+                shared[entry] = shared.get(entry, 0) + 1
+
+        best, best_score = None, None
+        vector = None
+        for entry, count in shared.items():
+            cluster, other, other_grams = self.entries[entry]
+            # 先用上界（跳过的高频二元组都算共享）筛掉不可能超过阈值的候选，再计算准确的 Dice 系数
+            total = len(grams) + len(other_grams)
+            if 2 * (count + skipped) <= self.threshold * total:
+                continue
+            dice = 2 * (len(grams & other_grams) if skipped else count) / total
+            if dice <= self.threshold:
+                continue
+            self.stats["comparisons"] += 1
+            score = dice
+            if self.vector is not None:
+                if vector is None:
+                    vector = self.vector(name)
+                cosine = _cosine(vector, self.vector(other))
+                if cosine is not None:
+                    if cosine < MIN_COSINE:
+                        continue
+                    score = TEXT_WEIGHT * dice + (1 - TEXT_WEIGHT) * cosine
+            if best_score is None or score > best_score:
+                best, best_score = cluster, score
+        return best
+
+    # 归并一个实体提及，返回所属实体的下标
+    def add(self, name, entity_type):
+        self.stats["mentions"] += 1
+        key = normalize_name(name, entity_type)
+        entry = self.keys.get((entity_type, key))
+        if entry is not None:
+            cluster = self.entries[entry][0]
+            self.stats["exact"] += 1
+        else:
+            grams = _bigrams(key)
+            fuzzy = entity_type in FUZZY_TYPES and len(key) >= MIN_FUZZY_CHARS
+            cluster = self._best_candidate(name, grams, entity_type) if fuzzy else None
+            if cluster is None:
+                cluster = len(self.clusters)
+                self.clusters.append({"name": name, "type": entity_type, "aliases": []})
+                self.stats["new"] += 1
+            else:
+                self.stats["fuzzy"] += 1
+            self._index(key, grams, entity_type, name, cluster, fuzzy)
+
+        merged = self.clusters[cluster]
+        if name != merged["name"] and name not in merged["aliases"]:
+            merged["aliases"].append(name)
+        return cluster
+
+    # 消解一次抽取结果：实体换成规范名称并带上 aliases，重新编号为 e1、e2 …；
+    # 关系端点随之重映射，归并后首尾相同的关系丢弃，重复的关系只保留第一条
+    def resolve(self, data):
+        rows = {}
+        remap = {}
+        for entity in data["entities"]:
+            cluster = self.add(entity["name"], entity["type"])
+            row = rows.get(cluster)
+            if row is None:
+                merged = self.clusters[cluster]
+                row = rows[cluster] = {"id": f"e{len(rows) + 1}", "name": merged["name"], "type": merged["type"]}
+            remap[entity["id"]] = row["id"]
+        for cluster, row in rows.items():
+            row["aliases"] = list(self.clusters[cluster]["aliases"])
+
+        relations = {}
+        for relation in data["relations"]:
+            source = remap.get(relation["source"])
+            target = remap.get(relation["target"])
+            if source is None or target is None or source == target:
+                continue
+            relations.setdefault((source, target, relation["type"]),
+                                 {**relation, "source": source, "target": target})
+        return {"entities": list(rows.values()), "relations": list(relations.values())}
+
+
+# 单篇文档的实体消解
+def resolve_entities(data, threshold=DEFAULT_THRESHOLD, vector=extractor_vector):
+    return EntityResolver(threshold, vector).resolve(data)
+
+
+def resolution_enabled():
+    try:
+        from django.conf import settings
+        return getattr(settings, "KG_ENTITY_RESOLUTION", True)
+    except ImportError:
+        return True
+
+
+# 成对评估：predicted 与 labels 是同一组提及的实体编号，返回成对的精确率与召回率
+def pairwise_scores(predicted, labels):
+    def pairs(counts):
+        return sum(n * (n - 1) // 2 for n in counts.values())
+
+    both, by_predicted, by_label = {}, {}, {}
+    for p, label in zip(predicted, labels):
+        both[(p, label)] = both.get((p, label), 0) + 1
+        by_predicted[p] = by_predicted.get(p, 0) + 1
+        by_label[label] = by_label.get(label, 0) + 1
+    true_positive = pairs(both)
+    predicted_pairs, label_pairs = pairs(by_predicted), pairs(by_label)
+    return {
+        "precision": true_positive / predicted_pairs if predicted_pairs else 1.0,
+        "recall": true_positive / label_pairs if label_pairs else 1.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="对抽取结果做实体消解（合并同一实体的不同写法）")
+    parser.add_argument("input", help="kgapi.pipeline 输出的 JSONL，或单个 {entities, relations} JSON")
+    parser.add_argument("-o", "--output", required=True, help="输出路径，格式与输入相同")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--no-vectors", action="store_true", help="只按名称的二元组打分，不加载模型")
+    args = parser.parse_args(argv)
+
+    resolver = EntityResolver(args.threshold, None if args.no_vectors else extractor_vector)
+    with open(args.input, "r", encoding="utf-8") as f, open(args.output, "w", encoding="utf-8") as out:
+        if args.input.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    out.write(json.dumps({**record, **resolver.resolve(record)}, ensure_ascii=False) + "\n")
+        else:
+            json.dump(resolver.resolve(json.load(f)), out, ensure_ascii=False, indent=2)
+    stats = resolver.stats
+    print(f"✅ {stats['mentions']} 个实体提及归并为 {len(resolver.clusters)} 个实体"
+          f"（精确 {stats['exact']}，模糊 {stats['fuzzy']}，比较 {stats['comparisons']} 次）")
+
+
+if __name__ == "__main__":
+    main()
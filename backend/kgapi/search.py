@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+# 实体搜索：关键词搜索走 Neo4j 全文索引（cjk 分析器）并按相关度排序，支持 limit / offset；
+# 前缀补全（前端的“聚焦实体”输入框）优先使用进程内按用户建立的 n-gram 索引，写入时同步更新，
+# 其他进程写入后通过 kgapi.cache 的用户版本号发现并重新加载。
+import heapq
+import re
+import threading
+from collections import OrderedDict
+
+from . import cache
+from .instrumentation import logger, metrics, timed
+from .schema import FULLTEXT_INDEX_NAME
+
+DEFAULT_LIMIT = 20
+DEFAULT_AUTOCOMPLETE_LIMIT = 10
+# 分页上限，避免一次请求拉取过多结果
+MAX_LIMIT = 200
+
+# 进程内最多缓存多少个用户的 n-gram 索引，超出后淘汰最久未使用的用户
+DEFAULT_MAX_USERS = 100
+
+# cjk 分析器按相邻两字切分，单字查询无法命中全文索引，改为在该用户的实体中 CONTAINS 过滤
+FULLTEXT_SEARCH_CYPHER = """
+CALL db.index.fulltext.queryNodes($index, $query) YIELD node, score
+WHERE node.user_id = $user_id
+RETURN node AS e, score
+ORDER BY score DESC, node.name
+SKIP $offset LIMIT $limit
+"""
+
+SHORT_SEARCH_CYPHER = """
+MATCH (e:Entity)
+WHERE e.user_id = $user_id AND e.name CONTAINS $keyword
+RETURN e, 1.0 AS score
+ORDER BY size(e.name), e.name
+SKIP $offset LIMIT $limit
+"""
+
+# 限定在一个图谱内搜索（user_id 可选）：短关键词先用 graph_id 索引缩小到一个图谱
+GRAPH_FULLTEXT_SEARCH_CYPHER = """
+CALL db.index.fulltext.queryNodes($index, $query) YIELD node, score
+WHERE node.graph_id = $graph_id AND ($user_id IS NULL OR node.user_id = $user_id)
+RETURN node AS e, score
+ORDER BY score DESC, node.name
+SKIP $offset LIMIT $limit
+"""
+
+GRAPH_SHORT_SEARCH_CYPHER = """
+MATCH (e:Entity {graph_id: $graph_id})
+WHERE ($user_id IS NULL OR e.user_id = $user_id) AND e.name CONTAINS $keyword
+RETURN e, 1.0 AS score
+ORDER BY size(e.name), e.name
+SKIP $offset LIMIT $limit
+"""
+
+# 前缀查询可以使用 name 上的范围索引
+PREFIX_CYPHER = """
+MATCH (e:Entity)
+WHERE e.name STARTS WITH $prefix AND e.user_id = $user_id
+RETURN e.id AS id, e.name AS name, e.type AS type, e.graph_id AS graph_id
+ORDER BY size(e.name), e.name
+LIMIT $limit
+"""
+
+USER_ENTITIES_CYPHER = """
+MATCH (e:Entity)
+WHERE e.user_id = $user_id
+RETURN e.id AS id, e.name AS name, e.type AS type, e.graph_id AS graph_id
+"""
+
+_LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/]|&&|\|\|)')
+
+
+# 转义 Lucene 查询语法中的特殊字符，并作为短语查询（要求相邻，效果接近子串匹配）
+def fulltext_query(keyword):
+    return '"' + _LUCENE_SPECIAL.sub(r"\\\1", keyword.strip()) + '"'
+
+
+def _clamp(limit, offset):
+    return max(1, min(int(limit), MAX_LIMIT)), max(0, int(offset))
+
+
+# 关键词搜索：返回 {results, limit, offset, next_offset}，每个结果带相关度 score；多取一条判断是否还有下一页
+# graph_id 不为空时只在该图谱内搜索；user_id 与 graph_id 至少给出一个，不做全库扫描
+def search_query(keyword, user_id, limit=DEFAULT_LIMIT, offset=0, graph_id=None):
+    if user_id is None and graph_id is None:
+        raise ValueError("搜索需要 user_id 或 graph_id")
+    limit, offset = _clamp(limit, offset)
+    keyword = keyword.strip()
+    params = {"user_id": user_id, "offset": offset, "limit": limit + 1}
+    if graph_id is not None:
+        params["graph_id"] = graph_id
+    if len(keyword) < 2:
+        query = SHORT_SEARCH_CYPHER if graph_id is None else GRAPH_SHORT_SEARCH_CYPHER
+        return query, {**params, "keyword": keyword}, limit, offset
+    query = FULLTEXT_SEARCH_CYPHER if graph_id is None else GRAPH_FULLTEXT_SEARCH_CYPHER
+    return query, {**params, "index": FULLTEXT_INDEX_NAME, "query": fulltext_query(keyword)}, limit, offset
+
+
+def search_page(records, limit, offset):
+    results = [{**dict(record["e"]), "score": record["score"]} for record in records]
+    has_more = len(results) > limit
+    return {
+        "results": results[:limit],
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if has_more else None
+    }
+
+
+@timed("search_entities")
+def search_entities(session, user_id, keyword, limit=DEFAULT_LIMIT, offset=0):
+    query, params, limit, offset = search_query(keyword, user_id, limit, offset)
+    # 参数中有 query（全文查询串），只能作为字典传入，不能与 session.run 的第一个参数同名展开
+    return search_page(session.run(query, params), limit, offset)
+
+
+def _grams(text):
+    text = text.lower()
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+# 单个用户的 n-gram 索引：二元组 -> 实体 id 集合；单字查询用一元组
+class _UserIndex:
+    def __init__(self, version=None):
+        self.version = version
+        self.entities = {}
+        self.names = {}
+        self.bigrams = {}
+        self.chars = {}
+
+    def add(self, entity):
+        key = entity["id"]
+        if key in self.entities:
+            self.remove(key)
+        name = (entity["name"] or "").lower()
+        self.entities[key] = entity
+        self.names[key] = name
+        for gram in _grams(name):
+            self.bigrams.setdefault(gram, set()).add(key)
+        for char in set(name):
+            self.chars.setdefault(char, set()).add(key)
+
+    def remove(self, key):
+        if self.entities.pop(key, None) is None:
+            return
+        name = self.names.pop(key)
+        for table, grams in ((self.bigrams, _grams(name)), (self.chars, set(name))):
+            for gram in grams:
+                keys = table.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del table[gram]
+
+    def candidates(self, text):
+        text = text.lower()
+        if len(text) == 1:
+            return self.chars.get(text, set())
+        sets = sorted((self.bigrams.get(gram, set()) for gram in _grams(text)), key=len)
+        result = set(sets[0])
+        for keys in sets[1:]:
+            result &= keys
+            if not result:
+                break
+        return result
+
+    # 先按前缀匹配排序，其次是子串匹配；同类中名称越短越靠前。只取前 limit 个，不对全部候选排序
+    def complete(self, prefix, limit):
+        needle = prefix.lower()
+        names = self.names
+        ranked = heapq.nsmallest(limit, (
+            (name.find(needle) != 0, len(name), name, key)
+            for key, name in ((key, names[key]) for key in self.candidates(prefix))
+            if needle in name
+        ))
+        return [self.entities[key] for *_, key in ranked]
+
+
+class NgramIndex:
+    def __init__(self, max_users=DEFAULT_MAX_USERS):
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def loaded(self, user_id):
+        return user_id in self._users
+
+    def version(self, user_id):
+        index = self._users.get(user_id)
+        return None if index is None else index.version
+
+    # 用 Neo4j 中的全部实体重建某个用户的索引
+    def load(self, user_id, entities, version=None):
+        index = _UserIndex(version)
+        for entity in entities:
+            index.add(dict(entity))
+        with self._lock:
+            self._users[user_id] = index
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return index
+
+    # 写入后同步：只更新已经加载的用户，没有加载的用户下次补全时再从 Neo4j 读取
+    def add(self, user_id, graph_id, entities):
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is None:
+                return
+            for entity in entities:
+                index.add({"id": entity["id"], "name": entity["name"], "type": entity.get("type"),
+                           "graph_id": graph_id})
+
+    def remove(self, user_id, ids):
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is None:
+                return
+            for key in ids:
+                index.remove(key)
+
+    def stamp(self, user_id, version):
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None:
+                index.version = version
+
+    def drop_graph(self, graph_id):
+        with self._lock:
+            for index in self._users.values():
+                for key in [k for k, e in index.entities.items() if e.get("graph_id") == graph_id]:
+                    index.remove(key)
+
+    def drop_user(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def complete(self, user_id, prefix, limit=DEFAULT_AUTOCOMPLETE_LIMIT):
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is None:
+                return None
+            self._users.move_to_end(user_id)
+            return index.complete(prefix, limit)
+
+
+ngram_index = NgramIndex()
+
+
+def ngram_enabled():
+    try:
+        from django.conf import settings
+        return getattr(settings, "KG_SEARCH_NGRAM_INDEX", True)
+    except ImportError:
+        return True
+
+
+def user_version(user_id):
+    try:
+        return cache.versions(user_id=user_id)
+    except Exception as e:
+        logger.warning("读取用户 %s 的缓存版本号失败: %s", user_id, e)
+        return None
+
+
+# 本进程的索引是否需要跟踪该用户的写入
+def tracks(user_id):
+    return ngram_enabled() and ngram_index.loaded(user_id)
+
+
+# 写入并更新版本号之后调用：把新增与删除的实体同步到索引。
+# 写入前索引与 previous_version 一致时，同步后直接记为新版本；否则说明别的进程也写过，下次补全时重建
+def apply_write(user_id, graph_id, added=(), removed_ids=(), previous_version=None):
+    if not tracks(user_id):
+        return
+    current = previous_version is not None and ngram_index.version(user_id) == previous_version
+    ngram_index.remove(user_id, removed_ids)
+    ngram_index.add(user_id, graph_id, added)
+    if current:
+        ngram_index.stamp(user_id, user_version(user_id))
+
+
+# 前缀补全：n-gram 索引可用时在进程内完成（版本号变化时先从 Neo4j 重建），否则走 name 范围索引
+@timed("autocomplete")
+def autocomplete(session, user_id, prefix, limit=DEFAULT_AUTOCOMPLETE_LIMIT):
+    prefix = prefix.strip()
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    if not prefix:
+        return []
+    if not ngram_enabled():
+        return [dict(record) for record in session.run(PREFIX_CYPHER, user_id=user_id, prefix=prefix, limit=limit)]
+
+    version = user_version(user_id)
+    if not ngram_index.loaded(user_id) or (version is not None and ngram_index.version(user_id) != version):
+        metrics.inc("kg_ngram_index_loads_total")
+        ngram_index.load(user_id, session.run(USER_ENTITIES_CYPHER, user_id=user_id), version)
+    return ngram_index.complete(user_id, prefix, limit)
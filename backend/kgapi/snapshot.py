@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+# 图谱快照：把一个图谱（或一个用户的全部图谱）一次性读入内存，在进程内做度数、连通分量、PageRank、最短路径等分析，
+# 不再为每种分析各跑一次 Cypher。
+# 实体 id 映射为连续整数，邻接关系用 CSR（indptr / indices 两个 NumPy 数组）存储；需要 networkx 的算法时再按需转换。
+# 快照按 kgapi.cache 的版本号缓存，写入后版本号变化，下次使用时重新加载。
+import sys
+import threading
+from collections import OrderedDict
+
+import networkx as nx
+import numpy as np
+
+from . import cache
+from .instrumentation import logger, metrics, timed
+
+# 进程内最多缓存多少个快照，超出后淘汰最久未使用的
+DEFAULT_MAX_SNAPSHOTS = 8
+
+# 排名类分析默认返回的节点数
+DEFAULT_TOP = 20
+MAX_TOP = 1000
+
+# 快照只需要 id、名称、类型和边的类型，不读取其他属性
+SNAPSHOT_NODES_CYPHER = """
+MATCH (e:Entity)
+WHERE e.{field} = $value
+RETURN coalesce(e.id, e.name) AS id, e.name AS name, e.type AS type, e.graph_id AS graph_id
+"""
+
+SNAPSHOT_EDGES_CYPHER = """
+MATCH (a:Entity)-[r]->(b:Entity)
+WHERE a.{field} = $value AND b.graph_id = a.graph_id
+RETURN coalesce(a.id, a.name) AS source, coalesce(b.id, b.name) AS target, type(r) AS type
+"""
+
+
+# 字符串表：相同的类型名只存一份，数组中保存下标
+def _intern(table, codes, value):
+    code = codes.get(value)
+    if code is None:
+        code = codes[value] = len(table)
+        table.append(value)
+    return code
+
+
+# 按起点排序边，得到 CSR 的 indptr 与 indices（以及与 indices 对齐的 payload）
+def _csr(n, src, dst, payload):
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst[order].astype(np.int32), payload[order]
+
+
+# frontier 中所有节点的邻居，以及每个邻居来自哪个节点
+def _gather(indptr, indices, frontier):
+    starts = indptr[frontier]
+    counts = indptr[frontier + 1] - starts
+    total = int(counts.sum())
+    offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return indices[np.arange(total) + offsets], np.repeat(frontier, counts)
+
+
+class GraphSnapshot:
+    def __init__(self, ids, names, node_types, graph_ids, src, dst, rel_types, type_names, graph_names, version=None):
+        self.ids = ids
+        self.index = {key: i for i, key in enumerate(ids)}
+        self.names = names
+        self.node_types = node_types
+        self.graph_ids = graph_ids
+        self.type_names = type_names
+        self.graph_names = graph_names
+        self.indptr, self.indices, self.rel_types = _csr(len(ids), src, dst, rel_types)
+        self.version = version
+        self._reverse = None
+        self._nx = None
+
+    # nodes: [{id, name, type, graph_id}]，edges: [{source, target, type}]；端点不在 nodes 中的边被忽略
+    @classmethod
+    def from_records(cls, nodes, edges, version=None):
+        ids, names = [], []
+        node_types, graph_ids = [], []
+        type_names, type_codes = [], {}
+        graph_names, graph_codes = [], {}
+        index = {}
+        for row in nodes:
+            key = row["id"]
+            if key is None or key in index:
+                continue
+            index[key] = len(ids)
+            ids.append(key)
+            names.append(row.get("name"))
+            node_types.append(_intern(type_names, type_codes, row.get("type")))
+            graph_ids.append(_intern(graph_names, graph_codes, row.get("graph_id")))
+
+        src, dst, rel_types = [], [], []
+        for row in edges:
+            s = index.get(row["source"])
+            t = index.get(row["target"])
+            if s is None or t is None:
+                continue
+            src.append(s)
+            dst.append(t)
+            rel_types.append(_intern(type_names, type_codes, row.get("type")))
+
+        return cls(
+            ids, names,
+            np.array(node_types, dtype=np.int32), np.array(graph_ids, dtype=np.int32),
+            np.array(src, dtype=np.int32), np.array(dst, dtype=np.int32), np.array(rel_types, dtype=np.int32),
+            type_names, graph_names, version
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def edge_count(self):
+        return len(self.indices)
+
+    def node(self, i):
+        return {
+            "id": self.ids[i],
+            "name": self.names[i],
+            "type": self.type_names[self.node_types[i]],
+            "graph_id": self.graph_names[self.graph_ids[i]]
+        }
+
+    # 每条边的起点（与 indices 对齐）
+    def sources(self):
+        return np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.indptr))
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        return np.bincount(self.indices, minlength=len(self))
+
+    # 反向 CSR（终点 -> 起点），无向遍历时与正向合并使用
+    def reverse(self):
+        if self._reverse is None:
+            indptr, indices, _ = _csr(len(self), self.indices, self.sources(), self.rel_types)
+            self._reverse = (indptr, indices)
+        return self._reverse
+
+    # 与 networkx.pagerank 相同的幂迭代（平行边按权重累加，出度为 0 的节点均匀分配）
+    def pagerank(self, alpha=0.85, max_iter=100, tol=1.0e-6):
+        n = len(self)
+        if n == 0:
+            return np.zeros(0)
+        out = self.out_degree().astype(np.float64)
+        dangling = out == 0
+        src = self.sources()
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            previous = rank
+            share = np.divide(previous, out, out=np.zeros(n), where=~dangling)
+            rank = alpha * np.bincount(self.indices, weights=share[src], minlength=n)
+            rank += (alpha * previous[dangling].sum() + 1.0 - alpha) / n
+            if np.abs(rank - previous).sum() < n * tol:
+                return rank
+        logger.warning("PageRank 在 %d 次迭代内没有收敛", max_iter)
+        return rank
+
+    # 弱连通分量：返回每个节点所在分量的代表节点下标（分量内最小下标）。
+    # 按边把较大的根挂到较小的根上，再压缩路径，直到所有边两端的根相同
+    def components(self):
+        parent = np.arange(len(self), dtype=np.int64)
+        src, dst = self.sources(), self.indices
+        while True:
+            root_src, root_dst = parent[src], parent[dst]
+            differ = root_src != root_dst
+            if not differ.any():
+                return parent
+            low = np.minimum(root_src[differ], root_dst[differ])
+            high = np.maximum(root_src[differ], root_dst[differ])
+            np.minimum.at(parent, high, low)
+            while True:
+                grandparent = parent[parent]
+                if np.array_equal(grandparent, parent):
+                    break
+                parent = grandparent
+
+    # 把 frontier 扩展一层：返回新访问到的节点，以及其中已被另一侧访问过的节点（相遇点）
+    @staticmethod
+    def _step(frontier, adjacency, visited, other):
+        gathered = [_gather(indptr, indices, frontier) for indptr, indices in adjacency]
+        neighbours = np.concatenate([n for n, _ in gathered])
+        origins = np.concatenate([o for _, o in gathered])
+        fresh = visited[neighbours] < 0
+        frontier, first = np.unique(neighbours[fresh], return_index=True)
+        visited[frontier] = origins[fresh][first]
+        return frontier, frontier[other[frontier] >= 0]
+
+    # 无权最短路径：从两端按层双向广度优先，每次扩展较小的一侧；directed=False 时忽略边的方向，不可达时返回 None
+    def shortest_path(self, source_id, target_id, directed=False):
+        source = self.index.get(source_id)
+        target = self.index.get(target_id)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return [source_id]
+        forward, backward = (self.indptr, self.indices), self.reverse()
+        adjacency = ([forward], [backward]) if directed else ([forward, backward], [forward, backward])
+        pred = np.full(len(self), -1, dtype=np.int64)
+        succ = np.full(len(self), -1, dtype=np.int64)
+        pred[source], succ[target] = source, target
+        ahead = np.array([source], dtype=np.int64)
+        behind = np.array([target], dtype=np.int64)
+        while ahead.size and behind.size:
+            if ahead.size <= behind.size:
+                ahead, met = self._step(ahead, adjacency[0], pred, succ)
+            else:
+                behind, met = self._step(behind, adjacency[1], succ, pred)
+            if met.size:
+                return self._join(int(met[0]), source, target, pred, succ)
+        return None
+
+    def _join(self, middle, source, target, pred, succ):
+        path = [middle]
+        while path[-1] != source:
+            path.append(int(pred[path[-1]]))
+        path.reverse()
+        while path[-1] != target:
+            path.append(int(succ[path[-1]]))
+        return [self.ids[i] for i in path]
+
+    # networkx 视图（MultiDiGraph，边的 key 为关系类型），第一次调用时构建
+    def to_networkx(self):
+        if self._nx is None:
+            graph = nx.MultiDiGraph()
+            graph.add_nodes_from((self.ids[i], self.node(i)) for i in range(len(self)))
+            graph.add_edges_from(
+                (self.ids[s], self.ids[t], self.type_names[r])
+                for s, t, r in zip(self.sources().tolist(), self.indices.tolist(), self.rel_types.tolist())
+            )
+            self._nx = graph
+        return self._nx
+
+    # 粗略的内存占用（字节）：数组、id 与名称字符串、id -> 下标字典
+    def nbytes(self):
+        arrays = (self.indptr, self.indices, self.rel_types, self.node_types, self.graph_ids)
+        strings = sum(sys.getsizeof(s) for s in self.ids) + sum(sys.getsizeof(s) for s in self.names if s)
+        containers = sys.getsizeof(self.ids) + sys.getsizeof(self.names) + sys.getsizeof(self.index)
+        return sum(a.nbytes for a in arrays) + strings + containers
+
+
+# 按 graph_id 或 user_id 读取快照，两次查询（节点、边）
+def load_snapshot(session, graph_id=None, user_id=None, version=None):
+    field, value = ("graph_id", graph_id) if graph_id is not None else ("user_id", user_id)
+    with timed("load_snapshot") as timer:
+        nodes = session.run(SNAPSHOT_NODES_CYPHER.format(field=field), value=value)
+        edges = session.run(SNAPSHOT_EDGES_CYPHER.format(field=field), value=value)
+        snapshot = GraphSnapshot.from_records(nodes, edges, version)
+        timer.records = len(snapshot) + snapshot.edge_count
+        timer.bytes = snapshot.nbytes()
+    return snapshot
+
+
+class SnapshotCache:
+    def __init__(self, max_snapshots=DEFAULT_MAX_SNAPSHOTS):
+        self.max_snapshots = max_snapshots
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _version(graph_id, user_id):
+        try:
+            return cache.versions(user_id=user_id, graph_id=graph_id)
+        except Exception as e:
+            logger.warning("读取快照版本号失败: %s", e)
+            return None
+
+    # 版本号未变时返回缓存的快照，否则重新加载；拿不到版本号时不缓存
+    def get(self, session, graph_id=None, user_id=None):
+        key = ("graph", graph_id) if graph_id is not None else ("user", user_id)
+        version = self._version(graph_id, user_id if graph_id is None else None)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None and version is not None and snapshot.version == version:
+                self._snapshots.move_to_end(key)
+                metrics.inc("kg_snapshot_cache_total", result="hit")
+                return snapshot
+        metrics.inc("kg_snapshot_cache_total", result="miss")
+        snapshot = load_snapshot(session, graph_id=graph_id, user_id=user_id, version=version)
+        if version is not None:
+            with self._lock:
+                self._snapshots[key] = snapshot
+                self._snapshots.move_to_end(key)
+                while len(self._snapshots) > self.max_snapshots:
+                    self._snapshots.popitem(last=False)
+        return snapshot
+
+    def drop(self, graph_id=None, user_id=None):
+        with self._lock:
+            if graph_id is None and user_id is None:
+                self._snapshots.clear()
+                return
+            self._snapshots.pop(("graph", graph_id) if graph_id is not None else ("user", user_id), None)
+
+
+snapshots = SnapshotCache()
+
+
+def _ranking(snapshot, scores, top):
+    top = max(1, min(int(top), MAX_TOP, len(snapshot) or 1))
+    if not len(snapshot):
+        return []
+    best = np.argpartition(-scores, top - 1)[:top]
+    best = best[np.lexsort((best, -scores[best]))]
+    return [(int(i), scores[i]) for i in best]
+
+
+# 度数最高的节点（出度 + 入度）
+def degree_ranking(snapshot, top=DEFAULT_TOP):
+    out_degree, in_degree = snapshot.out_degree(), snapshot.in_degree()
+    return {"results": [
+        {**snapshot.node(i), "degree": int(score), "out_degree": int(out_degree[i]), "in_degree": int(in_degree[i])}
+        for i, score in _ranking(snapshot, out_degree + in_degree, top)
+    ]}
+
+
+@timed("pagerank_ranking")
+def pagerank_ranking(snapshot, top=DEFAULT_TOP):
+    return {"results": [
+        {**snapshot.node(i), "score": float(score)}
+        for i, score in _ranking(snapshot, snapshot.pagerank(), top)
+    ]}
+
+
+# 弱连通分量：分量总数与最大的 top 个分量（每个分量最多列出 top 个成员）
+def component_summary(snapshot, top=DEFAULT_TOP):
+    if not len(snapshot):
+        return {"count": 0, "components": []}
+    labels = snapshot.components()
+    roots, sizes = np.unique(labels, return_counts=True)
+    top = max(1, min(int(top), MAX_TOP))
+    order = np.lexsort((roots, -sizes))[:top]
+    return {"count": len(roots), "components": [
+        {"size": int(size), "members": [snapshot.node(int(i)) for i in np.flatnonzero(labels == root)[:top]]}
+        for root, size in zip(roots[order].tolist(), sizes[order].tolist())
+    ]}
+
+
+def path_between(snapshot, source, target, directed=False):
+    path = snapshot.shortest_path(source, target, directed)
+    if path is None:
+        return {"source": source, "target": target, "path": None}
+    return {"source": source, "target": target, "length": len(path) - 1,
+            "path": [snapshot.node(snapshot.index[key]) for key in path]}
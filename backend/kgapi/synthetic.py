@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# 合成数据：可复现的中文新闻语料与图谱，用于基准测试和离线压测。
+# 实体名按下标确定性生成（不同下标的名称一定不同），规模从一千到百万实体都不需要预先生成名称表；
+# 图谱的格式与抽取结果相同（{entities, relations}），可以直接交给 kg_writer 写入。
+# 用法：python -m kgapi.synthetic corpus --docs 1000 --entities 10000 -o corpus.jsonl
+#       python -m kgapi.synthetic graph --entities 100000 --degree 4 -o graph.json
+import argparse
+import json
+import random
+
+from .extractor import VERB_RELATION_MAP
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾"
+GIVEN = "伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉兰萍建国志红文斌海波辉鹏宇晨浩"
+ORG_CHARS = "深度智云未来中芯先进华东星河远航天合锐新汇通博瑞恒达盛安宏泰嘉信永创光启瀚海"
+ORG_SUFFIXES = ["科技公司", "集团", "研究院", "银行", "大学", "实验室", "医院", "投资公司"]
+CITIES = ["北京", "上海", "深圳", "广州", "杭州", "南京", "合肥", "成都", "武汉", "西安", "苏州", "天津"]
+PRODUCT_SUFFIXES = ["系统", "平台", "设备", "软件"]
+
+# 实体类型及其在语料和图谱中的占比
+ENTITY_TYPES = (("Person", 0.35), ("Organization", 0.4), ("Location", 0.1), ("Product", 0.15))
+
+# 同现关系以外的关系类型与动词
+VERBS = sorted(VERB_RELATION_MAP.items())
+
+SENTENCES = (
+    "{date}，{city}的{org}宣布与{org2}达成战略合作协议。",
+    "{org}的首席执行官{person}表示，公司将投资{money}在{city}建立研发中心。",
+    "{person}于{date}创立了{org}，此前曾在{org2}任职。",
+    "{org}收购了{org2}，交易金额为{money}。",
+    "{org}在{city}发布了智能{product}，预计{date}正式上线。",
+    "{person}和{person2}共同开发了智能{product}，该产品已获得{org}的支持。",
+)
+
+
+# 非负整数的确定性编码：按 len(chars) 进制展开，至少 width 位（不同的 n 得到不同的字符串）
+def _encode(n, chars, width=2):
+    digits = []
+    while n or len(digits) < width:
+        n, digit = divmod(n, len(chars))
+        digits.append(chars[digit])
+    return "".join(reversed(digits))
+
+
+def entity_name(entity_type, i):
+    if entity_type == "Person":
+        return SURNAMES[i % len(SURNAMES)] + _encode(i // len(SURNAMES), GIVEN, 1)
+    if entity_type == "Organization":
+        return _encode(i // len(ORG_SUFFIXES), ORG_CHARS) + ORG_SUFFIXES[i % len(ORG_SUFFIXES)]
+    if entity_type == "Location":
+        return CITIES[i] if i < len(CITIES) else _encode(i - len(CITIES), ORG_CHARS) + "市"
+    return _encode(i // len(PRODUCT_SUFFIXES), ORG_CHARS) + PRODUCT_SUFFIXES[i % len(PRODUCT_SUFFIXES)]
+
+
+# 各类型的实体数，合计为 n
+def type_counts(n):
+    counts = {entity_type: int(n * share) for entity_type, share in ENTITY_TYPES}
+    counts["Organization"] += n - sum(counts.values())
+    return counts
+
+
+def generate_entities(n):
+    entities = []
+    for entity_type, count in type_counts(n).items():
+        for i in range(count):
+            entities.append({"id": f"e{len(entities) + 1}", "name": entity_name(entity_type, i), "type": entity_type})
+    return entities
+
+
+# 偏向小下标的随机下标，使少数实体成为度数很高的枢纽节点
+def _skewed(rng, n):
+    return min(int(n * rng.random() ** 3), n - 1)
+
+
+# 合成图谱：n 个实体，平均每个实体 degree 条出边；约一半是动词关系，其余为带相似度的同现关系
+def generate_graph(n_entities, degree=4, seed=0):
+    rng = random.Random(seed)
+    entities = generate_entities(n_entities)
+    relations = []
+    seen = set()
+    for _ in range(int(n_entities * degree)):
+        source = rng.randrange(n_entities)
+        target = _skewed(rng, n_entities)
+        if source == target:
+            continue
+        if rng.random() < 0.5:
+            verb, rel_type = rng.choice(VERBS)
+            relation = {"type": rel_type, "verb": verb}
+        else:
+            relation = {"type": "CO_OCCURRENCE", "verb": "同现", "similarity": round(rng.uniform(0.15, 0.95), 3)}
+        key = (source, target, relation["type"])
+        if key in seen:
+            continue
+        seen.add(key)
+        relations.append({"source": entities[source]["id"], "target": entities[target]["id"], **relation})
+    return {"entities": entities, "relations": relations}
+
+
+def _date(rng):
+    return f"{rng.randint(2015, 2025)}年{rng.randint(1, 12)}月{rng.randint(1, 28)}日"
+
+
+def _money(rng):
+    return f"{rng.randint(1, 500)}{rng.choice(['万元', '亿元', '亿美元'])}"
+
+
+# 合成新闻语料：每篇 sentences 句，实体从规模为 n_entities 的名称空间中抽取（按偏斜分布，热门实体反复出现）
+def generate_corpus(n_docs, n_entities=10000, sentences=5, seed=0):
+    rng = random.Random(seed)
+    counts = type_counts(n_entities)
+
+    def pick(entity_type):
+        return entity_name(entity_type, _skewed(rng, max(counts[entity_type], 1)))
+
+    for i in range(n_docs):
+        text = "".join(
+            rng.choice(SENTENCES).format(
+                person=pick("Person"), person2=pick("Person"), org=pick("Organization"), org2=pick("Organization"),
+                city=pick("Location"), product=pick("Product"), date=_date(rng), money=_money(rng)
+            )
+            for _ in range(sentences)
+        )
+        yield {"id": f"doc{i + 1}", "text": text}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成合成语料或图谱")
+    sub = parser.add_subparsers(dest="command", required=True)
+    corpus = sub.add_parser("corpus", help="JSONL 语料，每行 {id, text}，可交给 kgapi.pipeline")
+    corpus.add_argument("--docs", type=int, default=1000)
+    corpus.add_argument("--entities", type=int, default=10000)
+    corpus.add_argument("--sentences", type=int, default=5)
+    graph = sub.add_parser("graph", help="{entities, relations} JSON，可交给 kg_writer --json")
+    graph.add_argument("--entities", type=int, default=10000)
+    graph.add_argument("--degree", type=float, default=4)
+    for command in (corpus, graph):
+        command.add_argument("--seed", type=int, default=0)
+        command.add_argument("-o", "--output", required=True)
+    args = parser.parse_args(argv)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        if args.command == "corpus":
+            for document in generate_corpus(args.docs, args.entities, args.sentences, args.seed):
+                f.write(json.dumps(document, ensure_ascii=False) + "\n")
+        else:
+            json.dump(generate_graph(args.entities, args.degree, args.seed), f, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# 进程内的 Neo4j 驱动替身：记录收到的 Cypher 与参数，不需要真实数据库。
+# 用于单元测试和离线基准测试，接口与 neo4j 官方驱动的 Driver / Session / Transaction 保持一致；
+# latency 模拟每次查询的网络往返耗时（同步版本阻塞线程，异步版本让出事件循环）。
+import asyncio
+import time
+
+
+class FakeSummary:
+    def __init__(self, query, parameters, plan=None):
+        self.query = query
+        self.parameters = parameters
+        self.plan = plan
+        self.profile = None
+
+
+class FakeResult:
+    def __init__(self, records, summary):
+        self._records = list(records)
+        self._summary = summary
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def single(self, strict=False):
+        if not self._records:
+            if strict:
+                raise ValueError("没有返回记录")
+            return None
+        return self._records[0]
+
+    def data(self):
+        return [dict(record) for record in self._records]
+
+    def consume(self):
+        return self._summary
+
+
+class FakeTransaction:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def run(self, query, parameters=None, **kwargs):
+        return self._driver._execute(query, parameters, kwargs)
+
+
+class FakeSession:
+    def __init__(self, driver, **config):
+        self._driver = driver
+        self.config = config
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.closed = True
+
+    def run(self, query, parameters=None, **kwargs):
+        return self._driver._execute(query, parameters, kwargs)
+
+    def execute_write(self, transaction_function, *args, **kwargs):
+        self._driver.write_transactions += 1
+        return transaction_function(FakeTransaction(self._driver), *args, **kwargs)
+
+    def execute_read(self, transaction_function, *args, **kwargs):
+        self._driver.read_transactions += 1
+        return transaction_function(FakeTransaction(self._driver), *args, **kwargs)
+
+
+class FakeDriver:
+    # responder(query, params) 返回记录列表（dict 列表），默认不返回任何记录；
+    # planner(query, params) 返回 summary.plan（EXPLAIN 的执行计划字典），默认为 None
+    def __init__(self, responder=None, latency=0.0, planner=None):
+        self.responder = responder
+        self.latency = latency
+        self.planner = planner
+        self.queries = []
+        self.write_transactions = 0
+        self.read_transactions = 0
+        self.closed = False
+
+    def session(self, **config):
+        return FakeSession(self, **config)
+
+    def verify_connectivity(self):
+        return None
+
+    def close(self):
+        self.closed = True
+
+    def _execute(self, query, parameters, kwargs):
+        params = dict(parameters or {})
+        params.update(kwargs)
+        self.queries.append((query, params))
+        if self.latency:
+            time.sleep(self.latency)
+        records = self.responder(query, params) if self.responder else []
+        plan = self.planner(query, params) if self.planner else None
+        return FakeResult(records or [], FakeSummary(query, params, plan))
+
+    # 所有通过 $rows 传入的批次，按发送顺序排列
+    @property
+    def batches(self):
+        return [params["rows"] for _, params in self.queries if "rows" in params]
+
+    def reset(self):
+        self.queries.clear()
+        self.write_transactions = 0
+        self.read_transactions = 0
+
+
+class FakeAsyncResult(FakeResult):
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        for record in self._records:
+            yield record
+
+    async def single(self, strict=False):
+        return FakeResult.single(self, strict)
+
+    async def data(self):
+        return FakeResult.data(self)
+
+    async def consume(self):
+        return self._summary
+
+
+class FakeAsyncTransaction:
+    def __init__(self, driver):
+        self._driver = driver
+
+    async def run(self, query, parameters=None, **kwargs):
+        return await self._driver._execute(query, parameters, kwargs)
+
+
+class FakeAsyncSession:
+    def __init__(self, driver, **config):
+        self._driver = driver
+        self.config = config
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        self.closed = True
+
+    async def run(self, query, parameters=None, **kwargs):
+        return await self._driver._execute(query, parameters, kwargs)
+
+    async def execute_read(self, transaction_function, *args, **kwargs):
+        self._driver.read_transactions += 1
+        return await transaction_function(FakeAsyncTransaction(self._driver), *args, **kwargs)
+
+    async def execute_write(self, transaction_function, *args, **kwargs):
+        self._driver.write_transactions += 1
+        return await transaction_function(FakeAsyncTransaction(self._driver), *args, **kwargs)
+
+
+class FakeAsyncDriver(FakeDriver):
+    def session(self, **config):
+        return FakeAsyncSession(self, **config)
+
+    async def verify_connectivity(self):
+        return None
+
+    async def close(self):
+        self.closed = True
+
+    async def _execute(self, query, parameters, kwargs):
+        params = dict(parameters or {})
+        params.update(kwargs)
+        self.queries.append((query, params))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        records = self.responder(query, params) if self.responder else []
+        return FakeAsyncResult(records or [], FakeSummary(query, params))
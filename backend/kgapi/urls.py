@@ -0,0 +1,27 @@
+from django.urls import path
+
+from . import query, views
+
+urlpatterns = [
+    path("graphs/<str:graph_id>", query.graph_detail, name="graph-detail"),
+    path("graphs/<str:graph_id>/neighbourhood", query.graph_neighbourhood, name="graph-neighbourhood"),
+    path("graphs/<str:graph_id>/analytics/<str:kind>", query.graph_analytics, name="graph-analytics"),
+    path("graphs/<str:graph_id>/stream", views.graph_stream, name="graph-stream"),
+    path("users/<str:user_id>/graphs", query.user_graphs, name="user-graphs"),
+    path("users/<str:user_id>/analytics/<str:kind>", query.user_analytics, name="user-analytics"),
+    path("search", query.search_view, name="search"),
+    path("search/autocomplete", query.autocomplete_view, name="autocomplete"),
+    path("query", query.query_name, name="query"),
+    path("async/graphs/<str:graph_id>", query.graph_detail_async, name="graph-detail-async"),
+    path("async/users/<str:user_id>/graphs", query.user_graphs_async, name="user-graphs-async"),
+    path("async/search", query.search_async, name="search-async"),
+    path("jobs", views.job_submit, name="job-submit"),
+    path("jobs/stats", views.job_stats, name="job-stats"),
+    path("jobs/delete", views.job_delete, name="job-delete"),
+    # 按任务键（graph_id，删除任务为 graph:<id> / user:<id>）查询，单独的前缀不会与 stats、delete 冲突
+    path("jobs/by-key/<str:graph_id>", views.job_status, name="job-status"),
+    path("jobs/by-key/<str:graph_id>/result", views.job_result, name="job-result"),
+    path("jobs/by-key/<str:graph_id>/cancel", views.job_cancel, name="job-cancel"),
+    path("metrics", views.metrics_view, name="metrics"),
+    path("health", views.health_view, name="health"),
+]
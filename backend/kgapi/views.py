@@ -0,0 +1,167 @@
+import json
+import time
+import uuid
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .instrumentation import metrics
+from .jobs import CANCELLED, DONE, FAILED, JobConflict, JobQueueFull, get_job_queue
+from .kg_writer import iter_graph
+from .neo4j_client import health, read_session
+
+# 每个 HTTP 分块包含的 NDJSON 行数
+STREAM_LINES_PER_CHUNK = 200
+
+
+def _encode_chunk(lines):
+    chunk = ("\n".join(lines) + "\n").encode("utf-8")
+    metrics.inc("kg_response_bytes_total", len(chunk), kind="graph_stream")
+    return chunk
+
+
+# 将 (kind, item) 序列编码为 NDJSON，并合并成较大的分块发送；字节数在这里顺带统计，不再单独编码
+def _ndjson_chunks(items, lines_per_chunk=STREAM_LINES_PER_CHUNK):
+    lines = []
+    for kind, item in items:
+        lines.append(json.dumps({"kind": kind, "data": item}, ensure_ascii=False, default=str))
+        if len(lines) >= lines_per_chunk:
+            yield _encode_chunk(lines)
+            lines = []
+    if lines:
+        yield _encode_chunk(lines)
+
+
+# 在响应迭代期间保持 session 打开，驱动返回一条就编码一条
+def _stream_graph(graph_id):
+    with read_session() as session:
+        yield from _ndjson_chunks(iter_graph(session, graph_id))
+
+
+# 流式导出图谱：每行一个 {"kind": "node"|"link", "data": {...}}
+@require_GET
+def graph_stream(request, graph_id):
+    response = StreamingHttpResponse(_stream_graph(graph_id), content_type="application/x-ndjson; charset=utf-8")
+    response["X-Accel-Buffering"] = "no"
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+# 查询函数的计数器与耗时直方图，默认 Prometheus 文本格式，?format=json 返回 JSON
+@require_GET
+def metrics_view(request):
+    if request.GET.get("format") == "json":
+        return JsonResponse(metrics.snapshot())
+    return HttpResponse(metrics.render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# 连通性与连接池状态，用于压测时调整连接池大小
+@require_GET
+def health_view(request):
+    result = health()
+    return JsonResponse(result, status=200 if result["status"] == "ok" else 503)
+
+
+def _json(payload, status=200):
+    return JsonResponse(payload, status=status, json_dumps_params={"ensure_ascii": False})
+
+
+# JSON 或表单参数；请求体不是合法 JSON 时返回 None
+def _params(request):
+    if request.content_type == "application/json":
+        try:
+            return json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+    return request.POST
+
+
+# 队列已满返回 429，同一键已有未完成任务返回 409；成功返回 202，Location 指向任务状态
+def _submitted(submit, *args, **kwargs):
+    try:
+        job = submit(*args, **kwargs)
+    except ValueError as e:
+        return _json({"error": str(e)}, status=400)
+    except JobConflict as e:
+        return _json({"error": str(e)}, status=409)
+    except JobQueueFull as e:
+        response = _json({"error": str(e)}, status=429)
+        response["Retry-After"] = "5"
+        return response
+    response = _json(job, status=202)
+    response["Location"] = f"jobs/by-key/{job['key']}"
+    return response
+
+
+# 提交抽取入库任务：JSON 或表单参数 text、user_id，可选 graph_id 与 mode（create / update）。
+# 立即返回 202，队列已满返回 429，同一图谱已有未完成任务返回 409
+@csrf_exempt
+@require_POST
+def job_submit(request):
+    params = _params(request)
+    if params is None:
+        return _json({"error": "请求体不是合法的 JSON"}, status=400)
+    text = params.get("text")
+    user_id = params.get("user_id")
+    if not text or not user_id:
+        return _json({"error": "需要 text 和 user_id 参数"}, status=400)
+    graph_id = params.get("graph_id") or time.strftime("graph_%Y%m%d%H%M%S_") + uuid.uuid4().hex[:6]
+
+    return _submitted(get_job_queue().submit, graph_id, user_id, text, mode=params.get("mode", "create"))
+
+
+# 提交删除任务：参数 graph_id（删除一个图谱）或 user_id（删除该用户的全部图谱）。
+# 删除分批进行，进度见 jobs/by-key/<key> 的 progress，执行中可以 POST jobs/by-key/<key>/cancel 取消
+@csrf_exempt
+@require_POST
+def job_delete(request):
+    params = _params(request)
+    if params is None:
+        return _json({"error": "请求体不是合法的 JSON"}, status=400)
+    graph_id = params.get("graph_id")
+    user_id = params.get("user_id")
+    if bool(graph_id) == bool(user_id):
+        return _json({"error": "需要 graph_id 或 user_id 参数（二选一）"}, status=400)
+    if graph_id:
+        return _submitted(get_job_queue().submit_delete, "graph", graph_id)
+    return _submitted(get_job_queue().submit_delete, "user", user_id)
+
+
+# 取消任务：排队中的任务立即取消，执行中的删除任务在当前批次提交后停止；已结束或无法取消时返回 409
+@csrf_exempt
+@require_POST
+def job_cancel(request, graph_id):
+    try:
+        job = get_job_queue().cancel(graph_id)
+    except JobConflict as e:
+        return _json({"error": str(e)}, status=409)
+    if job is None:
+        return _json({"error": f"没有 {graph_id} 的任务"}, status=404)
+    return _json(job, status=202 if job["status"] != CANCELLED else 200)
+
+
+# 任务状态
+@require_GET
+def job_status(request, graph_id):
+    job = get_job_queue().status(graph_id)
+    if job is None:
+        return _json({"error": f"没有图谱 {graph_id} 的任务"}, status=404)
+    return _json(job)
+
+
+# 任务结果：完成或已取消返回 200，失败返回 500，未结束返回 202 和当前状态
+@require_GET
+def job_result(request, graph_id):
+    job = get_job_queue().result(graph_id)
+    if job is None:
+        return _json({"error": f"没有图谱 {graph_id} 的任务"}, status=404)
+    if job["status"] in (DONE, CANCELLED):
+        return _json(job)
+    return _json(job, status=500 if job["status"] == FAILED else 202)
+
+
+# 队列深度、执行中任务数和各状态任务数
+@require_GET
+def job_stats(request):
+    return _json(get_job_queue().stats())
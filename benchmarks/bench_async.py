@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# 对比同步读路径与异步读路径的吞吐（requests/sec）：
+#   同步 WSGI：同步视图 + 固定大小线程池（相当于 gunicorn --threads N），
+#   同步 ASGI：同步视图在 ASGI 下由 Django 切到线程执行，
+#   异步 ASGI：async 视图 + neo4j 异步驱动。
+# 直接调用 Django 的 WSGI / ASGI 应用，Neo4j 由 FakeDriver / FakeAsyncDriver 代替，每次查询固定延迟 --latency 秒。
+# 用法：python benchmarks/bench_async.py --clients 50 100 200 --requests 2000 --latency 0.02 --sync-threads 8
+import argparse
+import asyncio
+import io
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+# 只测读路径本身：关闭查询缓存，每个请求都访问（替身）数据库
+settings.CACHES["kgapi"] = {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+settings.ALLOWED_HOSTS = ["*"]
+# 这些接口不用 session / 认证 / messages；同步中间件在 ASGI 下每个都要切一次线程，会掩盖读路径本身的差异
+if "--all-middleware" not in sys.argv:
+    settings.MIDDLEWARE = ["django.middleware.common.CommonMiddleware"]
+django.setup()
+
+from django.core.asgi import get_asgi_application  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+
+from kgapi import neo4j_client  # noqa: E402
+from kgapi.testing import FakeAsyncDriver, FakeDriver  # noqa: E402
+
+
+# 每个图谱 nodes 个节点连成一条链
+def make_responder(nodes):
+    def responder(query, params):
+        graph_id = params.get("graph_id", "g")
+        entities = [{"id": f"{graph_id}-e{i}", "name": f"实体{i}", "graph_id": graph_id} for i in range(nodes)]
+        rows = []
+        for a, b in zip(entities, entities[1:] + [None]):
+            rows.append({"a": a, "rel_type": "RELATED" if b else None, "r": {"verb": "相关"} if b else None, "b": b})
+        return rows
+    return responder
+
+
+async def request(app, path):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"localhost")], "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+    }
+    status = None
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    finished = asyncio.Event()
+
+    # 请求体之后一直等到响应结束（Django 会在另一个任务里监听断开）
+    async def receive():
+        if messages:
+            return messages.pop()
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    finished.set()
+    return status
+
+
+def wsgi_request(app, path):
+    environ = {
+        "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": "", "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80", "HTTP_HOST": "localhost", "wsgi.input": io.BytesIO(), "wsgi.errors": sys.stderr,
+        "wsgi.url_scheme": "http",
+    }
+    status = []
+    response = app(environ, lambda s, headers, exc_info=None: status.append(s))
+    b"".join(response)
+    response.close()
+    return int(status[0].split()[0])
+
+
+# call(path) 是返回状态码的协程函数；clients 个客户端共发出 total 个请求
+async def run_load(call, prefix, clients, total):
+    counter = itertools.count()
+    failures = 0
+
+    async def client():
+        nonlocal failures
+        while True:
+            i = next(counter)
+            if i >= total:
+                return
+            if await call(f"{prefix}graphs/g{i}") != 200:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return total / (time.perf_counter() - started), failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.02, help="每次查询的模拟往返耗时（秒）")
+    parser.add_argument("--nodes", type=int, default=50)
+    parser.add_argument("--all-middleware", action="store_true", help="保留 settings 中的全部中间件")
+    parser.add_argument("--sync-threads", type=int, default=8, help="同步 WSGI 的线程数")
+    args = parser.parse_args()
+
+    responder = make_responder(args.nodes)
+    neo4j_client.set_driver(FakeDriver(responder, latency=args.latency))
+    neo4j_client.set_async_driver(FakeAsyncDriver(responder, latency=args.latency))
+    asgi_app = get_asgi_application()
+    wsgi_app = get_wsgi_application()
+    pool = ThreadPoolExecutor(max_workers=args.sync_threads)
+
+    async def call_wsgi(path):
+        return await asyncio.get_running_loop().run_in_executor(pool, wsgi_request, wsgi_app, path)
+
+    async def call_asgi(path):
+        return await request(asgi_app, path)
+
+    runs = [
+        (f"同步 WSGI({args.sync_threads}线程)", call_wsgi, "/"),
+        ("同步 ASGI", call_asgi, "/"),
+        ("异步 ASGI", call_asgi, "/async/"),
+    ]
+    print(f"模拟查询延迟 {args.latency * 1000:.0f}ms，每个图谱 {args.nodes} 个节点，共 {args.requests} 个请求")
+    print(f"{'并发客户端':>10}" + "".join(f"{name:>20}" for name, _, _ in runs) + f"{'异步/同步WSGI':>14}")
+    for clients in args.clients:
+        rates = []
+        for name, call, prefix in runs:
+            rate, failures = asyncio.run(run_load(call, prefix, clients, args.requests))
+            if failures:
+                print(f"  {name} 失败请求 {failures}")
+            rates.append(rate)
+        print(f"{clients:>10}" + "".join(f"{rate:>20.1f}" for rate in rates) + f"{rates[2] / rates[0]:>13.2f}x")
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
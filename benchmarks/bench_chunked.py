@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# 长文档抽取的峰值内存：整篇解析（extract_entities_relations）与分块抽取（extract_long_document）对比。
+# 文档由 kgapi.synthetic 生成并写入临时文件，每种方式在全新子进程中运行，峰值内存取 ru_maxrss（含模型本身）。
+# 整篇解析超过 nlp.max_length 时会报错，这里临时调大上限以便对比。
+# 用法：python benchmarks/bench_chunked.py --chars 200000 800000 --chunk-chars 5000
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+from kgapi import synthetic  # noqa: E402
+
+PROBE = """
+import json, resource, sys, time
+sys.path.insert(0, {backend!r})
+from kgapi import extractor
+extractor.warm_up()
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+started = time.perf_counter()
+with open({path!r}, "r", encoding="utf-8") as f:
+    {action}
+seconds = time.perf_counter() - started
+# 整篇解析按提及逐个列出实体，这里统一按 (名称, 类型) 计数
+entities = len({{(e["name"], e["type"]) for e in result["entities"]}})
+print(json.dumps({{"seconds": seconds, "entities": entities, "relations": len(result["relations"]),
+                  "baseline_mb": baseline, "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+CASES = {
+    "整篇解析": "text = f.read(); extractor.nlp.max_length = len(text) + 1; "
+               "result = extractor.extract_entities_relations(text)",
+    "分块抽取": "result = extractor.extract_long_document(f, {chunk_chars})",
+}
+
+
+def write_document(path, chars):
+    with open(path, "w", encoding="utf-8") as f:
+        written = 0
+        seed = 0
+        while written < chars:
+            for document in synthetic.generate_corpus(1000, n_entities=5000, seed=seed):
+                f.write(document["text"] + "\n")
+                written += len(document["text"]) + 1
+                if written >= chars:
+                    break
+            seed += 1
+    return written
+
+
+def probe(action, path):
+    code = PROBE.format(backend=BACKEND_DIR, path=path, action=action)
+    # 关闭抽取缓存，两种方式都真正解析
+    env = {**os.environ, "KG_EXTRACTION_CACHE_PATH": ""}
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chars", type=int, nargs="+", default=[200000, 800000])
+    parser.add_argument("--chunk-chars", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for chars in args.chars:
+            path = os.path.join(directory, f"doc_{chars}.txt")
+            written = write_document(path, chars)
+            print(f"文档 {written} 字")
+            for name, action in CASES.items():
+                r = probe(action.format(chunk_chars=args.chunk_chars), path)
+                print(f"  {name:<8} {r['seconds']:8.1f} s  峰值内存 {r['max_rss_mb']:7.1f} MB"
+                      f"（模型加载后 {r['baseline_mb']:.1f} MB）  实体 {r['entities']}  关系 {r['relations']}")
+
+
+if __name__ == "__main__":
+    main()
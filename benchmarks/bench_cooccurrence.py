@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# 同现关系生成的规模测试：在含数千实体的合成 Doc 上对比旧的逐句重扫 + any() 实现与
+# 按句索引 + 关系集合的实现，并校验两者输出一致。
+# 用法：python benchmarks/bench_cooccurrence.py --entities 500 1000 2000 4000 --per-sentence 8
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from spacy.tokens import Doc  # noqa: E402
+
+from kgapi import extractor  # noqa: E402
+
+NAMES = {
+    "ORG": ["深度智云", "未来科技", "中芯先进", "华东科技大学", "星河数据", "蓝海智能"],
+    "PERSON": ["李明", "王建国", "李志强", "张教授", "陈晓", "赵磊"],
+    "GPE": ["北京", "上海", "深圳", "南京", "合肥", "杭州"],
+    "DATE": ["2023年6月15日", "2024年3月", "2023年12月20日"],
+}
+FILLER = ["宣布", "与", "在", "的", "合作"]
+
+
+# 生成合成 Doc：每句 per_sentence 个实体，实体之间夹一个填充词，句末为句号
+def synthetic_doc(n_entities, per_sentence, seed=0):
+    rng = random.Random(seed)
+    words, ents, sent_starts = [], [], []
+    labels = list(NAMES)
+    for k in range(n_entities):
+        if k % per_sentence == 0 and k:
+            words.append("。")
+            ents.append("O")
+            sent_starts.append(False)
+        label = rng.choice(labels)
+        words.append(rng.choice(NAMES[label]))
+        ents.append(f"B-{label}")
+        sent_starts.append(k % per_sentence == 0)
+        words.append(rng.choice(FILLER))
+        ents.append("O")
+        sent_starts.append(False)
+    return Doc(extractor.nlp.vocab, words=words, ents=ents, sent_starts=sent_starts)
+
+
+def doc_entities(doc):
+    return [
+        {"id": f"e{i + 1}", "name": ent.text, "type": ent.label_, "start": ent.start, "end": ent.end}
+        for i, ent in enumerate(doc.ents)
+    ]
+
+
+# 改造前的实现：每句重新过滤全部实体，每个实体对扫描整个关系列表
+def legacy_cooccurrence(doc, entities, relations):
+    relations = list(relations)
+    for sent in doc.sents:
+        sent_entities = [ent for ent in entities if ent['start'] < len(doc) and doc[ent['start']].sent == sent]
+        if len(sent_entities) >= 2:
+            sims = extractor.similarity_matrix([ent['name'] for ent in sent_entities])
+            for i in range(len(sent_entities)):
+                for j in range(i + 1, len(sent_entities)):
+                    if sent_entities[i]['type'] == sent_entities[j]['type']:
+                        continue
+                    has_relation = any(
+                        (r['source'] == sent_entities[i]['id'] and r['target'] == sent_entities[j]['id']) or
+                        (r['source'] == sent_entities[j]['id'] and r['target'] == sent_entities[i]['id'])
+                        for r in relations
+                    )
+                    if not has_relation:
+                        similarity = float(sims[i, j])
+                        if similarity > 0.15:
+                            relations.append({
+                                "source": sent_entities[i]["id"],
+                                "target": sent_entities[j]["id"],
+                                "type": "co-occurrence",
+                                "verb": "同现",
+                                "similarity": round(similarity, 2)
+                            })
+    return relations
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entities", type=int, nargs="+", default=[500, 1000, 2000, 4000])
+    parser.add_argument("--per-sentence", type=int, default=8)
+    parser.add_argument("--max-pairs", type=int, default=None, help="单句同现关系上限")
+    args = parser.parse_args()
+
+    print(f"{'实体数':>8} {'旧实现 ms':>12} {'新实现 ms':>12} {'加速':>8} {'关系数':>8}")
+    for n in args.entities:
+        doc = synthetic_doc(n, args.per_sentence)
+        entities = doc_entities(doc)
+        extractor.similarity_matrix([e["name"] for e in entities[:1]])  # 预热向量缓存
+
+        started = time.perf_counter()
+        legacy = legacy_cooccurrence(doc, entities, [])
+        old_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        new = extractor.cooccurrence_relations(doc, entities, [], args.max_pairs)
+        new_ms = (time.perf_counter() - started) * 1000
+
+        if args.max_pairs is None:
+            assert legacy == new, "新旧实现输出不一致"
+        print(f"{n:>8} {old_ms:>12.1f} {new_ms:>12.1f} {old_ms / max(new_ms, 1e-9):>7.1f}x {len(new):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# 实体密集文本上的规则实体合并：改造前 on_match 回调 + 逐个 add_ent（每次重建 doc.ents）
+# 与 kg_entity_merger 组件单次合并的对比。
+# 用法：python benchmarks/bench_entity_merge.py --tokens 2000 5000 10000
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+import spacy  # noqa: E402
+from spacy.matcher import Matcher  # noqa: E402
+from spacy.tokens import Doc  # noqa: E402
+
+from kgapi.extractor import EntityMerger  # noqa: E402
+
+# 大约一半的词会被规则命中，另有一部分作为模型实体预先标注
+WORDS = ["深度智云公司", "华东科技大学", "中芯集团", "首席", "执行官", "智能", "客服系统", "新型", "药物",
+         "宣布", "与", "的", "合作", "北京", "李明"]
+MODEL_ENTS = {"北京": "GPE", "李明": "PERSON"}
+
+
+def dense_doc(vocab, n_tokens, seed=0):
+    rng = random.Random(seed)
+    words = [rng.choice(WORDS) for _ in range(n_tokens)]
+    ents = [f"B-{MODEL_ENTS[w]}" if w in MODEL_ENTS else "O" for w in words]
+    return Doc(vocab, words=words, spaces=[False] * n_tokens, ents=ents)
+
+
+# 改造前的实现（原样保留），用于对比
+def legacy_add_ent(doc, matches, label):
+    new_ents = list(doc.ents)
+    token_indices = set(token.i for ent in new_ents for token in ent)
+    for match_id, start, end in matches:
+        if any(i in token_indices for i in range(start, end)):
+            continue
+        span = doc.char_span(doc[start].idx, doc[end - 1].idx + len(doc[end - 1]), label=label, alignment_mode="expand")
+        if span is not None:
+            new_ents.append(span)
+            token_indices.update(range(span.start, span.end))
+    doc.ents = new_ents
+
+
+def legacy_matcher(vocab):
+    matcher = Matcher(vocab)
+    for label, patterns in (
+        ("ORG", [[{"TEXT": {"REGEX": r"[^\s]+(公司|集团|企业|中心|研究院|银行|大学|学院|医院|实验室)$"}}]]),
+        ("PRODUCT", [[{"TEXT": "智能"}, {"TEXT": {"REGEX": r"[^\s]+(系统|平台|设备|工具|软件|应用)$"}}],
+                     [{"TEXT": "新型"}, {"TEXT": {"REGEX": r"[^\s]+(技术|产品|药物|方法)$"}}]]),
+        ("TITLE", [[{"TEXT": {"IN": ["首席", "总裁", "副总裁", "总经理", "副总经理", "主席", "副主席", "主任", "副主任"]}},
+                    {"TEXT": {"IN": ["执行官", "科学家", "工程师", "教授", "医生", "律师", "分析师"]}}]]),
+    ):
+        matcher.add(label, patterns, on_match=lambda _, doc, i, matches, label=label: legacy_add_ent(doc, matches, label))
+    return matcher
+
+
+def legacy_merge(matcher, doc):
+    for match_id, start, end in matcher(doc):
+        legacy_add_ent(doc, [(match_id, start, end)], doc.vocab.strings[match_id])
+    return doc
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, nargs="+", default=[2000, 5000, 10000])
+    args = parser.parse_args()
+
+    vocab = spacy.blank("zh").vocab
+    old_matcher = legacy_matcher(vocab)
+    merger = EntityMerger(vocab)
+
+    print(f"{'词数':>8} {'旧实现 ms':>12} {'新组件 ms':>12} {'加速':>8} {'实体数':>8}")
+    for n in args.tokens:
+        doc = dense_doc(vocab, n)
+        started = time.perf_counter()
+        legacy_merge(old_matcher, doc)
+        old_ms = (time.perf_counter() - started) * 1000
+
+        doc = dense_doc(vocab, n)
+        started = time.perf_counter()
+        merged = merger(doc)
+        new_ms = (time.perf_counter() - started) * 1000
+        print(f"{n:>8} {old_ms:>12.1f} {new_ms:>12.1f} {old_ms / max(new_ms, 1e-9):>7.1f}x {len(merged.ents):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# 冷启动开销：在全新子进程中分别测量「只导入 extractor」与「导入并加载模型」
+# （即改造前导入即加载的行为）的耗时和峰值内存。
+# 用法：python benchmarks/bench_import.py --runs 3
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+
+PROBE = """
+import json, resource, sys, time
+sys.path.insert(0, {backend!r})
+started = time.perf_counter()
+import kgapi.extractor as extractor
+{action}
+seconds = time.perf_counter() - started
+print(json.dumps({{"seconds": seconds, "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+CASES = {
+    "懒加载导入": "",
+    "导入 + warm_up（旧行为）": "extractor.warm_up()",
+}
+
+
+def probe(action):
+    code = PROBE.format(backend=BACKEND_DIR, action=action)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    for name, action in CASES.items():
+        results = [probe(action) for _ in range(args.runs)]
+        seconds = min(r["seconds"] for r in results)
+        rss = min(r["max_rss_mb"] for r in results)
+        print(f"{name:<24} {seconds * 1000:9.1f} ms  峰值内存 {rss:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
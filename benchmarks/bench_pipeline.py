@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# 对比逐条 extract_entities_relations 与 nlp.pipe 批处理的吞吐（docs/sec）。
+# 用法：python benchmarks/bench_pipeline.py corpus.jsonl --limit 200 --batch-size 64 --n-process 1 2 4
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from kgapi.extractor import extract_entities_relations  # noqa: E402
+from kgapi.pipeline import extract_corpus, iter_documents  # noqa: E402
+
+
+def docs_per_sec(count, seconds):
+    return count / seconds if seconds > 0 else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--n-process", type=int, nargs="+", default=[1])
+    args = parser.parse_args()
+
+    documents = [d for _, d in zip(range(args.limit), iter_documents(args.input))]
+
+    started = time.perf_counter()
+    for document in documents:
+        extract_entities_relations(document["text"])
+    baseline = docs_per_sec(len(documents), time.perf_counter() - started)
+    print(f"逐条调用            : {baseline:8.1f} docs/sec")
+
+    for n_process in args.n_process:
+        started = time.perf_counter()
+        count = sum(1 for _ in extract_corpus(documents, batch_size=args.batch_size, n_process=n_process))
+        rate = docs_per_sec(count, time.perf_counter() - started)
+        print(f"nlp.pipe n_process={n_process:<2}: {rate:8.1f} docs/sec  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
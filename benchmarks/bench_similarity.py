@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# 长新闻稿上的同现相似度计算：逐对 nlp(a).similarity(nlp(b)) 与缓存向量 + 矩阵余弦的对比，
+# 同时检查两者结果的最大偏差。用法：python benchmarks/bench_similarity.py --repeat 20
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from kgapi import extractor  # noqa: E402
+
+ARTICLE = (
+    '在2023年6月15日，北京的人工智能公司"深度智云"宣布与上海的科技巨头"未来科技"达成战略合作协议。'
+    '根据协议，深度智云将为未来科技开发基于大语言模型的智能客服系统，该系统将集成自然语言处理和计算机视觉技术，预计在2024年3月正式上线。'
+    '深度智云的首席执行官李明博士表示，此次合作将加速人工智能技术在金融、医疗和教育领域的应用。'
+    '未来科技的董事会主席王建国先生则强调，双方将共同投资5亿元人民币，在深圳建立一个联合研发中心，专注于生成式AI和多模态交互技术的研究。'
+    '2023年12月20日，位于南京的半导体制造商“中芯先进”宣布，与合肥的高校“华东科技大学”签订产学研合作协议。'
+    '华东科技大学校长李志强指出，该项目不仅将提升我国高端芯片设计能力，也将为地方产业发展注入新动能。'
+)
+
+
+def sentence_entity_names(doc):
+    for sent in doc.sents:
+        names = [ent.text for ent in sent.ents]
+        if len(names) >= 2:
+            yield names
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20, help="文章重复次数，控制长度")
+    args = parser.parse_args()
+
+    doc = extractor.nlp(ARTICLE * args.repeat)
+    sentences = list(sentence_entity_names(doc))
+    pairs = sum(len(n) * (len(n) - 1) // 2 for n in sentences)
+    print(f"文本 {len(doc.text)} 字，{len(sentences)} 个含多实体的句子，{pairs} 个候选实体对")
+
+    started = time.perf_counter()
+    baseline = []
+    for names in sentences:
+        for i in range(len(names)):
+            for j in range(i + 1, len(names)):
+                baseline.append(extractor.nlp(names[i]).similarity(extractor.nlp(names[j])))
+    old_seconds = time.perf_counter() - started
+
+    extractor.get_extractor().entity_vector.cache_clear()
+    started = time.perf_counter()
+    cached = []
+    for names in sentences:
+        sims = extractor.similarity_matrix(names)
+        for i in range(len(names)):
+            for j in range(i + 1, len(names)):
+                cached.append(float(sims[i, j]))
+    new_seconds = time.perf_counter() - started
+
+    max_diff = max((abs(a - b) for a, b in zip(baseline, cached)), default=0.0)
+    print(f"逐对 Doc.similarity : {old_seconds * 1000:9.1f} ms")
+    print(f"向量缓存 + 矩阵余弦 : {new_seconds * 1000:9.1f} ms  ({old_seconds / max(new_seconds, 1e-9):.1f}x)")
+    print(f"最大偏差            : {max_diff:.2e}")
+    print(f"缓存命中            : {extractor.get_extractor().entity_vector.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# 图谱快照（整数 id + CSR 数组）与普通 nx.DiGraph（节点、边属性为 dict）的内存占用和分析耗时对比。
+# 随机生成 --nodes 个实体、--edges 条关系，id 形如 kg_writer.stable_entity_id 的 "ent_" + 24 位十六进制。
+# 用法：python benchmarks/bench_snapshot.py --nodes 50000 --edges 200000
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+import networkx as nx  # noqa: E402
+
+from kgapi.snapshot import GraphSnapshot  # noqa: E402
+
+TYPES = ["PERSON", "ORG", "GPE", "DATE", "MONEY"]
+RELATIONS = ["CO_OCCURRENCE", "COOPERATE", "FOUND", "INVEST", "LOCATED_IN"]
+
+
+def make_records(nodes, edges, seed):
+    rng = random.Random(seed)
+    ids = [f"ent_{rng.getrandbits(96):024x}" for _ in range(nodes)]
+    node_rows = [{"id": key, "name": f"实体{i}", "type": rng.choice(TYPES), "graph_id": "bench"}
+                 for i, key in enumerate(ids)]
+    edge_rows = [{"source": rng.choice(ids), "target": rng.choice(ids), "type": rng.choice(RELATIONS)}
+                 for _ in range(edges)]
+    return node_rows, edge_rows
+
+
+def build_digraph(node_rows, edge_rows):
+    graph = nx.DiGraph()
+    for row in node_rows:
+        graph.add_node(row["id"], name=row["name"], type=row["type"], graph_id=row["graph_id"])
+    for row in edge_rows:
+        graph.add_edge(row["source"], row["target"], type=row["type"])
+    return graph
+
+
+# 构建耗时与 tracemalloc 统计的新增内存（不含输入记录本身）
+def measure_build(build):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - started
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, seconds, size
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def nx_pagerank(graph):
+    try:
+        return nx.pagerank(graph)
+    except ImportError:
+        # 没有安装 scipy 时 networkx 只能走纯 Python 实现
+        from networkx.algorithms.link_analysis.pagerank_alg import _pagerank_python
+        return _pagerank_python(graph)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=50000)
+    parser.add_argument("--edges", type=int, default=200000)
+    parser.add_argument("--paths", type=int, default=20, help="最短路径查询次数")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    node_rows, edge_rows = make_records(args.nodes, args.edges, args.seed)
+    snap, snap_build, snap_bytes = measure_build(lambda: GraphSnapshot.from_records(node_rows, edge_rows))
+    graph, nx_build, nx_bytes = measure_build(lambda: build_digraph(node_rows, edge_rows))
+    print(f"{args.nodes} 个节点，{args.edges} 条边")
+
+    rng = random.Random(args.seed)
+    pairs = [(rng.choice(snap.ids), rng.choice(snap.ids)) for _ in range(args.paths)]
+    undirected = graph.to_undirected(as_view=True)
+
+    def nx_path(source, target):
+        try:
+            return nx.shortest_path(undirected, source, target)
+        except nx.NetworkXNoPath:
+            return None
+
+    rows = [
+        ("构建", snap_build, nx_build),
+        ("度数 top20", best_of(lambda: (snap.out_degree() + snap.in_degree()).argsort()[-20:], args.repeat),
+         best_of(lambda: sorted(graph.degree, key=lambda item: item[1])[-20:], args.repeat)),
+        ("PageRank", best_of(snap.pagerank, args.repeat), best_of(lambda: nx_pagerank(graph), args.repeat)),
+        ("弱连通分量", best_of(snap.components, args.repeat),
+         best_of(lambda: list(nx.weakly_connected_components(graph)), args.repeat)),
+        (f"最短路径 x{args.paths}", best_of(lambda: [snap.shortest_path(s, t) for s, t in pairs], args.repeat),
+         best_of(lambda: [nx_path(s, t) for s, t in pairs], args.repeat)),
+    ]
+
+    lengths = [(len(a) if a else 0, len(b) if b else 0)
+               for a, b in ((snap.shortest_path(s, t), nx_path(s, t)) for s, t in pairs)]
+    print(f"最短路径长度一致: {all(a == b for a, b in lengths)}")
+    print(f"{'':14}{'快照':>12}{'nx.DiGraph':>14}{'倍数':>8}")
+    print(f"{'内存(MB)':14}{snap_bytes / 2 ** 20:>12.1f}{nx_bytes / 2 ** 20:>14.1f}{nx_bytes / snap_bytes:>7.1f}x")
+    for name, new, old in rows:
+        print(f"{name:14}{new * 1000:>10.1f}ms{old * 1000:>12.1f}ms{old / max(new, 1e-9):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
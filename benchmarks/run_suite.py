@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+# 基准测试套件：在合成语料 / 图谱上测量抽取、相似度、写入、图谱查询和搜索，结果写成 JSON，便于前后两次运行对比。
+# Neo4j 由 FakeDriver 代替（不访问数据库，测的是本进程内的开销：Cypher 参数组装、结果转换、索引等），可离线复现。
+# 抽取与相似度需要 spaCy 模型，模型不可用时这两项记为 skipped。
+# 用法：python benchmarks/run_suite.py --scales 1000 10000 100000 --output results.json
+#       python benchmarks/run_suite.py --scales 1000 10000 --compare results.json --threshold 0.2
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "backend"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+# 版本号放在进程内存中，不读写文件缓存目录（n-gram 索引依赖版本号不变才会复用，不能用 DummyCache）
+settings.CACHES["kgapi"] = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "kg-bench"}
+django.setup()
+# 每次调用一行 INFO 日志会计入耗时
+logging.getLogger("kgapi").setLevel(logging.WARNING)
+
+from kgapi import extractor, kg_writer, search, synthetic  # noqa: E402
+from kgapi.testing import FakeDriver  # noqa: E402
+
+ALL_CASES = ["extract", "similarity", "create_entities", "create_relations", "create_entities_batched",
+             "create_relations_batched", "query_graph", "search_keyword", "autocomplete"]
+
+# 逐条写入每行一次往返，规模大时非常慢，超过该实体数时跳过
+ROW_BY_ROW_LIMIT = 100000
+
+
+# GRAPH_CYPHER 的返回格式：每条出边一行，没有出边的实体一行（b 为空）
+def graph_rows(graph):
+    entities = {entity["id"]: entity for entity in graph["entities"]}
+    rows = []
+    linked = set()
+    for relation in graph["relations"]:
+        props = {k: v for k, v in relation.items() if k not in ("source", "target", "type")}
+        rows.append({"a": entities[relation["source"]], "rel_type": relation["type"], "r": props,
+                     "b": entities[relation["target"]]})
+        linked.add(relation["source"])
+    rows.extend({"a": entity, "rel_type": None, "r": None, "b": None}
+                for key, entity in entities.items() if key not in linked)
+    return rows
+
+
+# 每个用例返回 (计时函数, 处理条目数)；计时函数每次调用都从相同的初始状态开始
+def prepare(case, scale, graph, args):
+    entities, relations = graph["entities"], graph["relations"]
+
+    if case == "extract":
+        documents = list(synthetic.generate_corpus(args.docs, scale, seed=args.seed))
+        nlp_extractor = extractor.Extractor(cache=None)
+        nlp_extractor.warm_up()
+        return lambda: [nlp_extractor.extract(d["text"]) for d in documents], len(documents)
+
+    if case == "similarity":
+        nlp_extractor = extractor.Extractor(cache=None)
+        nlp_extractor.warm_up()
+        names = [entity["name"] for entity in entities[:args.pairs + 1]]
+        pairs = list(zip(names, names[1:]))
+
+        def run():
+            nlp_extractor.entity_vector.cache_clear()
+            return [nlp_extractor.calculate_similarity(a, b) for a, b in pairs]
+        return run, len(pairs)
+
+    if case in ("create_entities", "create_relations") and scale > ROW_BY_ROW_LIMIT:
+        return None, 0
+
+    if case.startswith("create_"):
+        writer = getattr(kg_writer, case)
+
+        def run():
+            with FakeDriver().session() as session:
+                if case.startswith("create_entities"):
+                    return writer(session, entities, "bench", "bench-user")
+                return writer(session, relations, entities, "bench", "bench-user")
+        return run, len(entities) if case.startswith("create_entities") else len(relations)
+
+    if case == "query_graph":
+        rows = graph_rows(graph)
+        driver = FakeDriver(lambda query, params: rows)
+
+        def run():
+            with driver.session() as session:
+                return kg_writer.query_graph(session, "bench")
+        return run, len(entities) + len(relations)
+
+    if case == "search_keyword":
+        hits = [{"e": entity, "score": 1.0} for entity in entities[:search.DEFAULT_LIMIT + 1]]
+        driver = FakeDriver(lambda query, params: hits)
+        keywords = [entity["name"][:2] for entity in entities[::max(1, len(entities) // args.queries)]]
+
+        def run():
+            with driver.session() as session:
+                return [search.search_entities(session, "bench-user", keyword) for keyword in keywords]
+        return run, len(keywords)
+
+    if case == "autocomplete":
+        rows = [{**entity, "graph_id": "bench"} for entity in entities]
+        prefixes = [entity["name"][:1 + i % 2] for i, entity in
+                    enumerate(entities[::max(1, len(entities) // args.queries)])]
+
+        # 包含一次从（替身）数据库加载 n-gram 索引；用单独的用户，写入用例不会去更新这份索引
+        def run():
+            search.ngram_index.drop_user("bench-autocomplete")
+            with FakeDriver(lambda query, params: rows).session() as session:
+                return [search.autocomplete(session, "bench-autocomplete", prefix) for prefix in prefixes]
+        return run, len(prefixes)
+
+    raise ValueError(f"未知的用例: {case}")
+
+
+def measure(run, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args):
+    results = []
+    for scale in args.scales:
+        graph = synthetic.generate_graph(scale, args.degree, args.seed)
+        print(f"规模 {scale}：{len(graph['entities'])} 个实体，{len(graph['relations'])} 条关系")
+        for case in args.cases:
+            record = {"case": case, "scale": scale}
+            try:
+                run, items = prepare(case, scale, graph, args)
+            except OSError as e:
+                # 没有安装 spaCy 模型
+                run, items = None, 0
+                record["reason"] = str(e)
+            if run is None:
+                record["skipped"] = True
+                record.setdefault("reason", f"逐条写入只测到 {ROW_BY_ROW_LIMIT} 个实体")
+                print(f"  {case:<26} 跳过：{record['reason']}")
+                results.append(record)
+                continue
+            samples = measure(run, args.repeat)
+            best = min(samples)
+            record.update({
+                "items": items,
+                "best_seconds": best,
+                "median_seconds": statistics.median(samples),
+                "items_per_sec": items / best if best > 0 else None,
+            })
+            print(f"  {case:<26}{best * 1000:>12.1f}ms{record['items_per_sec'] or 0:>14.0f} 条/秒")
+            results.append(record)
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+
+
+# 与之前的结果对比 best_seconds，变慢超过 threshold 的用例记为回归
+def compare(current, baseline, threshold):
+    previous = {(r["case"], r["scale"]): r for r in baseline["results"] if not r.get("skipped")}
+    regressions = []
+    print(f"\n对比 {baseline['meta'].get('revision')} -> {current['meta'].get('revision')}")
+    for record in current["results"]:
+        old = previous.get((record["case"], record["scale"]))
+        if old is None or record.get("skipped"):
+            continue
+        ratio = record["best_seconds"] / old["best_seconds"]
+        flag = "回归" if ratio > 1 + threshold else ""
+        if flag:
+            regressions.append(record)
+        print(f"  {record['case']:<26}{record['scale']:>9}{old['best_seconds'] * 1000:>12.1f}ms"
+              f"{record['best_seconds'] * 1000:>12.1f}ms{ratio:>8.2f}x {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000], help="实体数，可到 1000000")
+    parser.add_argument("--cases", nargs="+", choices=ALL_CASES, default=ALL_CASES)
+    parser.add_argument("--degree", type=float, default=4, help="平均每个实体的出边数")
+    parser.add_argument("--docs", type=int, default=50, help="抽取用例的文档数")
+    parser.add_argument("--pairs", type=int, default=1000, help="相似度用例的实体对数")
+    parser.add_argument("--queries", type=int, default=200, help="搜索用例的查询数")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="结果 JSON 文件")
+    parser.add_argument("--compare", help="之前的结果 JSON，用于对比")
+    parser.add_argument("--threshold", type=float, default=0.2, help="变慢超过该比例记为回归")
+    args = parser.parse_args()
+
+    current = run_suite(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(current, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
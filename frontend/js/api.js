@@ -0,0 +1,73 @@
+const API_BASE = "/api";
+
+// 逐行读取 NDJSON 响应，每解析出一行就回调一次，不等待整个响应结束
+async function streamNdjson(url, onItem) {
+    const response = await fetch(url);
+    if (!response.ok) {
+        throw new Error(`${response.status} ${response.statusText}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder("utf-8");
+    let buffer = "";
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const lines = buffer.split("\n");
+        buffer = lines.pop();
+        for (const line of lines) {
+            if (line.trim()) onItem(JSON.parse(line));
+        }
+    }
+
+    buffer += decoder.decode();
+    if (buffer.trim()) onItem(JSON.parse(buffer));
+}
+
+// 流式加载图谱：节点和边分批到达，onBatch(entities, relations, done) 只收到上一批之后新到达的部分
+async function fetchGraphStream(graphId, onBatch, batchSize = 500) {
+    const data = { entities: [], relations: [] };
+    let entities = [];
+    let relations = [];
+
+    await streamNdjson(`${API_BASE}/graphs/${encodeURIComponent(graphId)}/stream`, item => {
+        if (item.kind === "node") {
+            entities.push(item.data);
+            data.entities.push(item.data);
+        } else {
+            relations.push(item.data);
+            data.relations.push(item.data);
+        }
+        if (entities.length + relations.length >= batchSize) {
+            onBatch(entities, relations, false);
+            entities = [];
+            relations = [];
+        }
+    });
+
+    onBatch(entities, relations, true);
+    return data;
+}
+
+// 实体名前缀补全，返回 [{id, name, type, graph_id}]
+async function fetchAutocomplete(userId, prefix, limit = 10) {
+    const params = new URLSearchParams({ user_id: userId, prefix, limit });
+    const response = await fetch(`${API_BASE}/search/autocomplete?${params}`);
+    if (!response.ok) {
+        throw new Error(`${response.status} ${response.statusText}`);
+    }
+    return (await response.json()).results;
+}
+
+// 邻域展开：返回 {nodes, links, truncated, next_cursor}，next_cursor 不为空时可继续请求下一页
+async function fetchNeighbourhood(graphId, seed, options = {}) {
+    const params = new URLSearchParams({ seed, ...options });
+    const response = await fetch(`${API_BASE}/graphs/${encodeURIComponent(graphId)}/neighbourhood?${params}`);
+    if (!response.ok) {
+        throw new Error(`${response.status} ${response.statusText}`);
+    }
+    return response.json();
+}
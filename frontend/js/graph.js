@@ -2,14 +2,90 @@ let currentData = null;
 let simulationRef = null;
 let nodeRef = null;
 let svgRef = null;
+// 邻域模式下已加载的节点和边（只保存 id，不受 forceLink 修改 source/target 的影响）
+let neighbourhood = null;
 
 function loadGraph() {
+    const query = new URLSearchParams(window.location.search);
+    const graphId = query.get("graph_id");
+    const seed = query.get("seed");
+    if (graphId && seed) {
+        neighbourhood = { graphId, entities: new Map(), relations: new Map() };
+        expandNode(seed);
+        return;
+    }
+    if (graphId) {
+        loadGraphStream(graphId);
+        return;
+    }
     d3.json("static/graph.json")
         .then(data => renderGraph(data))
         .catch(err => alert("加载失败：" + err));
 }
 
+// 🌊 流式加载：场景只建一次，每帧最多一次把新到达的节点和边追加进去，布局在已有基础上继续
+function loadGraphStream(graphId) {
+    const scene = createScene();
+    let frameRequested = false;
+    let pendingEntities = [];
+    let pendingRelations = [];
+
+    const flush = () => {
+        frameRequested = false;
+        appendToScene(scene, pendingEntities, pendingRelations);
+        pendingEntities = [];
+        pendingRelations = [];
+    };
+
+    fetchGraphStream(graphId, (entities, relations, done) => {
+        pendingEntities.push(...entities);
+        pendingRelations.push(...relations);
+        if (done) {
+            flush();
+            return;
+        }
+        if (frameRequested) return;
+        frameRequested = true;
+        requestAnimationFrame(() => {
+            if (frameRequested) flush();
+        });
+    }).catch(err => alert("加载失败：" + err));
+}
+
+// 🔍 邻域模式：展开某个节点的一跳邻居，按 id 合并到已加载的数据中；被截断时继续请求下一页
+async function expandNode(entityId) {
+    let cursor = null;
+    try {
+        do {
+            const options = cursor ? { cursor } : {};
+            const page = await fetchNeighbourhood(neighbourhood.graphId, entityId, options);
+            for (const entity of page.nodes) {
+                neighbourhood.entities.set(entity.id, entity);
+            }
+            for (const relation of page.links) {
+                neighbourhood.relations.set(`${relation.source}|${relation.type}|${relation.target}`, relation);
+            }
+            cursor = page.next_cursor;
+        } while (cursor);
+    } catch (err) {
+        alert("加载失败：" + err);
+        return;
+    }
+    renderGraph({
+        entities: [...neighbourhood.entities.values()],
+        relations: [...neighbourhood.relations.values()]
+    });
+}
+
+// 整体重绘：先停掉上一个场景的力导向模拟，再新建场景
 function renderGraph(graphDataRaw) {
+    const scene = createScene();
+    appendToScene(scene, graphDataRaw.entities, graphDataRaw.relations);
+}
+
+// 建立空场景：SVG 图层、缩放、箭头和力导向模拟各创建一次，之后由 appendToScene 追加数据
+function createScene() {
+    if (simulationRef) simulationRef.stop();
     d3.select("svg").selectAll("*").remove();
 
     const svg = d3.select("svg");
@@ -39,42 +115,89 @@ function renderGraph(graphDataRaw) {
         .attr("d", "M0,-5L10,0L0,5")
         .attr("fill", "#aaa");
 
-    const graphData = {
-        entities: graphDataRaw.entities.map(d => ({ ...d })),
-        relations: graphDataRaw.relations.map(d => ({
-            ...d,
-            source: d.source,
-            target: d.target
-        }))
+    const scene = {
+        entities: [],
+        relations: [],
+        // 端点尚未到达的边，等节点到达后再加入
+        waiting: [],
+        ids: new Set(),
+        linkLayer: container.append("g"),
+        linkLabelLayer: container.append("g"),
+        nodeLayer: container.append("g"),
+        labelLayer: container.append("g"),
+        simulation: d3.forceSimulation([])
+            .force("link", d3.forceLink([]).id(d => d.id).distance(200))
+            .force("charge", d3.forceManyBody().strength(-500))
+            .force("center", d3.forceCenter(width / 2, height / 2))
     };
-    currentData = graphData;
+    scene.link = scene.linkLayer.selectAll("line");
+    scene.linkLabel = scene.linkLabelLayer.selectAll("text");
+    scene.node = scene.nodeLayer.selectAll("circle");
+    scene.label = scene.labelLayer.selectAll("text");
+    simulationRef = scene.simulation;
+    currentData = { entities: scene.entities, relations: scene.relations };
+
+    scene.simulation.on("tick", () => {
+        scene.link
+            .attr("x1", d => d.source.x)
+            .attr("y1", d => d.source.y)
+            .attr("x2", d => d.target.x)
+            .attr("y2", d => d.target.y);
+
+        scene.node
+            .attr("cx", d => d.x)
+            .attr("cy", d => d.y);
 
-    const simulation = d3.forceSimulation(graphData.entities)
-        .force("link", d3.forceLink(graphData.relations).id(d => d.id).distance(200))
-        .force("charge", d3.forceManyBody().strength(-500))
-        .force("center", d3.forceCenter(width / 2, height / 2));
-    simulationRef = simulation;
+        scene.label
+            .attr("x", d => d.x)
+            .attr("y", d => d.y);
 
-    const link = container.append("g")
-        .selectAll("line")
-        .data(graphData.relations)
+        scene.linkLabel
+            .attr("x", d => (d.source.x + d.target.x) / 2)
+            .attr("y", d => (d.source.y + d.target.y) / 2);
+    });
+
+    return scene;
+}
+
+// 追加一批节点和边：只为新数据创建 DOM 元素，模拟沿用已有坐标，重新加热后继续布局
+function appendToScene(scene, entities, relations) {
+    for (const entity of entities) {
+        if (scene.ids.has(entity.id)) continue;
+        scene.ids.add(entity.id);
+        scene.entities.push({ ...entity });
+    }
+    const candidates = scene.waiting.concat(relations.map(d => ({ ...d })));
+    scene.waiting = [];
+    for (const relation of candidates) {
+        if (scene.ids.has(relation.source) && scene.ids.has(relation.target)) {
+            scene.relations.push(relation);
+        } else {
+            scene.waiting.push(relation);
+        }
+    }
+
+    const simulation = scene.simulation;
+
+    scene.link = scene.link
+        .data(scene.relations)
         .enter()
         .append("line")
         .attr("stroke", "#aaa")
-        .attr("marker-end", "url(#arrow)");
+        .attr("marker-end", "url(#arrow)")
+        .merge(scene.link);
 
-    const linkLabel = container.append("g")
-        .selectAll("text")
-        .data(graphData.relations)
+    scene.linkLabel = scene.linkLabel
+        .data(scene.relations)
         .enter()
         .append("text")
         .text(d => d.type)
         .attr("font-size", 10)
-        .attr("fill", "#666");
+        .attr("fill", "#666")
+        .merge(scene.linkLabel);
 
-    const node = container.append("g")
-        .selectAll("circle")
-        .data(graphData.entities)
+    const entered = scene.node
+        .data(scene.entities, d => d.id)
         .enter()
         .append("circle")
         .attr("r", 20)
@@ -83,61 +206,51 @@ function renderGraph(graphDataRaw) {
             .on("start", dragStarted)
             .on("drag", dragged)
             .on("end", dragEnded));
+    scene.node = entered.merge(scene.node);
+    nodeRef = scene.node;
 
-    nodeRef = node;
-
-    const label = container.append("g")
-        .selectAll("text")
-        .data(graphData.entities)
+    scene.label = scene.label
+        .data(scene.entities, d => d.id)
         .enter()
         .append("text")
         .text(d => d.name)
         .attr("font-size", 12)
         .attr("dx", 25)
-        .attr("dy", ".35em");
+        .attr("dy", ".35em")
+        .merge(scene.label);
 
-    simulation.on("tick", () => {
-        link
-            .attr("x1", d => d.source.x)
-            .attr("y1", d => d.source.y)
-            .attr("x2", d => d.target.x)
-            .attr("y2", d => d.target.y);
-
-        node
-            .attr("cx", d => d.x)
-            .attr("cy", d => d.y);
-
-        label
-            .attr("x", d => d.x)
-            .attr("y", d => d.y);
-
-        linkLabel
-            .attr("x", d => (d.source.x + d.target.x) / 2)
-            .attr("y", d => (d.source.y + d.target.y) / 2);
+    entered.on("click", (event, d) => {
+        alert(`实体名称：${d.name}\n类型：${d.type}\nID：${d.id}`);
     });
 
-    node.on("click", (event, d) => {
-        alert(`实体名称：${d.name}\n类型：${d.type}\nID：${d.id}`);
+    // 邻域模式下双击节点继续展开
+    entered.on("dblclick", (event, d) => {
+        event.stopPropagation();
+        if (neighbourhood) expandNode(d.id);
     });
 
-    node
+    entered
         .on("mouseover", function (event, d) {
-            node.attr("opacity", o =>
-                o.id === d.id || graphData.relations.some(rel =>
+            scene.node.attr("opacity", o =>
+                o.id === d.id || scene.relations.some(rel =>
                     (rel.source.id === d.id && rel.target.id === o.id) ||
                     (rel.target.id === d.id && rel.source.id === o.id)
                 ) ? 1 : 0.2
             );
 
-            link.attr("stroke", rel =>
+            scene.link.attr("stroke", rel =>
                 rel.source.id === d.id || rel.target.id === d.id ? "#f00" : "#aaa"
             );
         })
         .on("mouseout", () => {
-            node.attr("opacity", 1);
-            link.attr("stroke", "#aaa");
+            scene.node.attr("opacity", 1);
+            scene.link.attr("stroke", "#aaa");
         });
 
+    simulation.nodes(scene.entities);
+    simulation.force("link").links(scene.relations);
+    simulation.alpha(Math.max(simulation.alpha(), 0.3)).restart();
+
     function dragStarted(event, d) {
         if (!event.active) simulation.alphaTarget(0.3).restart();
         d.fx = d.x;
@@ -156,6 +269,34 @@ function renderGraph(graphDataRaw) {
     }
 }
 
+// 🔤 输入时补全实体名（URL 带 ?user_id= 时启用），输入停顿 150ms 后才请求
+function setupAutocomplete() {
+    const userId = new URLSearchParams(window.location.search).get("user_id");
+    if (!userId) return;
+
+    const input = document.getElementById("searchInput");
+    const list = document.getElementById("searchSuggestions");
+    let timer = null;
+
+    input.addEventListener("input", () => {
+        clearTimeout(timer);
+        const prefix = input.value.trim();
+        if (!prefix) return;
+        timer = setTimeout(() => {
+            fetchAutocomplete(userId, prefix)
+                .then(results => {
+                    list.replaceChildren(...results.map(e => {
+                        const option = document.createElement("option");
+                        option.value = e.name;
+                        option.label = e.type || "";
+                        return option;
+                    }));
+                })
+                .catch(err => console.warn("补全失败：", err));
+        }, 150);
+    });
+}
+
 // 🔍 聚焦关键词节点
 function focusNode() {
     const keyword = document.getElementById("searchInput").value.trim();
@@ -226,4 +367,7 @@ function exportJSON() {
     URL.revokeObjectURL(url);
 }
 
-window.onload = loadGraph;
+window.onload = () => {
+    setupAutocomplete();
+    loadGraph();
+};
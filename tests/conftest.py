@@ -0,0 +1,39 @@
+import os
+import sys
+import tempfile
+
+# 与 manage.py 运行时一致：backend/ 在导入路径最前面，应用模块以 kgapi.* 导入
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+# 查询缓存写到临时目录，不污染仓库
+os.environ.setdefault("KG_CACHE_DIR", tempfile.mkdtemp(prefix="kg_cache_"))
+
+import django  # noqa: E402
+
+django.setup()
+
+import pytest  # noqa: E402
+
+from kgapi import neo4j_client  # noqa: E402
+from kgapi.testing import FakeAsyncDriver, FakeDriver  # noqa: E402
+
+
+# 把进程共享驱动替换为 FakeDriver，测试结束后恢复
+@pytest.fixture
+def fake_driver():
+    driver = FakeDriver()
+    previous = neo4j_client.set_driver(driver)
+    yield driver
+    neo4j_client.set_driver(previous)
+
+
+# 异步读路径使用的 FakeAsyncDriver
+@pytest.fixture
+def fake_async_driver():
+    driver = FakeAsyncDriver()
+    previous = neo4j_client.set_async_driver(driver)
+    yield driver
+    neo4j_client.set_async_driver(previous)
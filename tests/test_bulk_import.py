@@ -0,0 +1,59 @@
+import csv
+import os
+
+from kgapi import bulk_import, kg_writer
+from kgapi.testing import FakeDriver
+
+DOC1 = {
+    "entities": [{"id": "e1", "name": "深度智云", "type": "Organization"},
+                 {"id": "e2", "name": "未来科技", "type": "Organization"},
+                 {"id": "e3", "name": "李明", "type": "Person"}],
+    "relations": [{"source": "e1", "target": "e2", "type": "cooperate", "verb": "合作"},
+                  {"source": "e3", "target": "e1", "type": "found", "verb": "创立"},
+                  {"source": "e3", "target": "e2", "type": "加入", "verb": "加入"}],
+}
+# 第二篇文档中的实体与第一篇重复，编号不同
+DOC2 = {
+    "entities": [{"id": "e1", "name": "李明", "type": "Person"},
+                 {"id": "e2", "name": "深度智云", "type": "Organization"},
+                 {"id": "e3", "name": "北京", "type": "Location"}],
+    "relations": [{"source": "e1", "target": "e2", "type": "found", "verb": "创立"},
+                  {"source": "e2", "target": "e3", "type": "co-occurrence", "similarity": 0.4}],
+}
+
+
+def read_rows(directory, name):
+    with open(os.path.join(directory, name), encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_export_dedupes_entities_and_splits_relationship_files(tmp_path):
+    manifest = bulk_import.export_csv([("d1", DOC1), ("d2", DOC2)], str(tmp_path), "u1", graph_id="g1")
+
+    assert manifest["nodes"]["rows"] == 4
+    assert {t: s["rows"] for t, s in manifest["relationships"].items()} == \
+        {"COOPERATE": 1, "FOUND": 1, "CO_OCCURRENCE": 1}
+    assert read_rows(tmp_path, "entities_header.csv")[0][0] == "id:ID(Entity)"
+    ids = [row[0] for row in read_rows(tmp_path, "entities.csv")]
+    assert kg_writer.stable_entity_id("g1", "李明", "Person") in ids
+    assert len(set(ids)) == 4
+    assert "--relationships=FOUND=relationships_FOUND_header.csv,relationships_FOUND.csv" in manifest["command"]
+    assert not os.path.exists(tmp_path / ".dedupe.sqlite3")
+
+    assert all(result["ok"] for result in bulk_import.verify_export(str(tmp_path)))
+    with open(tmp_path / "relationships_FOUND.csv", "a", encoding="utf-8") as f:
+        f.write("x,y\n")
+    failed = [r["check"] for r in bulk_import.verify_export(str(tmp_path)) if not r["ok"]]
+    assert failed == ["relationships:FOUND"]
+
+
+def test_verify_database_compares_counts(tmp_path):
+    manifest = bulk_import.export_csv([("d1", DOC1)], str(tmp_path), "u1")
+    counts = {"COOPERATE": 1, "FOUND": 0}
+    driver = FakeDriver(lambda query, params: [
+        {"count": 3 if "(e:Entity)" in query else counts[query.split(":")[1].split("]")[0]]}
+    ])
+    with driver.session() as session:
+        results = bulk_import.verify_database(session, manifest)
+    assert [(r["check"], r["ok"]) for r in results] == \
+        [("neo4j:nodes", True), ("neo4j:COOPERATE", True), ("neo4j:FOUND", False)]
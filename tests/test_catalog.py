@@ -0,0 +1,69 @@
+from kgapi import catalog, kg_writer
+from kgapi.testing import FakeDriver
+
+DATA = {
+    "entities": [{"id": "e1", "name": "深度智云", "type": "Organization"},
+                 {"id": "e2", "name": "李明", "type": "Person"}],
+    "relations": [{"source": "e2", "target": "e1", "type": "join", "verb": "加入"}],
+}
+
+
+def test_write_graph_refreshes_catalog_with_source_hash():
+    driver = FakeDriver()
+    with driver.session() as session:
+        kg_writer.write_graph(session, DATA, "g1", "u1", source_hash=catalog.source_hash(" 李明加入深度智云。\n"))
+
+    query, params = driver.queries[-1]
+    assert "MERGE (g:Graph {graph_id: $graph_id})" in query and "g.version = g.version + 1" in query
+    # 没有实体时不建目录节点（已有的删除），分页不会选中空图谱
+    assert "WHERE entities > 0" in query and "WHERE entities = 0" in query
+    assert params["user_id"] == "u1"
+    # 与抽取缓存相同的规范化：首尾空白不影响哈希
+    assert params["source_hash"] == catalog.source_hash("李明加入深度智云。")
+
+
+# 实体、关系、目录全部写完后只更新一次缓存版本号
+def test_write_graph_invalidates_cache_once_after_catalog_refresh(monkeypatch):
+    from kgapi import cache
+
+    driver = FakeDriver()
+    bumps = []
+    monkeypatch.setattr(cache, "bump", lambda *args, **kwargs: bumps.append(driver.queries[-1][0]))
+    with driver.session() as session:
+        kg_writer.write_graph(session, DATA, "g1", "u1")
+
+    assert len(bumps) == 1 and "MERGE (g:Graph" in bumps[0]
+
+
+def test_update_graph_refreshes_catalog_only_when_something_changed():
+    stored = [{"id": kg_writer.stable_entity_id("g1", e["name"], e["type"]), **{k: e[k] for k in ("name", "type")}}
+              for e in DATA["entities"]]
+    driver = FakeDriver(lambda query, params: stored if "RETURN e.id AS id" in query else [])
+    with driver.session() as session:
+        kg_writer.update_graph(session, {"entities": DATA["entities"], "relations": []}, "g1", "u1")
+        assert not any("g:Graph" in query for query, _ in driver.queries)
+
+        driver.reset()
+        kg_writer.update_graph(session, DATA, "g1", "u1")
+    # 目录在同一个写事务内刷新
+    assert driver.write_transactions == 1
+    assert "MERGE (g:Graph" in driver.queries[-1][0]
+
+
+def test_user_graphs_view_reads_only_the_catalog(fake_driver):
+    import json
+
+    from django.test import RequestFactory
+
+    from kgapi import query
+
+    summary = {"graph_id": "g1", "user_id": "u-catalog", "created_at": "2026-01-01T00:00:00Z",
+               "updated_at": "2026-01-02T00:00:00Z", "entity_count": 2, "relation_count": 1,
+               "source_hash": "abc", "version": 3}
+    fake_driver.responder = lambda q, params: [summary]
+    response = query.user_graphs(RequestFactory().get("/users/u-catalog/graphs"), "u-catalog")
+
+    assert json.loads(response.content)["graphs"] == [summary]
+    assert len(fake_driver.queries) == 1
+    cypher = fake_driver.queries[0][0]
+    assert "MATCH (g:Graph {user_id: $user_id})" in cypher and "Entity" not in cypher
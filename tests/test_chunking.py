@@ -0,0 +1,91 @@
+import io
+
+import pytest
+
+from kgapi.chunking import ChunkMerger, iter_chunks, iter_sentences
+
+TEXT = ("深度智云宣布与未来科技合作。“我们很高兴！”李明说。\n"
+        "没有句号的一行\n"
+        "北京的深度智云在上海设立分公司；未来科技表示支持。" * 20)
+
+
+def test_sentences_reassemble_the_text_from_strings_and_files():
+    sentences = list(iter_sentences(TEXT))
+    assert "".join(sentences) == TEXT
+    assert sentences[1:3] == ["“我们很高兴！”", "李明说。\n"]
+    # 按小块读取文件时，跨块的句子也能完整拼回
+    assert list(iter_sentences(io.StringIO(TEXT), block_chars=7)) == sentences
+
+
+class CountingReader(io.StringIO):
+    def __init__(self, text):
+        super().__init__(text)
+        self.consumed = 0
+
+    def read(self, size=-1):
+        block = super().read(size)
+        self.consumed += len(block)
+        return block
+
+
+def test_long_run_without_terminators_keeps_the_buffer_bounded():
+    text = "表格数据" * 25000
+    reader = CountingReader(text)
+    sentences = iter_sentences(reader, block_chars=1000, max_chars=500)
+    # 第一段在读完整个文件之前就产出，留待下一块的部分不超过 max_chars
+    assert len(next(sentences)) == 500
+    assert reader.consumed <= 1000
+    rest = list(sentences)
+    assert all(len(piece) <= 500 for piece in rest)
+    assert "".join(rest) == text[500:]
+
+
+def test_chunks_respect_size_and_overlap():
+    chunks = list(iter_chunks(TEXT, max_chars=60, overlap=1))
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 60 for chunk in chunks)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        last = list(iter_sentences(previous))[-1]
+        assert chunk.startswith(last)
+    # 超长且没有标点的内容按长度硬切，不重叠时拼接等于原文
+    assert "".join(iter_chunks("字" * 25, max_chars=10, overlap=0)) == "字" * 25
+    assert list(iter_chunks("短文本。", max_chars=60)) == ["短文本。"]
+
+
+def test_merger_collapses_entities_across_chunks():
+    merger = ChunkMerger()
+    merger.add({
+        "entities": [{"id": "e1", "name": "深度智云", "type": "Organization"},
+                     {"id": "e2", "name": "未来科技", "type": "Organization"}],
+        "relations": [{"source": "e1", "target": "e2", "type": "cooperate", "verb": "合作"}],
+    })
+    merger.add({
+        "entities": [{"id": "e1", "name": "未来科技", "type": "Organization"},
+                     {"id": "e2", "name": "深度智云", "type": "Organization"},
+                     {"id": "e3", "name": "深度智云", "type": "Person"}],
+        "relations": [{"source": "e2", "target": "e1", "type": "cooperate", "verb": "合作"},
+                      {"source": "e3", "target": "e1", "type": "join", "verb": "加入"}],
+    })
+    result = merger.result()
+    assert [(e["id"], e["name"], e["type"]) for e in result["entities"]] == [
+        ("e1", "深度智云", "Organization"), ("e2", "未来科技", "Organization"), ("e3", "深度智云", "Person")]
+    assert [(r["source"], r["target"], r["type"]) for r in result["relations"]] == [
+        ("e1", "e2", "cooperate"), ("e3", "e2", "join")]
+
+
+def test_extract_chunked_matches_single_pass_entities():
+    spacy = pytest.importorskip("spacy")
+    from kgapi.extractor import Extractor
+
+    nlp = spacy.blank("zh")
+    nlp.add_pipe("sentencizer", config={"punct_chars": ["。", "！", "；"]})
+    ruler = nlp.add_pipe("entity_ruler")
+    ruler.add_patterns([{"label": "ORG", "pattern": "深度智云"}, {"label": "ORG", "pattern": "未来科技"},
+                        {"label": "GPE", "pattern": "北京"}, {"label": "GPE", "pattern": "上海"}])
+    extractor = Extractor(nlp=nlp)
+
+    whole = extractor.extract(TEXT)
+    chunked = extractor.extract_chunked(io.StringIO(TEXT), max_chars=80)
+    names = lambda result: {(e["name"], e["type"]) for e in result["entities"]}  # noqa: E731
+    assert names(chunked) == names(whole)
+    assert len(chunked["entities"]) == 4
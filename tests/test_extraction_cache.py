@@ -0,0 +1,53 @@
+import os
+
+from kgapi.extraction_cache import ExtractionCache, cache_key
+from kgapi.extractor import Extractor
+
+RESULT = {"entities": [{"id": "e1", "name": "北京", "type": "地点"}], "relations": []}
+
+
+def test_key_ignores_whitespace_and_tracks_fingerprint():
+    fingerprint = {"model": "zh_core_web_md", "version": "3.8.0"}
+    assert cache_key(" 李明 在北京。\n", fingerprint) == cache_key("李明 在北京。", fingerprint)
+    assert cache_key("李明在北京。", fingerprint) != cache_key("李明在北京。", {**fingerprint, "version": "3.8.1"})
+
+
+def test_hit_miss_and_eviction(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.sqlite3", max_bytes=10_000)
+    assert cache.get("a") is None
+    cache.put("a", RESULT)
+    assert cache.get("a") == RESULT
+
+    big = {"entities": [{"id": f"e{i}", "name": os.urandom(64).hex()} for i in range(200)], "relations": []}
+    cache.put("b", big)
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["bytes"] <= cache.max_bytes
+    assert stats["evictions"] >= 1 and cache.get("a") is None
+
+
+# 命中缓存时直接返回，不加载模型（这里的模型根本不存在）
+def test_cached_extract_does_not_load_model(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.sqlite3")
+    extractor = Extractor(model="zh_missing_model", fallback_model=None, cache=cache)
+    cache.put(cache_key("李明在北京。", extractor.fingerprint()), RESULT)
+
+    assert extractor.extract("李明在北京。") == RESULT
+    assert not extractor.loaded
+
+
+# 只设置了 DJANGO_SETTINGS_MODULE、尚未访问过 settings 的进程（如 spawn 出的抽取子进程）也按 settings 建缓存
+def test_configured_cache_loads_settings_lazily(tmp_path):
+    import subprocess
+    import sys
+
+    (tmp_path / "lazy_settings.py").write_text(
+        f"KG_EXTRACTION_CACHE = {{'PATH': {str(tmp_path / 'lazy.sqlite3')!r}, 'MAX_BYTES': 4096}}\n")
+    backend = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+    env = {key: value for key, value in os.environ.items() if not key.startswith("KG_EXTRACTION_CACHE")}
+    env.update(DJANGO_SETTINGS_MODULE="lazy_settings", PYTHONPATH=os.pathsep.join([str(tmp_path), backend]))
+    code = ("from kgapi.extraction_cache import configured_cache\n"
+            "cache = configured_cache()\n"
+            "print(cache.path, cache.max_bytes)")
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+    assert output.split() == [str(tmp_path / "lazy.sqlite3"), "4096"]
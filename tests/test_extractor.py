@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+spacy = pytest.importorskip("spacy")
+
+from spacy.tokens import Doc  # noqa: E402
+
+from kgapi.extractor import Extractor  # noqa: E402
+
+
+# 空白中文管线 + 小词向量表，不需要下载模型
+@pytest.fixture
+def extractor():
+    nlp = spacy.blank("zh")
+    rng = np.random.default_rng(0)
+    nlp.vocab.reset_vectors(width=8)
+    # 空白中文管线按字分词，所以给每个字设置向量
+    for char in sorted(set("深度智云未来科技李明北京上海王建国")):
+        nlp.vocab.set_vector(char, rng.normal(size=8).astype("float32"))
+    return Extractor(nlp=nlp)
+
+
+def make_doc(nlp, sentences):
+    words, ents, starts = [], [], []
+    for sentence in sentences:
+        for k, (word, label) in enumerate(sentence):
+            words.append(word)
+            ents.append(f"B-{label}" if label else "O")
+            starts.append(k == 0)
+    return Doc(nlp.vocab, words=words, ents=ents, sent_starts=starts)
+
+
+def test_extractor_does_not_load_a_model_until_used():
+    extractor = Extractor(model="model_that_is_not_installed", fallback_model=None)
+    assert not extractor.loaded
+    with pytest.raises(OSError):
+        extractor.nlp
+
+
+@pytest.mark.filterwarnings("ignore:.*W008")
+def test_similarity_matrix_matches_doc_similarity(extractor):
+    names = ["深度智云", "未来科技", "李明", "深度智云", "不存在"]
+    sims = extractor.similarity_matrix(names)
+    for i in range(len(names)):
+        for j in range(len(names)):
+            expected = extractor.nlp.make_doc(names[i]).similarity(extractor.nlp.make_doc(names[j]))
+            assert sims[i, j] == pytest.approx(expected, abs=1e-6)
+
+
+def test_cooccurrence_pairs_stay_within_sentences_and_skip_linked_pairs(extractor):
+    doc = make_doc(extractor.nlp, [
+        [("深度智云", "ORG"), ("与", None), ("未来科技", "ORG"), ("李明", "PERSON"), ("北京", "GPE")],
+        [("王建国", "PERSON"), ("在", None), ("上海", "GPE")],
+    ])
+    entities = [{"id": f"e{i + 1}", "name": e.text, "type": e.label_, "start": e.start, "end": e.end}
+                for i, e in enumerate(doc.ents)]
+    sims = extractor.similarity_matrix([e["name"] for e in entities])
+    linked = [{"source": "e4", "target": "e1"}]
+
+    relations = extractor.cooccurrence_relations(doc, entities, linked)
+    pairs = [(r["source"], r["target"]) for r in relations]
+
+    index = {e["id"]: k for k, e in enumerate(entities)}
+    expected = [
+        (a, b) for a, b in [("e1", "e3"), ("e1", "e4"), ("e2", "e3"), ("e2", "e4"), ("e3", "e4"), ("e5", "e6")]
+        if (a, b) != ("e1", "e4") and sims[index[a], index[b]] > 0.15
+    ]
+    assert expected and pairs == expected
+
+    capped = extractor.cooccurrence_relations(doc, entities, linked, max_pairs_per_sentence=1)
+    assert len([r for r in capped if r["source"] in {"e1", "e2", "e3"}]) <= 1
+
+
+
+def test_entity_merger_keeps_model_entities_and_prefers_longer_matches(extractor):
+    from spacy.tokens import Span
+
+    from kgapi.extractor import merge_matched_entities
+
+    nlp = extractor.nlp
+    assert nlp.pipe_names[-1] == "kg_entity_merger"
+
+    doc = Doc(nlp.vocab, words=["北京", "深度智云公司", "首席", "执行官", "李明"],
+              spaces=[False] * 5, ents=["B-GPE", "O", "O", "O", "B-PERSON"])
+    merged = nlp.get_pipe("kg_entity_merger")(doc)
+    assert [(e.text, e.label_) for e in merged.ents] == [
+        ("北京", "GPE"), ("深度智云公司", "ORG"), ("首席执行官", "TITLE"), ("李明", "PERSON")
+    ]
+
+    doc = Doc(nlp.vocab, words=["甲", "乙", "丙", "丁"], ents=["B-GPE", "O", "O", "O"])
+    spans = [Span(doc, 0, 2, label="ORG"), Span(doc, 1, 2, label="TITLE"),
+             Span(doc, 1, 4, label="PRODUCT"), Span(doc, 2, 3, label="ORG")]
+    assert [(e.start, e.end, e.label_) for e in merge_matched_entities(doc, spans).ents] == [
+        (0, 1, "GPE"), (1, 4, "PRODUCT")
+    ]
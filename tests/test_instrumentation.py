@@ -0,0 +1,53 @@
+import pytest
+
+from kgapi import instrumentation
+from kgapi.instrumentation import metrics, timed
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def counter(name, function):
+    return next(c["value"] for c in metrics.snapshot()["counters"]
+                if c["name"] == name and c["labels"].get("function") == function)
+
+
+def test_timed_decorator_counts_records_and_bytes(monkeypatch):
+    @timed("fetch")
+    def fetch():
+        return {"nodes": [{"id": "e1"}, {"id": "e2"}], "links": [{"source": "e1", "target": "e2"}]}
+
+    fetch()
+    # 默认不为计字节额外编码
+    assert counter("kg_bytes_total", "fetch") == 0
+    monkeypatch.setattr(instrumentation, "MEASURE_BYTES", True)
+    fetch()
+    assert counter("kg_calls_total", "fetch") == 2
+    assert counter("kg_records_total", "fetch") == 6
+    assert counter("kg_bytes_total", "fetch") > 0
+    assert 'kg_call_seconds_count{function="fetch"} 2' in metrics.render_prometheus()
+
+
+def test_timed_wraps_generators_and_records_errors():
+    @timed("stream")
+    def stream():
+        yield "node", {"id": "e1"}
+        yield "link", {"source": "e1", "target": "e1"}
+
+    assert len(list(stream())) == 2
+    assert counter("kg_records_total", "stream") == 2
+
+    with pytest.raises(RuntimeError):
+        with timed("block"):
+            raise RuntimeError("boom")
+    assert any(c["labels"] == {"function": "block", "status": "error"} for c in metrics.snapshot()["counters"])
+
+    # 提前关闭生成器（客户端断开）记为 cancelled
+    items = stream()
+    next(items)
+    items.close()
+    assert any(c["labels"] == {"function": "stream", "status": "cancelled"} for c in metrics.snapshot()["counters"])
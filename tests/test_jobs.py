@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+
+import pytest
+from django.test import RequestFactory
+
+from kgapi import jobs, views
+
+DATA = {
+    "entities": [{"id": "e1", "name": "李明", "type": "Person"}, {"id": "e2", "name": "北京", "type": "Location"}],
+    "relations": [{"source": "e1", "target": "e2", "type": "located_in", "verb": "在"}],
+}
+
+
+@pytest.fixture
+def job_queue():
+    queue = jobs.JobQueue(max_queue=2, workers=1, process_workers=0, extract=lambda text: DATA)
+    previous = jobs.set_job_queue(queue)
+    yield queue
+    queue.shutdown()
+    jobs.set_job_queue(previous)
+
+
+def test_job_runs_extraction_and_batched_write(job_queue, fake_driver):
+    job_queue.start()
+    response = views.job_submit(RequestFactory().post(
+        "/jobs", data=json.dumps({"text": "李明在北京。", "user_id": "u1", "graph_id": "g-job"}),
+        content_type="application/json"))
+    assert response.status_code == 202
+    assert job_queue.wait("g-job", timeout=5)
+
+    result = json.loads(views.job_result(RequestFactory().get("/jobs/by-key/g-job/result"), "g-job").content)
+    assert result["status"] == jobs.DONE
+    assert result["result"]["entities"] == 2
+    # 实体、关系，以及关系端点的度数更新
+    assert [len(batch) for batch in fake_driver.batches] == [2, 1, 2]
+
+
+# 名为 stats、delete 的图谱也能查到任务状态，不会被队列统计和删除接口截走
+def test_job_routes_do_not_collide_with_graph_ids():
+    from django.urls import resolve
+
+    assert resolve("/jobs/stats").func is views.job_stats
+    assert resolve("/jobs/delete").func is views.job_delete
+    for graph_id in ("stats", "delete"):
+        match = resolve(f"/jobs/by-key/{graph_id}")
+        assert match.func is views.job_status and match.kwargs == {"graph_id": graph_id}
+        assert resolve(f"/jobs/by-key/{graph_id}/result").func is views.job_result
+
+
+def test_full_queue_applies_backpressure(job_queue):
+    # 不启动调度线程，任务只会排队
+    job_queue.submit("g1", "u1", "文本")
+    with pytest.raises(jobs.JobConflict):
+        job_queue.submit("g1", "u1", "文本")
+    job_queue.submit("g2", "u1", "文本")
+
+    response = views.job_submit(RequestFactory().post("/jobs", data={"text": "文本", "user_id": "u1"}))
+    assert response.status_code == 429 and response["Retry-After"]
+    assert job_queue.stats()["depth"] == 2
+
+
+def test_delete_job_reports_progress_and_can_be_cancelled():
+    started = threading.Event()
+
+    def delete(scope, value, batch_size, progress, cancelled):
+        stats = {"scope": scope, "value": value, "batches": 0, "cancelled": False}
+        while not cancelled():
+            stats["batches"] += 1
+            progress(dict(stats))
+            started.set()
+            time.sleep(0.01)
+        return {**stats, "cancelled": True}
+
+    queue = jobs.JobQueue(workers=1, process_workers=0, delete=delete)
+    previous = jobs.set_job_queue(queue)
+    try:
+        # 排队中的任务直接取消
+        queue.submit_delete("graph", "g-queued")
+        assert queue.cancel("g-queued")["status"] == jobs.CANCELLED
+
+        queue.start()
+        response = views.job_delete(RequestFactory().post(
+            "/jobs/delete", data=json.dumps({"user_id": "u1"}), content_type="application/json"))
+        assert response.status_code == 202 and response["Location"] == "jobs/by-key/user:u1"
+        assert started.wait(5)
+        status = json.loads(views.job_status(RequestFactory().get("/jobs/by-key/user:u1"), "user:u1").content)
+        assert status["status"] == jobs.DELETING and status["progress"]["batches"] >= 1
+
+        response = views.job_cancel(RequestFactory().post("/jobs/by-key/user:u1/cancel"), "user:u1")
+        assert response.status_code == 202
+        assert queue.wait("user:u1", timeout=5)
+        result = json.loads(views.job_result(RequestFactory().get("/jobs/by-key/user:u1/result"), "user:u1").content)
+        assert result["status"] == jobs.CANCELLED and result["result"]["cancelled"]
+        assert views.job_cancel(RequestFactory().post("/jobs/by-key/user:u1/cancel"), "user:u1").status_code == 409
+        assert views.job_delete(RequestFactory().post("/jobs/delete", data={})).status_code == 400
+    finally:
+        queue.shutdown()
+        jobs.set_job_queue(previous)
+
+
+# 抽取子进程按 settings 使用抽取缓存：第一次抽取写入缓存，缓存内容被替换后，同一文本的第二次任务拿到的是缓存里的结果
+def test_process_worker_uses_extraction_cache_from_settings(tmp_path, monkeypatch):
+    import sqlite3
+    import zlib
+
+    pytest.importorskip("zh_core_web_sm")
+    cache_path = tmp_path / "extraction_cache.sqlite3"
+    (tmp_path / "worker_settings.py").write_text(
+        "from backend.settings import *  # noqa: F401,F403\n"
+        f"KG_EXTRACTION_CACHE = {{'PATH': {str(cache_path)!r}, 'MAX_BYTES': 1 << 20}}\n"
+        "KG_SPACY_MODEL = 'zh_core_web_sm'\n"
+        "KG_ENTITY_RESOLUTION = False\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setenv("DJANGO_SETTINGS_MODULE", "worker_settings")
+    monkeypatch.delenv("KG_EXTRACTION_CACHE_PATH", raising=False)
+    monkeypatch.delenv("KG_SPACY_MODEL", raising=False)
+
+    written = []
+    queue = jobs.JobQueue(workers=1, process_workers=1,
+                          write=lambda data, *args: written.append(data) or {})
+    queue.start()
+    try:
+        queue.submit("g-first", "u1", "李明在北京工作。")
+        assert queue.wait("g-first", timeout=120)
+        assert queue.status("g-first")["status"] == jobs.DONE
+
+        cached = {"entities": [{"id": "e1", "name": "缓存命中", "type": "Organization"}], "relations": []}
+        with sqlite3.connect(cache_path) as conn:
+            conn.execute("UPDATE extraction_cache SET value = ?",
+                         (zlib.compress(json.dumps(cached, ensure_ascii=False).encode("utf-8")),))
+        queue.submit("g-second", "u1", "李明在北京工作。")
+        assert queue.wait("g-second", timeout=60)
+    finally:
+        queue.shutdown()
+    assert written[-1] == cached
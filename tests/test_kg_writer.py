@@ -0,0 +1,162 @@
+import pytest
+
+from kgapi import cache, kg_writer
+from kgapi.testing import FakeDriver
+
+
+def make_entities(n):
+    return [{"id": f"e{i}", "name": f"实体{i}", "type": "Organization"} for i in range(1, n + 1)]
+
+
+def test_create_entities_batched_splits_into_write_transactions():
+    driver = FakeDriver()
+    with driver.session() as session:
+        stats = kg_writer.create_entities_batched(session, make_entities(5), "g1", "u1", batch_size=2)
+
+    assert [len(b) for b in driver.batches] == [2, 2, 1]
+    assert driver.write_transactions == 3
+    assert all("UNWIND $rows" in query for query, _ in driver.queries)
+    assert driver.queries[0][1]["graph_id"] == "g1"
+    assert stats["rows"] == 5 and stats["batches"] == 3
+
+
+def test_create_relations_batched_groups_by_sanitized_type():
+    entities = make_entities(3)
+    relations = [
+        {"source": "e1", "target": "e2", "type": "co-occurrence", "verb": "同现", "similarity": 0.5},
+        {"source": "e2", "target": "e3", "type": "found", "verb": "创立"},
+        {"source": "e1", "target": "e3", "type": "co-occurrence", "verb": "同现", "similarity": 0.3},
+        {"source": "e1", "target": "e9", "type": "found", "verb": "创立"},
+        {"source": "e1", "target": "e2", "type": "宣布", "verb": "宣布"},
+    ]
+    driver = FakeDriver()
+    with driver.session() as session:
+        stats = kg_writer.create_relations_batched(session, relations, entities, "g1", "u1")
+
+    by_type = {query.split("[r:")[1].split("]")[0]: params["rows"] for query, params in driver.queries
+               if "[r:" in query}
+    assert sorted(by_type) == ["CO_OCCURRENCE", "FOUND"]
+    assert len(by_type["CO_OCCURRENCE"]) == 2
+    assert by_type["FOUND"] == [{"source_id": "e2", "target_id": "e3", "verb": "创立", "similarity": 0.0}]
+    assert stats["rows"] == 3
+    degree_rows = driver.queries[-1][1]["rows"]
+    assert "e.degree" in driver.queries[-1][0]
+    assert [row["id"] for row in degree_rows] == ["e1", "e2", "e3"]
+
+
+def test_batch_size_must_be_positive():
+    with pytest.raises(ValueError):
+        kg_writer.create_entities_batched(FakeDriver().session(), make_entities(1), "g1", "u1", batch_size=0)
+
+
+def test_shared_driver_is_created_once_per_process(monkeypatch):
+    from kgapi import neo4j_client
+
+    created = []
+    monkeypatch.setattr(neo4j_client, "_create_driver", lambda config: created.append(config) or FakeDriver())
+    monkeypatch.setenv("NEO4J_AUTH", "reader/secret")
+    monkeypatch.setenv("NEO4J_MAX_POOL_SIZE", "7")
+    previous = neo4j_client.set_driver(None)
+    try:
+        assert neo4j_client.get_driver() is neo4j_client.get_driver()
+        assert len(created) == 1
+        assert created[0]["USER"] == "reader" and created[0]["MAX_POOL_SIZE"] == 7
+        with neo4j_client.read_session() as session:
+            assert session.config["default_access_mode"] == "READ"
+            assert neo4j_client.pool_stats()["active_sessions"] == 1
+        assert neo4j_client.health()["status"] == "ok"
+    finally:
+        neo4j_client.set_driver(previous)
+
+
+def test_stable_ids_are_content_derived_and_scoped_per_graph():
+    data = {
+        "entities": [{"id": "e1", "name": "李明", "type": "Person"}, {"id": "e2", "name": "北京", "type": "Location"}],
+        "relations": [{"source": "e1", "target": "e2", "type": "located_in", "verb": "在"}],
+    }
+    reordered = {"entities": data["entities"][::-1], "relations": data["relations"]}
+    entities, relations = kg_writer.keyed_graph(data, "g1")
+
+    assert entities == kg_writer.keyed_graph(reordered, "g1")[0]
+    assert set(entities).isdisjoint(kg_writer.keyed_graph(data, "g2")[0])
+    li_ming = kg_writer.stable_entity_id("g1", " 李明 ", "Person")
+    assert (li_ming, kg_writer.stable_entity_id("g1", "北京", "Location"), "LOCATED_IN") in relations
+
+
+def test_update_graph_writes_only_the_delta_in_one_transaction():
+    key = lambda name: kg_writer.stable_entity_id("g1", name, "Person")  # noqa: E731
+    stored_entities = [{"id": key(n), "name": n, "type": "Person"} for n in ("李明", "王建国", "张伟")]
+    stored_relations = [
+        {"source_id": key("李明"), "target_id": key("王建国"), "rel_type": "KNOWS", "verb": "认识", "similarity": 0.0},
+        {"source_id": key("李明"), "target_id": key("张伟"), "rel_type": "KNOWS", "verb": "认识", "similarity": 0.0},
+    ]
+
+    def responder(query, params):
+        if "RETURN e.id AS id" in query:
+            return stored_entities
+        if "type(r) AS rel_type" in query:
+            return stored_relations
+        return []
+
+    data = {
+        "entities": [{"id": "e1", "name": "李明", "type": "Person"}, {"id": "e2", "name": "王建国", "type": "Person"},
+                     {"id": "e3", "name": "赵敏", "type": "Person"}],
+        "relations": [{"source": "e1", "target": "e2", "type": "knows", "verb": "熟识"},
+                      {"source": "e1", "target": "e3", "type": "knows", "verb": "认识"}],
+    }
+    driver = FakeDriver(responder)
+    with driver.session() as session:
+        sizes = kg_writer.update_graph(session, data, "g1", "u1")
+
+    assert driver.write_transactions == 1
+    assert sizes["entities"] == {"added": 1, "changed": 0, "removed": 1}
+    assert sizes["relations"] == {"added": 1, "changed": 1, "removed": 1}
+    assert sizes["total"] == 5
+    writes = [(query, params["rows"]) for query, params in driver.queries if "rows" in params]
+    # 张伟被 DETACH DELETE，指向它的关系不再单独删除
+    assert not any("DELETE r" in query for query, _ in writes)
+    assert [rows for query, rows in writes if "DETACH DELETE" in query] == [[{"id": key("张伟")}]]
+    assert [rows[0]["name"] for query, rows in writes if "MERGE (e:Entity" in query] == ["赵敏"]
+
+
+def test_delete_runs_bounded_batches_and_invalidates_after_each_commit():
+    remaining = {"relations": 25, "entities": 12}
+
+    def responder(query, params):
+        if "AS count" in query:
+            return [{"count": 12, "owners": [["g1", "u1"]]}]
+        if "g:Graph" in query:
+            return []
+        kind = "relations" if "DELETE r" in query else "entities"
+        deleted = min(params["batch_size"], remaining[kind])
+        remaining[kind] -= deleted
+        return [{"deleted": deleted}]
+
+    driver = FakeDriver(responder)
+    before = cache.versions(graph_id="g1")
+    other_user, other_graph = cache.versions(user_id="u2"), cache.versions(graph_id="g2")
+    progress = []
+    with driver.session() as session:
+        stats = kg_writer.clear_graph_by_id(session, "g1", batch_size=10, progress=progress.append)
+
+    assert (stats["relations"], stats["entities"], stats["batches"]) == (25, 12, 5)
+    # 5 个删除批次，最后一个事务同步图谱目录
+    assert driver.write_transactions == 6
+    assert "MATCH (g:Graph {graph_id: $value})" in driver.queries[-1][0]
+    assert [p["relations"] for p in progress] == [10, 20, 25, 25, 25]
+    assert progress[-1]["entities"] == 12 and not stats["cancelled"]
+    assert cache.versions(graph_id="g1") != before
+    # 只更新被删图谱及其所有者的版本号，其他用户、其他图谱的缓存仍然有效
+    assert cache.versions(user_id="u2") == other_user and cache.versions(graph_id="g2") == other_graph
+
+    # 取消后在下一批之前停止
+    remaining.update(relations=25, entities=12)
+    driver.reset()
+    with driver.session() as session:
+        stats = kg_writer.clear_graphs_by_user(session, "u1", batch_size=10, cancelled=lambda: len(progress) >= 7,
+                                               progress=progress.append)
+    assert stats["cancelled"] and stats["batches"] == 2 and driver.write_transactions == 3
+    # 取消后目录按剩余的实体重新统计
+    assert "MATCH (g:Graph {user_id: $value})" in driver.queries[-1][0]
+    assert all(params["value"] == "u1" for _, params in driver.queries)
+    assert cache.versions(user_id="u2") == other_user and cache.versions(graph_id="g2") == other_graph
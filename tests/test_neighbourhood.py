@@ -0,0 +1,78 @@
+from kgapi import neighbourhood
+from kgapi.testing import FakeDriver
+
+# 链 a-b-c-d，外加枢纽 h 连着 a 和 10 个叶子
+EDGES = [("a", "b", "KNOWS"), ("b", "c", "KNOWS"), ("c", "d", "WORKS_AT"), ("a", "h", "KNOWS")] + \
+    [("h", f"leaf{i}", "KNOWS") for i in range(10)]
+
+
+def graph_responder():
+    degree = {}
+    for s, t, _ in EDGES:
+        degree[s] = degree.get(s, 0) + 1
+        degree[t] = degree.get(t, 0) + 1
+    node = lambda key: {"id": key, "name": key.upper(), "degree": degree[key]}  # noqa: E731
+
+    # 在内存中模拟 HOP_CYPHER 的过滤、排序与 keyset 分页
+    def responder(query, params):
+        if query == neighbourhood.SEED_CYPHER:
+            return [{"e": node(params["seed_id"])}] if params["seed_id"] in degree else []
+        rows = []
+        for fid in params["frontier"]:
+            for s, t, rel_type in EDGES:
+                if fid not in (s, t):
+                    continue
+                other = t if fid == s else s
+                if params["rel_types"] and rel_type not in params["rel_types"]:
+                    continue
+                if params["max_degree"] is not None and degree[other] > params["max_degree"]:
+                    continue
+                key = [fid, other, rel_type, fid == s]
+                if params["after"] is not None and key <= params["after"]:
+                    continue
+                rows.append((key, {"source_id": fid, "neighbour_id": other, "rel_type": rel_type,
+                                   "outgoing": fid == s, "r": {"verb": rel_type.lower()}, "b": node(other)}))
+        rows.sort(key=lambda item: item[0])
+        return [row for _, row in rows[:params["limit"]]]
+    return responder
+
+
+def expand(session, **kwargs):
+    return neighbourhood.expand_neighbourhood(session, "g1", "a", hub_degree=5, **kwargs)
+
+
+def test_hub_is_summarised_not_expanded():
+    with FakeDriver(graph_responder()).session() as session:
+        result = expand(session, hops=2)
+
+    ids = {n["id"] for n in result["nodes"]}
+    assert ids == {"a", "b", "c", "h"}
+    assert [n for n in result["nodes"] if n["id"] == "h"][0]["hub"] is True
+    assert result["next_cursor"] is None and not result["truncated"]
+
+    with FakeDriver(graph_responder()).session() as session:
+        dropped = expand(session, hops=2, hubs="drop", rel_types=["KNOWS"])
+    assert {n["id"] for n in dropped["nodes"]} == {"a", "b", "c"}
+
+
+def test_cursor_pages_cover_the_full_expansion():
+    driver = FakeDriver(graph_responder())
+    with driver.session() as session:
+        full = expand(session, hops=3, hubs="keep")
+        links, nodes, cursor, pages = [], set(), None, 0
+        while True:
+            page = expand(session, hops=3, hubs="keep", max_edges=3, cursor=cursor)
+            assert len(page["links"]) <= 3
+            links += page["links"]
+            nodes |= {n["id"] for n in page["nodes"]}
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+    as_list = lambda items: sorted((link["source"], link["target"], link["type"]) for link in items)  # noqa: E731
+    assert pages > 1
+    # 每条边只返回一次，分页结果与一次展开相同
+    assert as_list(full["links"]) == sorted((s, t, r) for s, t, r in EDGES)
+    assert as_list(links) == as_list(full["links"])
+    assert nodes == {n["id"] for n in full["nodes"]}
@@ -0,0 +1,182 @@
+from kgapi import kg_writer
+from kgapi.testing import FakeDriver
+
+
+def graph_row(graph_id, node_ids, links=()):
+    return {
+        "graph_id": graph_id,
+        "nodes": [{"id": nid, "name": nid.upper(), "graph_id": graph_id} for nid in node_ids],
+        "links": [
+            {"source": s, "target": t, "rel_type": "FOUND", "props": {"verb": "创立", "graph_id": graph_id}}
+            for s, t in links
+        ],
+    }
+
+
+def test_query_graphs_single_round_trip_in_requested_order():
+    rows = [graph_row("g2", ["c"]), graph_row("g1", ["a", "b"], [("a", "b")])]
+    driver = FakeDriver(lambda query, params: rows)
+    with driver.session() as session:
+        graphs = kg_writer.query_graphs(session, ["g1", "g2", "missing"])
+
+    assert len(driver.queries) == 1
+    assert driver.queries[0][1]["graph_ids"] == ["g1", "g2", "missing"]
+    assert [g["graph_id"] for g in graphs] == ["g1", "g2"]
+    assert graphs[0]["links"][0]["label"] == "创立"
+    assert graphs[0]["links"][0]["type"] == "FOUND"
+    assert graphs[1]["links"] == []
+
+
+def test_query_graphs_page_returns_cursor_when_page_is_full():
+    def responder(query, params):
+        if "MATCH (g:Graph)" in query:
+            return [{"graph_id": "g1"}, {"graph_id": "g2"}][:params["page_size"]]
+        # g2 在目录里但已没有实体，展开时不返回行
+        return [graph_row("g1", ["a"])]
+
+    driver = FakeDriver(responder)
+    with driver.session() as session:
+        page = kg_writer.query_graphs_page(session, user_id="u1", page_size=2)
+        assert [g["graph_id"] for g in page["graphs"]] == ["g1"]
+        # 游标取选中的最后一个 graph_id，不因 g2 没有内容而提前结束
+        assert page["next_cursor"] == "g2"
+        last = kg_writer.query_graphs_page(session, user_id="u1", after="g2", page_size=3)
+        assert last["next_cursor"] is None
+
+    assert driver.queries[2][1]["after"] == "g2"
+    assert driver.queries[1][1]["graph_ids"] == ["g1", "g2"]
+    assert len(driver.queries) == 4
+
+
+def stream_rows():
+    a = {"id": "e1", "name": "深度智云"}
+    b = {"id": "e2", "name": "未来科技"}
+    c = {"id": "e3", "name": "李明"}
+    return [
+        {"a": a, "rel_type": "COOPERATE", "r": {"verb": "合作"}, "b": b},
+        {"a": a, "rel_type": "CO_OCCURRENCE", "r": {"verb": "同现"}, "b": c},
+        {"a": b, "rel_type": None, "r": None, "b": None},
+        {"a": c, "rel_type": None, "r": None, "b": None},
+    ]
+
+
+def test_iter_graph_yields_each_node_once_before_its_links():
+    driver = FakeDriver(lambda query, params: stream_rows())
+    with driver.session() as session:
+        items = list(kg_writer.iter_graph(session, "g1"))
+
+    assert [kind for kind, _ in items] == ["node", "node", "link", "node", "link"]
+    assert [item["id"] for kind, item in items if kind == "node"] == ["e1", "e2", "e3"]
+    assert len(driver.queries) == 1
+
+
+def test_graph_stream_view_returns_ndjson(fake_driver):
+    import json
+
+    from django.test import RequestFactory
+
+    from kgapi import views
+
+    fake_driver.responder = lambda query, params: stream_rows()
+    response = views.graph_stream(RequestFactory().get("/graphs/g1/stream"), "g1")
+
+    assert response.streaming
+    assert response["Content-Type"].startswith("application/x-ndjson")
+    lines = b"".join(response.streaming_content).decode("utf-8").splitlines()
+    assert [json.loads(line)["kind"] for line in lines] == ["node", "node", "link", "node", "link"]
+
+
+def test_graph_detail_is_cached_and_revalidated_with_etag(fake_driver):
+    from django.test import RequestFactory
+
+    from kgapi import query
+
+    fake_driver.responder = lambda q, params: stream_rows() if "OPTIONAL MATCH" in q else []
+    factory = RequestFactory()
+    kg_writer.create_entities_batched(fake_driver.session(), [], "g-etag", "u1")
+    fake_driver.reset()
+
+    first = query.graph_detail(factory.get("/graphs/g-etag"), "g-etag")
+    assert first.status_code == 200 and len(fake_driver.queries) == 1
+    etag = first["ETag"]
+
+    again = query.graph_detail(factory.get("/graphs/g-etag"), "g-etag")
+    assert again.content == first.content and len(fake_driver.queries) == 1
+
+    not_modified = query.graph_detail(factory.get("/graphs/g-etag", HTTP_IF_NONE_MATCH=f"W/{etag}"), "g-etag")
+    assert not_modified.status_code == 304 and len(fake_driver.queries) == 1
+
+    # 写入同一图谱后版本号变化，旧 ETag 失效
+    kg_writer.create_entities_batched(fake_driver.session(), [{"id": "e9", "name": "新实体", "type": "Organization"}],
+                                      "g-etag", "u1")
+    fake_driver.reset()
+    changed = query.graph_detail(factory.get("/graphs/g-etag", HTTP_IF_NONE_MATCH=etag), "g-etag")
+    assert changed.status_code == 200 and changed["ETag"] != etag
+    assert len(fake_driver.queries) == 1
+
+
+def test_query_by_name_requires_name(fake_driver):
+    from django.test import RequestFactory
+
+    from kgapi import query
+
+    assert query.query_name(RequestFactory().get("/query")).status_code == 400
+    # 不允许不限用户和图谱的全库扫描
+    assert query.query_name(RequestFactory().get("/query", {"name": "深度智云"})).status_code == 400
+    assert fake_driver.queries == []
+
+
+def test_query_by_name_seeds_from_fulltext_index():
+    seed = {"id": "e1", "name": "深度智云", "graph_id": "g1"}
+    neighbour = {"id": "e2", "name": "李明", "graph_id": "g1"}
+    driver = FakeDriver(lambda q, params: [{"e": seed, "rel_type": "JOIN", "r": {"verb": "加入"}, "n": neighbour,
+                                             "outgoing": False}])
+    with driver.session() as session:
+        result = kg_writer.query_by_name(session, "深度智云", graph_id="g1", limit=10)
+        kg_writer.query_by_name(session, "京", user_id="u1")
+
+    query, params = driver.queries[0]
+    assert "db.index.fulltext.queryNodes" in query and "CONTAINS" not in query
+    assert (params["graph_id"], params["user_id"], params["limit"]) == ("g1", None, 10)
+    # 单字关键词退回用户范围内的 CONTAINS
+    assert "e.user_id = $user_id AND e.name CONTAINS $keyword" in driver.queries[1][0]
+    assert [(r["source"], r["target"]) for r in result["relations"]] == [("e2", "e1")]
+
+
+def test_async_user_graphs_are_loaded_concurrently(fake_async_driver):
+    import asyncio
+    import time
+
+    from kgapi import async_queries
+
+    def responder(query, params):
+        if "g:Graph" in query:
+            return [{"graph_id": f"g{i}"} for i in range(8)]
+        a = {"id": f"{params['graph_id']}-e1", "name": "深度智云"}
+        return [{"a": a, "rel_type": None, "r": None, "b": None}]
+
+    fake_async_driver.responder = responder
+    fake_async_driver.latency = 0.05
+    started = time.perf_counter()
+    graphs = asyncio.run(async_queries.load_user_graphs("u1"))
+
+    assert [g["graph_id"] for g in graphs] == [f"g{i}" for i in range(8)]
+    assert graphs[3]["nodes"][0]["id"] == "g3-e1"
+    # 8 个图谱串行需要 0.45 秒，并发时接近两次往返
+    assert time.perf_counter() - started < 0.3
+
+
+def test_async_graph_detail_view(fake_async_driver):
+    import asyncio
+    import json
+
+    from django.test import AsyncRequestFactory
+
+    from kgapi import query
+
+    fake_async_driver.responder = lambda q, params: stream_rows()
+    response = asyncio.run(query.graph_detail_async(AsyncRequestFactory().get("/async/graphs/g-async"), "g-async"))
+
+    assert response.status_code == 200 and response["ETag"]
+    payload = json.loads(response.content)
+    assert len(payload["nodes"]) == 3 and len(payload["links"]) == 2
@@ -0,0 +1,64 @@
+import numpy as np
+
+from kgapi import kg_writer
+from kgapi.resolution import EntityResolver, normalize_name, pairwise_scores
+
+# 人工标注的样本：(名称, 类型, 实体编号)
+LABELLED = [
+    ("深度智云", "Organization", 1), ("深度智云公司", "Organization", 1), ("深度智云有限公司", "Organization", 1),
+    ("深度 智云", "Organization", 1), ("深度智云（北京）有限公司", "Organization", 1),
+    ("华东科技大学", "Organization", 2), ("华东理工大学", "Organization", 3),
+    ("中芯国际集成电路", "Organization", 4), ("中芯国际集成电路制造", "Organization", 4),
+    ("Acme Inc.", "Organization", 5), ("ACME", "Organization", 5), ("Cisco", "Organization", 6),
+    ("李明", "Person", 7), ("李 明", "Person", 7), ("李鸣", "Person", 8), ("深度智云", "Person", 9),
+    ("北京", "Location", 10), ("北京市", "Location", 10), ("ＡＢＣ", "Product", 11), ("abc", "Product", 11),
+    ("2024年3月10日", "DATE", 12), ("2024年3月11日", "DATE", 13),
+]
+
+
+def test_normalisation_strips_legal_forms_width_and_spacing():
+    assert normalize_name("深度智云（北京）股份有限公司", "Organization") == "深度智云"
+    assert normalize_name("Acme Corp.", "Organization") == "acme"
+    assert normalize_name("Cisco", "Organization") == "cisco"
+    assert normalize_name("公司", "Organization") == "公司"
+    assert normalize_name("深圳市", "Location") == "深圳"
+    assert normalize_name("ＡＢ Ｃ", "Product") == "abc"
+
+
+def test_labelled_sample_is_resolved_without_false_merges():
+    resolver = EntityResolver(vector=None)
+    predicted = [resolver.add(name, entity_type) for name, entity_type, _ in LABELLED]
+    scores = pairwise_scores(predicted, [label for *_, label in LABELLED])
+    assert scores == {"precision": 1.0, "recall": 1.0}
+    assert resolver.stats["fuzzy"] == 1
+    assert resolver.clusters[predicted[0]]["aliases"] == [
+        "深度智云公司", "深度智云有限公司", "深度 智云", "深度智云（北京）有限公司"]
+
+    # 名称向量只能排除候选：余弦相似度过低时，Dice 足够的模糊匹配也不合并
+    resolver = EntityResolver(vector=lambda name: np.array([1.0, 0.0]) if "制造" in name else np.array([0.0, 1.0]))
+    assert resolver.add("中芯国际集成电路", "Organization") != resolver.add("中芯国际集成电路制造", "Organization")
+
+
+def test_resolve_remaps_relations_across_documents_and_keeps_aliases():
+    resolver = EntityResolver(vector=None)
+    first = resolver.resolve({
+        "entities": [{"id": "e1", "name": "深度智云", "type": "Organization"},
+                     {"id": "e2", "name": "李明", "type": "Person"}],
+        "relations": [{"source": "e2", "target": "e1", "type": "found", "verb": "创立"}],
+    })
+    second = resolver.resolve({
+        "entities": [{"id": "e1", "name": "李明", "type": "Person"},
+                     {"id": "e2", "name": "深度智云公司", "type": "Organization"},
+                     {"id": "e3", "name": "深度智云", "type": "Organization"}],
+        "relations": [{"source": "e1", "target": "e2", "type": "found", "verb": "创立"},
+                      {"source": "e1", "target": "e3", "type": "found", "verb": "创立"},
+                      {"source": "e2", "target": "e3", "type": "co-occurrence", "similarity": 0.9}],
+    })
+    assert first["entities"][0]["aliases"] == []
+    assert second["entities"] == [{"id": "e1", "name": "李明", "type": "Person", "aliases": []},
+                                  {"id": "e2", "name": "深度智云", "type": "Organization", "aliases": ["深度智云公司"]}]
+    # 合并后重复的关系只保留一条，首尾相同的同现关系丢弃
+    assert [(r["source"], r["target"], r["type"]) for r in second["relations"]] == [("e1", "e2", "found")]
+
+    entities, _ = kg_writer.keyed_graph(second, "g1")
+    assert entities[kg_writer.stable_entity_id("g1", "深度智云", "Organization")]["aliases"] == ["深度智云公司"]
@@ -0,0 +1,42 @@
+from kgapi import schema
+from kgapi.testing import FakeDriver
+
+
+def test_init_schema_sends_idempotent_statements():
+    driver = FakeDriver()
+    with driver.session() as session:
+        created = schema.init_schema(session, wait_seconds=5)
+
+    assert created == [name for name, _ in schema.SCHEMA_STATEMENTS]
+    statements = [query for query, _ in driver.queries]
+    assert all("IF NOT EXISTS" in statement for statement in statements[:-1])
+    assert statements[-1] == "CALL db.awaitIndexes($timeout)" and driver.queries[-1][1]["timeout"] == 5
+
+
+def test_check_schema_reports_offline_indexes_and_scans():
+    online = [{"name": name, "state": "ONLINE"} for name, _ in schema.SCHEMA_STATEMENTS if name != "entity_name"]
+    online.append({"name": "entity_name", "state": "POPULATING"})
+
+    def responder(query, params):
+        if query.strip().startswith("SHOW FULLTEXT INDEXES"):
+            # 全文索引建在了错误的属性上
+            return [{"state": "ONLINE", "labelsOrTypes": ["Entity"], "properties": ["id"]}]
+        return online if query.startswith("SHOW INDEXES") else []
+
+    # 按 name 查询的计划退化为全标签扫描，其余都走索引
+    def planner(query, params):
+        if "e.name = $name" in query:
+            return {"operatorType": "ProduceResults@neo4j", "children": [{"operatorType": "NodeByLabelScan@neo4j"}]}
+        return {"operatorType": "ProduceResults@neo4j",
+                "children": [{"operatorType": "NodeIndexSeek@neo4j"}, {"operatorType": "NodeUniqueIndexSeek@neo4j"}]}
+
+    driver = FakeDriver(responder, planner=planner)
+    with driver.session() as session:
+        results = {item["check"]: item for item in schema.check_schema(session)}
+
+    failed = sorted(check for check, item in results.items() if not item["ok"])
+    assert failed == [f"fulltext:{schema.FULLTEXT_INDEX_NAME}", "index:entity_name", "plan:match_by_name"]
+    assert not any(check.startswith("plan:search") for check in results)
+    assert results["index:entity_name"]["detail"] == "POPULATING"
+    assert results["plan:match_by_name"]["detail"] == "ProduceResults <- NodeByLabelScan"
+    assert results["plan:list_user_graphs"]["ok"]
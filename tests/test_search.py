@@ -0,0 +1,76 @@
+import random
+import time
+
+import pytest
+
+from kgapi import kg_writer, search
+from kgapi.testing import FakeDriver
+
+
+def test_fulltext_query_is_escaped_phrase_and_short_keywords_fall_back():
+    query, params, limit, offset = search.search_query("C++ 深度:智云", "u1", limit=500, offset=-3)
+    assert query == search.FULLTEXT_SEARCH_CYPHER
+    assert params["query"] == '"C\\+\\+ 深度\\:智云"'
+    assert (limit, offset, params["limit"]) == (search.MAX_LIMIT, 0, search.MAX_LIMIT + 1)
+
+    query, params, _, _ = search.search_query("京", "u1")
+    assert query == search.SHORT_SEARCH_CYPHER and params["keyword"] == "京"
+
+    query, params, _, _ = search.search_query("京", None, graph_id="g1")
+    assert query == search.GRAPH_SHORT_SEARCH_CYPHER and params["graph_id"] == "g1"
+    with pytest.raises(ValueError):
+        search.search_query("深度智云", None)
+
+
+def test_search_entities_runs_fulltext_query_against_session():
+    driver = FakeDriver(lambda query, params: [{"e": {"id": "e1", "name": "深度智云"}, "score": 2.0}])
+    with driver.session() as session:
+        page = search.search_entities(session, "u1", "深度智云")
+    assert page["results"][0]["score"] == 2.0
+    assert driver.queries[0][1]["query"] == '"深度智云"'
+
+
+def test_search_page_reports_next_offset():
+    records = [{"e": {"id": f"e{i}", "name": f"实体{i}"}, "score": 1.0 / (i + 1)} for i in range(3)]
+    page = search.search_page(records, limit=2, offset=4)
+    assert [r["id"] for r in page["results"]] == ["e0", "e1"]
+    assert page["next_offset"] == 6
+
+
+def test_autocomplete_ranks_prefix_matches_and_tracks_writes():
+    entities = [
+        {"id": "e1", "name": "北京大学", "type": "Organization", "graph_id": "g1"},
+        {"id": "e2", "name": "北京", "type": "Location", "graph_id": "g1"},
+        {"id": "e3", "name": "南北京剧社", "type": "Organization", "graph_id": "g1"},
+        {"id": "e4", "name": "上海", "type": "Location", "graph_id": "g1"},
+    ]
+    driver = FakeDriver(lambda query, params: entities if "RETURN e.id AS id" in query else [])
+    search.ngram_index.drop_user("u-ac")
+    with driver.session() as session:
+        names = [e["name"] for e in search.autocomplete(session, "u-ac", "北京")]
+        assert names == ["北京", "北京大学", "南北京剧社"]
+        assert [e["name"] for e in search.autocomplete(session, "u-ac", "海")] == ["上海"]
+        loads = len(driver.queries)
+
+        # 本进程写入后索引同步更新，下一次补全不需要重新从 Neo4j 加载
+        kg_writer.create_entities_batched(session, [{"id": "e5", "name": "北京路", "type": "Location"}], "g1", "u-ac")
+        driver.reset()
+        assert "北京路" in [e["name"] for e in search.autocomplete(session, "u-ac", "北京")]
+        assert driver.queries == []
+    assert loads == 1
+
+
+def test_ngram_autocomplete_stays_fast_for_large_users():
+    rng = random.Random(0)
+    chars = "北京上海深度智云未来科技公司大学研究院李明王建国张伟集团银行医院"
+    entities = [
+        {"id": f"e{i}", "name": "".join(rng.choice(chars) for _ in range(rng.randint(2, 6))), "graph_id": "g"}
+        for i in range(50_000)
+    ]
+    index = search.NgramIndex()
+    index.load("u-big", entities)
+
+    started = time.perf_counter()
+    results = index.complete("u-big", "北京", 10)
+    assert (time.perf_counter() - started) < 0.01
+    assert len(results) == 10 and all(e["name"].startswith("北京") for e in results)
@@ -0,0 +1,94 @@
+import json
+
+import networkx as nx
+import pytest
+from django.test import Client
+from networkx.algorithms.link_analysis.pagerank_alg import _pagerank_python
+
+from kgapi import cache, snapshot
+from kgapi.testing import FakeDriver
+
+NODES = [{"id": key, "name": key.upper(), "type": "ORG", "graph_id": "g1"} for key in "abcdefg"]
+# a -> b -> c -> a 成环，c -> d 两条不同类型的边；e - f 是另一个分量，g 孤立
+EDGES = [("a", "b", "FOUND"), ("b", "c", "FOUND"), ("c", "a", "OWN"), ("c", "d", "OWN"), ("c", "d", "FOUND"),
+         ("e", "f", "OWN")]
+
+
+def responder(query, params):
+    if "RETURN coalesce(e.id" in query:
+        return NODES
+    return [{"source": s, "target": t, "type": r} for s, t, r in EDGES]
+
+
+def make_snapshot():
+    with FakeDriver(responder).session() as session:
+        return snapshot.load_snapshot(session, graph_id="g1")
+
+
+def test_snapshot_csr_matches_networkx_view():
+    snap = make_snapshot()
+    graph = snap.to_networkx()
+
+    assert (len(snap), snap.edge_count) == (7, 6)
+    assert snap.type_names[snap.rel_types[0]] == "FOUND"
+    for key in "abcdefg":
+        i = snap.index[key]
+        assert snap.out_degree()[i] == graph.out_degree(key)
+        assert snap.in_degree()[i] == graph.in_degree(key)
+
+    # nx.pagerank 需要 scipy，这里对比纯 Python 实现
+    expected = _pagerank_python(graph)
+    ranks = snap.pagerank()
+    for key, score in expected.items():
+        assert ranks[snap.index[key]] == pytest.approx(score, abs=1e-6)
+
+    labels = snap.components()
+    groups = {}
+    for key in "abcdefg":
+        groups.setdefault(labels[snap.index[key]], set()).add(key)
+    assert sorted(groups.values(), key=sorted) == sorted(map(set, nx.weakly_connected_components(graph)), key=sorted)
+
+
+def test_shortest_path_directed_and_undirected():
+    snap = make_snapshot()
+
+    assert snap.shortest_path("a", "d", directed=True) == ["a", "b", "c", "d"]
+    assert snap.shortest_path("a", "d") == ["a", "c", "d"]
+    assert snap.shortest_path("d", "a", directed=True) is None
+    assert snap.shortest_path("a", "e") is None
+    assert snapshot.path_between(snap, "a", "d")["length"] == 2
+
+
+def test_snapshot_cache_reloads_after_write(fake_driver):
+    fake_driver.responder = responder
+    snapshots = snapshot.SnapshotCache()
+    with fake_driver.session() as session:
+        first = snapshots.get(session, graph_id="g-snap")
+        assert snapshots.get(session, graph_id="g-snap") is first
+        cache.bump(graph_id="g-snap", user_id="u1")
+        assert snapshots.get(session, graph_id="g-snap") is not first
+    assert len(fake_driver.queries) == 4
+
+
+def test_analytics_endpoints(fake_driver):
+    fake_driver.responder = responder
+    snapshot.snapshots.drop()
+    client = Client()
+
+    response = client.get("/graphs/g-view/analytics/degree", {"top": 2})
+    body = json.loads(response.content)
+    assert response.status_code == 200
+    assert [item["id"] for item in body["results"]] == ["c", "a"]
+    assert body["results"][0]["degree"] == 4
+
+    body = json.loads(client.get("/graphs/g-view/analytics/components").content)
+    assert body["count"] == 3
+    assert [c["size"] for c in body["components"]] == [4, 2, 1]
+
+    body = json.loads(client.get("/graphs/g-view/analytics/pagerank", {"top": 1}).content)
+    assert body["results"][0]["id"] in "abcd"
+
+    # 三种分析共用一次加载的快照
+    assert len(fake_driver.queries) == 2
+    assert client.get("/graphs/g-view/analytics/path").status_code == 400
+    assert client.get("/graphs/g-view/analytics/unknown").status_code == 404
@@ -0,0 +1,25 @@
+from kgapi import kg_writer, synthetic
+from kgapi.testing import FakeDriver
+
+
+def test_entity_names_are_unique_per_type():
+    graph = synthetic.generate_graph(20000, degree=2, seed=1)
+    keys = {(e["name"], e["type"]) for e in graph["entities"]}
+    assert len(keys) == len(graph["entities"]) == 20000
+    assert synthetic.type_counts(20000)["Person"] == 7000
+
+
+def test_generators_are_reproducible():
+    assert synthetic.generate_graph(500, seed=3) == synthetic.generate_graph(500, seed=3)
+    first = list(synthetic.generate_corpus(5, 1000, seed=3))
+    assert first == list(synthetic.generate_corpus(5, 1000, seed=3))
+    assert all(doc["text"].endswith("。") for doc in first)
+
+
+def test_synthetic_graph_writes_without_dropping_relations():
+    graph = synthetic.generate_graph(300, degree=3)
+    driver = FakeDriver()
+    with driver.session() as session:
+        stats = kg_writer.write_graph(session, graph, "g-synthetic", "u1", batch_size=100)
+    assert stats["entities"]["rows"] == 300
+    assert stats["relations"]["rows"] == len(graph["relations"])